@@ -0,0 +1,68 @@
+# backend/agents/agent_batch_api.py
+
+import asyncio
+import json
+import os
+from typing import List, Literal
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from agents.batch import get_run_fn, run_batch
+from api.rate_limiter import charge_request
+from utils.metrics import metrics
+
+router = APIRouter()
+
+MAX_BATCH_CONCURRENCY = int(os.getenv("BATCH_CHAT_MAX_CONCURRENCY", "8"))
+
+
+class AgentBatchRequest(BaseModel):
+    messages: List[str] = Field(..., min_length=1, max_length=1000)
+    conversation_id: str = "batch"
+    agent: Literal["ollama", "claude", "routed", "fallback", "langgraph"] = "ollama"
+    max_concurrency: int = Field(4, ge=1)
+
+
+@router.post("/api/agent/chat/batch")
+async def agent_chat_batch(request: AgentBatchRequest, http_request: Request):
+    """
+    Chat em batch para perguntas em massa
+    
+    Executa as mensagens com paralelismo limitado e devolve NDJSON
+    (uma linha por item, pela ordem em que terminam). Erros de um item
+    não falham o batch; a última linha traz o resumo.
+    Se o cliente desligar, os itens em curso são cancelados.
+    Cada mensagem consome um token do rate limit de batch (capacidade por
+    omissão = 1000, o máximo de mensagens; acima da capacidade devolve 413).
+    """
+    await charge_request(http_request, len(request.messages))
+    run_fn = get_run_fn(request.agent)
+    max_concurrency = min(request.max_concurrency, MAX_BATCH_CONCURRENCY)
+
+    async def ndjson():
+        succeeded = 0
+        try:
+            async for item in run_batch(
+                run_fn,
+                request.messages,
+                max_concurrency=max_concurrency,
+                conversation_prefix=request.conversation_id,
+            ):
+                succeeded += item["success"]
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        except asyncio.CancelledError:
+            # O cliente desligou: o run_batch cancela os workers ao fechar
+            metrics.incr("cancellation.client_disconnect")
+            metrics.incr("cancellation.agent_chat_batch")
+            raise
+
+        yield json.dumps({
+            "done": True,
+            "total": len(request.messages),
+            "succeeded": succeeded,
+            "failed": len(request.messages) - succeeded
+        }) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
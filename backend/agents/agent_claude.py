@@ -4,16 +4,17 @@ Agente Claude usando Anthropic
 Versão SIMPLES - SEM memory, SEM tools
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage
 from config.llm_config import llm_config
+from .batch import BatchRunMixin
 import os
 from dotenv import load_dotenv
 
 
 
-class AgentClaude:
+class AgentClaude(BatchRunMixin):
     """Agente simples com Claude"""
 
     def __init__(self, model_name: str = "claude-3-5-sonnet-20241022", verbose: bool = False):
@@ -81,6 +82,42 @@ class AgentClaude:
                 "conversation_id": conversation_id
             }
 
+    async def arun(
+        self, 
+        message: str, 
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Versão async de run() (cancelável a meio do pedido HTTP)"""
+        if self.llm is None:
+            return {
+                "success": False,
+                "error": "Agente Claude não inicializado",
+                "conversation_id": conversation_id
+            }
+
+        try:
+            result = await self.llm.ainvoke([HumanMessage(content=message)])
+            
+            return {
+                "success": True,
+                "response": result.content,
+                "conversation_id": conversation_id
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "conversation_id": conversation_id
+            }
+
+    async def astream(self, message: str) -> AsyncIterator[str]:
+        """Stream do texto gerado, chunk a chunk (usado pelo modo hedging)"""
+        async for chunk in self.llm.astream([HumanMessage(content=message)]):
+            if chunk.content:
+                yield chunk.content
+
 
 def create_claude_agent(verbose: bool = False) -> AgentClaude:
     """Factory function para criar o agente Claude"""
@@ -0,0 +1,159 @@
+# backend/agents/agent_fallback.py
+"""
+Agente com fallback entre providers (Ollama, Claude, OpenAI)
+Cada provider tem o seu circuit breaker: circuitos abertos falham
+imediatamente e o pedido passa logo para o próximo provider da ordem
+"""
+
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+from utils.circuit_breaker import CircuitBreaker
+from utils.metrics import metrics
+from .batch import BatchRunMixin
+
+
+def _create_provider_agent(provider: str):
+    """Cria o agent de um provider (imports tardios - só paga quem é usado)"""
+    if provider == "ollama":
+        from .agent_ollama import AgentOLlama
+        return AgentOLlama()
+    elif provider == "claude":
+        from .agent_claude import AgentClaude
+        return AgentClaude(model_name="claude-sonnet-4")
+    elif provider == "openai":
+        from .agent_openai import AgentOpenAI
+        return AgentOpenAI()
+    else:
+        raise ValueError(f"Provider desconhecido: {provider}")
+
+
+def get_fallback_order() -> List[str]:
+    """Ordem de fallback configurada em LLM_FALLBACK_ORDER (ex: "ollama,claude,openai")"""
+    order = os.getenv("LLM_FALLBACK_ORDER", "ollama,claude,openai")
+    return [p.strip() for p in order.split(",") if p.strip()]
+
+
+class AgentFallback(BatchRunMixin):
+    """Tenta cada provider por ordem, saltando os que têm o circuito aberto"""
+
+    def __init__(self, order: Optional[List[str]] = None, verbose: bool = False):
+        self.order = order or get_fallback_order()
+        self.verbose = verbose
+        self._agents: Dict[str, Any] = {}
+        self.breakers = {
+            provider: CircuitBreaker(
+                provider,
+                failure_rate_threshold=float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+                slow_call_seconds=float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "30")),
+                open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+            )
+            for provider in self.order
+        }
+
+    def _get_agent(self, provider: str):
+        if provider not in self._agents:
+            self._agents[provider] = _create_provider_agent(provider)
+        return self._agents[provider]
+
+    def run(
+        self,
+        message: str,
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Executa o pedido no primeiro provider disponível
+
+        Returns:
+            Dict com success, response ou error, provider usado e
+            erros dos providers que falharam antes
+        """
+        errors = []
+
+        for provider in self._available(errors):
+            start = time.perf_counter()
+            try:
+                result = self._get_agent(provider).run(
+                    message=message,
+                    conversation_id=conversation_id,
+                    **kwargs
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            if self._record(provider, result, time.perf_counter() - start, errors):
+                return result
+
+        return self._exhausted(errors, conversation_id)
+
+    async def arun(
+        self,
+        message: str,
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Versão async de run(); cancelar a task cancela o provider em curso"""
+        errors = []
+
+        for provider in self._available(errors):
+            agent = self._get_agent(provider)
+            start = time.perf_counter()
+            try:
+                result = await agent.arun(
+                    message=message,
+                    conversation_id=conversation_id,
+                    **kwargs
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            if self._record(provider, result, time.perf_counter() - start, errors):
+                return result
+
+        return self._exhausted(errors, conversation_id)
+
+    def _available(self, errors: List[dict]):
+        """Providers pela ordem, saltando (e registando) os de circuito aberto"""
+        for provider in self.order:
+            if not self.breakers[provider].allow_request():
+                errors.append({"provider": provider, "error": "circuito aberto"})
+                continue
+            yield provider
+
+    def _record(self, provider: str, result: Dict[str, Any], latency: float, errors: List[dict]) -> bool:
+        """Atualiza breaker e métricas; True se o provider respondeu com sucesso"""
+        breaker = self.breakers[provider]
+        metrics.observe(f"fallback.{provider}.latency_s", latency)
+
+        if result.get("success"):
+            breaker.record_success(latency)
+            if errors:
+                metrics.incr("fallback.used")
+            result["provider"] = provider
+            result["fallback_errors"] = errors
+            return True
+
+        breaker.record_failure(latency)
+        metrics.incr(f"fallback.{provider}.failures")
+        errors.append({"provider": provider, "error": result.get("error")})
+
+        if self.verbose:
+            print(f"⚠️ Provider {provider} falhou, a tentar o próximo: {result.get('error')}")
+        return False
+
+    def _exhausted(self, errors: List[dict], conversation_id: str) -> Dict[str, Any]:
+        metrics.incr("fallback.exhausted")
+        return {
+            "success": False,
+            "error": "Todos os providers falharam",
+            "fallback_errors": errors,
+            "conversation_id": conversation_id
+        }
+
+    def circuits(self) -> List[dict]:
+        """Estado dos circuit breakers, pela ordem de fallback"""
+        return [self.breakers[provider].snapshot() for provider in self.order]
+
+
+# Instância global
+fallback_agent = AgentFallback(verbose=True)
@@ -0,0 +1,41 @@
+# backend/agents/agent_fallback_api.py
+
+from typing import Optional
+from fastapi import APIRouter, Header, Request, Response
+from agents.agent_fallback import fallback_agent
+from api.idempotency import IDEMPOTENCY_HEADER, run_idempotent
+from api.request_guard import run_until_disconnect
+from .chat_request import AgentChatRequest
+
+router = APIRouter()
+
+
+@router.post("/api/agent/chat/fallback")
+async def agent_chat_fallback(
+    request: AgentChatRequest,
+    response: Response,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """
+    Chat com fallback entre providers
+    
+    Tenta os providers pela ordem de LLM_FALLBACK_ORDER; providers com
+    o circuito aberto são saltados sem esperar pelo timeout
+    """
+    async def execute():
+        return await fallback_agent.arun(
+            message=request.message,
+            conversation_id=request.conversation_id
+        )
+    return await run_until_disconnect(
+        http_request,
+        "agent_chat_fallback",
+        lambda: run_idempotent(idempotency_key, "agent_chat_fallback", request, execute, response)
+    )
+
+
+@router.get("/api/agent/circuits")
+async def get_circuits():
+    """Estado dos circuit breakers de cada provider"""
+    return {"order": fallback_agent.order, "circuits": fallback_agent.circuits()}
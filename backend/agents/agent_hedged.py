@@ -0,0 +1,228 @@
+# backend/agents/agent_hedged.py
+"""
+Agente com hedged requests para cortar a cauda de latência
+
+Se o backend principal não produzir o primeiro token dentro do seu p95
+medido, envia um pedido duplicado para um segundo backend (outro host
+Ollama ou Claude), usa o que terminar primeiro e cancela o outro.
+A taxa de hedging é limitada para que a carga extra fique controlada.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from config.llm_config import llm_config
+from utils.metrics import metrics
+
+
+class HedgeBackend:
+    """Backend candidato: nome (para métricas) + função de streaming"""
+
+    def __init__(self, name: str, stream: Callable[[str], AsyncIterator[str]], host=None):
+        self.name = name
+        self.stream = stream
+        self.host = host  # OllamaHost, para contabilizar no load balancer
+
+
+class AgentHedged:
+    """Executa pedidos com hedging no primeiro token"""
+
+    def __init__(
+        self,
+        max_hedge_ratio: float = 0.1,
+        max_hedge_burst: float = 5.0,
+        default_hedge_delay: float = 2.0,
+        min_samples: int = 20,
+        verbose: bool = False,
+    ):
+        """
+        Args:
+            max_hedge_ratio: Fração máxima de pedidos que podem ser duplicados
+            max_hedge_burst: Nº de hedges acumuláveis para picos
+            default_hedge_delay: Espera (s) antes de haver amostras suficientes de p95
+            min_samples: Amostras de time-to-first-token antes de usar o p95 medido
+        """
+        self.max_hedge_ratio = max_hedge_ratio
+        self.max_hedge_burst = max_hedge_burst
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.verbose = verbose
+        self._hedge_credits = max_hedge_burst
+        self._ollama = None
+        self._claude = None
+
+    # ------------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------------
+
+    def _ollama_agent(self):
+        if self._ollama is None:
+            from .agent_ollama import agent
+            self._ollama = agent
+        return self._ollama
+
+    def _claude_agent(self):
+        if self._claude is None:
+            from .agent_claude import AgentClaude
+            self._claude = AgentClaude(model_name="claude-sonnet-4")
+        return self._claude
+
+    def _pick_backends(self, conversation_id: Optional[str]) -> List[HedgeBackend]:
+        """Principal escolhido pelo balancer; secundário noutro host ou Claude"""
+        balancer = llm_config.ollama_balancer
+        ollama = self._ollama_agent()
+
+        def ollama_backend(host) -> HedgeBackend:
+            return HedgeBackend(
+                f"ollama@{host.url}",
+                lambda message: ollama.astream(message, base_url=host.url),
+                host=host,
+            )
+
+        primary = balancer.select(conversation_id)
+        others = [h for h in balancer.hosts if h.healthy and h is not primary]
+        if others:
+            secondary = ollama_backend(min(others, key=lambda h: h.score(balancer.strategy)))
+        else:
+            secondary = HedgeBackend("claude", self._claude_agent().astream)
+
+        return [ollama_backend(primary), secondary]
+
+    # ------------------------------------------------------------------------
+    # Política de hedging
+    # ------------------------------------------------------------------------
+
+    def hedge_delay(self, backend_name: str) -> float:
+        """p95 medido do time-to-first-token do backend (ou o default)"""
+        name = f"hedge.{backend_name}.ttft_s"
+        if metrics.sample_count(name) < self.min_samples:
+            return self.default_hedge_delay
+        return metrics.percentile(name, 95)
+
+    def _try_acquire_hedge(self) -> bool:
+        """Consome um crédito de hedge (cada pedido acumula max_hedge_ratio)"""
+        if self._hedge_credits >= 1:
+            self._hedge_credits -= 1
+            return True
+        metrics.incr("hedge.budget_exhausted")
+        return False
+
+    async def _consume(self, backend: HedgeBackend, message: str, first_token: asyncio.Event) -> str:
+        """
+        Consome o stream do backend e mede o time-to-first-token
+
+        Um perdedor cancelado antes do primeiro token também conta, como amostra
+        censurada (pelo menos o tempo esperado e nunca abaixo do hedge delay):
+        sem ela o p95 só veria os vencedores e desceria, disparando cada vez mais hedges.
+        """
+        start = time.perf_counter()
+        parts = []
+
+        async def read():
+            async for chunk in backend.stream(message):
+                if not parts:
+                    first_token.set()
+                    metrics.observe(f"hedge.{backend.name}.ttft_s", time.perf_counter() - start)
+                parts.append(chunk)
+
+        try:
+            if backend.host is not None:
+                with llm_config.ollama_balancer.track(backend.host):
+                    await read()
+            else:
+                await read()
+        except asyncio.CancelledError:
+            if not parts:
+                censored = max(time.perf_counter() - start, self.hedge_delay(backend.name))
+                metrics.observe(f"hedge.{backend.name}.ttft_s", censored)
+                metrics.incr("hedge.censored_samples")
+            raise
+
+        first_token.set()
+        return "".join(parts)
+
+    # ------------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------------
+
+    async def arun(
+        self,
+        message: str,
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Executa o pedido com hedging
+
+        Returns:
+            Dict com success, response ou error, backend vencedor e se houve hedge
+        """
+        metrics.incr("hedge.requests")
+        self._hedge_credits = min(self.max_hedge_burst, self._hedge_credits + self.max_hedge_ratio)
+
+        affinity_key = conversation_id if conversation_id != "default" else None
+        primary, secondary = self._pick_backends(affinity_key)
+
+        primary_first_token = asyncio.Event()
+        primary_task = asyncio.create_task(self._consume(primary, message, primary_first_token))
+        tasks = {primary_task: primary}
+
+        first_token_wait = asyncio.create_task(primary_first_token.wait())
+        await asyncio.wait(
+            {primary_task, first_token_wait},
+            timeout=self.hedge_delay(primary.name),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        first_token_wait.cancel()
+
+        hedged = False
+        if not primary_first_token.is_set() and self._try_acquire_hedge():
+            hedged = True
+            metrics.incr("hedge.sent")
+            if self.verbose:
+                print(f"⏱️ Sem primeiro token de {primary.name}, hedge para {secondary.name}")
+            hedge_task = asyncio.create_task(self._consume(secondary, message, asyncio.Event()))
+            tasks[hedge_task] = secondary
+
+        errors = []
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(f"{tasks[task].name}: {task.exception()}")
+                        continue
+
+                    winner = tasks[task]
+                    if hedged:
+                        metrics.incr("hedge.wins" if winner is secondary else "hedge.losses")
+                    return {
+                        "success": True,
+                        "response": task.result(),
+                        "conversation_id": conversation_id,
+                        "backend": winner.name,
+                        "hedged": hedged
+                    }
+        finally:
+            # Cancelar o perdedor (ou tudo, se o pedido foi cancelado)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        return {
+            "success": False,
+            "error": "; ".join(errors),
+            "conversation_id": conversation_id,
+            "hedged": hedged
+        }
+
+
+# Instância global
+hedged_agent = AgentHedged(
+    max_hedge_ratio=float(os.getenv("HEDGE_MAX_RATIO", "0.1")),
+    default_hedge_delay=float(os.getenv("HEDGE_DEFAULT_DELAY", "2.0")),
+    verbose=True,
+)
@@ -5,33 +5,34 @@ Versão SIMPLES usando LangChain 1.2.x `create_agent`
 SEM memory, SEM tools - apenas LLM
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Optional
 from langchain.agents import create_agent
+from langchain_core.messages import HumanMessage
 from langchain_community.llms import Ollama
 from langchain_ollama import ChatOllama
-from config.llm_config import llm_config
+from config.llm_config import BalancedLLM, llm_config
+from .batch import BatchRunMixin
 
 
-class AgentOLlama:
+class AgentOLlama(BatchRunMixin):
     """
     Agente simples sem memory nem tools
     Perfeito para testes básicos
     """
 
-    def __init__(self, model_name: str = "gpt-oss:120b-cloud", verbose: bool = False):
-        """Inicializa o agente"""
+    def __init__(self, model_name: Optional[str] = None, verbose: bool = False):
+        """Inicializa o agente (model_name default: OLLAMA_MODEL)"""
+        model_name = model_name or llm_config.ollama_model
         try:
-            # Criar LLM
-            self.llm = ChatOllama(
-                model=model_name,
-                base_url=llm_config.ollama_url
-            )
+            self.model_name = model_name
+            self._host_llms = {}
+            self._host_agents = {}
+            
+            # LLM que escolhe o host no load balancer em cada chamada
+            self.llm = BalancedLLM(llm_config.ollama_balancer, self._get_host_llm)
             
             # Criar agent (versão simples)
-            self.agent = create_agent(
-                model=self.llm,
-                tools=[]  # Sem tools por agora
-            )
+            self.agent = self._get_host_agent(llm_config.ollama_url)
             
             self.verbose = verbose
             
@@ -44,6 +45,38 @@ class AgentOLlama:
             traceback.print_exc()
             self.agent = None
 
+    def _get_host_llm(self, base_url: str) -> ChatOllama:
+        """LLM para um host Ollama específico (criado sob pedido e reutilizado)"""
+        if base_url not in self._host_llms:
+            self._host_llms[base_url] = ChatOllama(
+                model=self.model_name,
+                base_url=base_url,
+                keep_alive=llm_config.ollama_keep_alive
+            )
+        return self._host_llms[base_url]
+
+    def _get_host_agent(self, base_url: str):
+        """Agent para um host Ollama específico (criado sob pedido e reutilizado)"""
+        if base_url not in self._host_agents:
+            self._host_agents[base_url] = create_agent(
+                model=self._get_host_llm(base_url),
+                tools=[]  # Sem tools por agora
+            )
+        return self._host_agents[base_url]
+
+    async def astream(self, message: str, base_url: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream do texto gerado, chunk a chunk (usado pelo modo hedging)
+        
+        Args:
+            message: Pergunta do utilizador
+            base_url: Host Ollama a usar (default: host principal)
+        """
+        llm = self._get_host_llm(base_url or llm_config.ollama_url)
+        async for chunk in llm.astream([HumanMessage(content=message)]):
+            if chunk.content:
+                yield chunk.content
+
     def run(
         self, 
         message: str, 
@@ -68,22 +101,49 @@ class AgentOLlama:
             }
 
         try:
-            # Invocar agent
-            result = self.agent.invoke({
-                "messages": [{"role": "user", "content": message}]
-            })
+            # Invocar agent no host escolhido pelo load balancer
+            affinity_key = conversation_id if conversation_id != "default" else None
+            with llm_config.ollama_balancer.request(affinity_key) as host:
+                result = self._get_host_agent(host.url).invoke({
+                    "messages": [{"role": "user", "content": message}]
+                })
             
-            # Extrair resposta
-            if isinstance(result, dict):
-                response = result.get("output", str(result))
-            else:
-                response = str(result)
+            return self._to_response(result, conversation_id)
             
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "conversation_id": conversation_id
+            }
+
+    async def arun(
+        self,
+        message: str,
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Versão async de run()
+        
+        Cancelar a task cancela também o pedido HTTP ao Ollama
+        (usado quando o cliente desliga a meio da resposta)
+        """
+        if self.agent is None:
             return {
-                "success": True,
-                "response": response,
+                "success": False,
+                "error": "Agente não inicializado",
                 "conversation_id": conversation_id
             }
+
+        try:
+            affinity_key = conversation_id if conversation_id != "default" else None
+            with llm_config.ollama_balancer.request(affinity_key) as host:
+                result = await self._get_host_agent(host.url).ainvoke({
+                    "messages": [{"role": "user", "content": message}]
+                })
+            
+            return self._to_response(result, conversation_id)
             
         except Exception as e:
             return {
@@ -92,6 +152,20 @@ class AgentOLlama:
                 "conversation_id": conversation_id
             }
 
+    @staticmethod
+    def _to_response(result: Any, conversation_id: str) -> Dict[str, Any]:
+        """Extrai a resposta do resultado do agent"""
+        if isinstance(result, dict):
+            response = result.get("output", str(result))
+        else:
+            response = str(result)
+        
+        return {
+            "success": True,
+            "response": response,
+            "conversation_id": conversation_id
+        }
+
 
 def create_crypto_agent(verbose: bool = False) -> AgentOLlama:
     """
@@ -1,10 +1,14 @@
 # backend/agents/simple_agent_api.py
 
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request, Response
 from pydantic import BaseModel
+import os
+from api.idempotency import IDEMPOTENCY_HEADER, run_idempotent
+from api.request_guard import run_until_disconnect
 from agents.agent_ollama import agent
+from agents.agent_hedged import hedged_agent
 from config.llm_config import llm_config
-from langchain_community.llms import Ollama
 from .chat_request import AgentChatRequest, ChatRequest
 # ============================================================================
 # ENDPOINTS - CHAT COM AGENT (FASE 1) 🚀
@@ -14,7 +18,12 @@ router = APIRouter()
     
 
 @router.post("/api/agent/chat")
-async def agent_chat(request: AgentChatRequest):
+async def agent_chat(
+    request: AgentChatRequest,
+    response: Response,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
     """
     ✨ NOVO - Endpoint para chat com o LangChain Agent
     
@@ -22,15 +31,27 @@ async def agent_chat(request: AgentChatRequest):
     - Memória conversacional
     - Uso de ferramentas (tools)
     - Raciocínio via ReAct pattern
+    - Idempotency-Key: retries não voltam a correr o agent
+    - Se o cliente desligar, o pedido ao LLM é cancelado
     
     Fase 1 Completa!
     """
-    try:
-        # Executar o agente
-        result = agent.run(
-            message=request.message,
-            conversation_id=request.conversation_id
-        )
+    async def execute():
+        hedge = request.hedge
+        if hedge is None:
+            hedge = os.getenv("AGENT_HEDGING", "false").lower() == "true"
+        
+        # Executar o agente (com hedging opcional no primeiro token)
+        if hedge:
+            result = await hedged_agent.arun(
+                message=request.message,
+                conversation_id=request.conversation_id
+            )
+        else:
+            result = await agent.arun(
+                message=request.message,
+                conversation_id=request.conversation_id
+            )
         
         if result["success"]:
             return {
@@ -45,7 +66,15 @@ async def agent_chat(request: AgentChatRequest):
                 "conversation_id": result["conversation_id"],
                 "success": False
             }
-            
+    
+    try:
+        return await run_until_disconnect(
+            http_request,
+            "agent_chat",
+            lambda: run_idempotent(idempotency_key, "agent_chat", request, execute, response)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "error": f"Erro ao processar mensagem: {str(e)}",
@@ -58,23 +87,34 @@ async def agent_chat(request: AgentChatRequest):
 # ============================================================================
 
 @router.post("/api/chat")
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    response: Response,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
     """
     Endpoint legacy de chat básico
     Recomenda-se usar /api/agent/chat para funcionalidades completas
     """
-    try:
-        llm = Ollama(
-            model="gpt-oss:120b-cloud",
-            base_url=llm_config.ollama_url
-        )
-        response = llm.invoke(request.message)
+    async def execute():
+        # Pedidos concorrentes ao mesmo host partilham um gate de concorrência
+        llm_response = await llm_config.get_batcher("ollama").submit(request.message)
         
         return {
-            "response": response,
+            "response": llm_response,
             "conversation_id": request.conversation_id,
             "note": "Use /api/agent/chat para funcionalidades avançadas"
         }
+    
+    try:
+        return await run_until_disconnect(
+            http_request,
+            "chat",
+            lambda: run_idempotent(idempotency_key, "chat", request, execute, response)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "error": f"Erro ao conectar ao Ollama: {str(e)}",
@@ -0,0 +1,99 @@
+# backend/agents/agent_openai.py
+"""
+Agente OpenAI usando LLMConfig
+Versão SIMPLES - SEM memory, SEM tools
+"""
+
+from typing import Dict, Any
+from langchain_core.messages import HumanMessage
+from config.llm_config import llm_config
+from .batch import BatchRunMixin
+
+
+class AgentOpenAI(BatchRunMixin):
+    """Agente simples com OpenAI"""
+
+    def __init__(self, model_name: str = "gpt-4o-mini", verbose: bool = False):
+        """Inicializa o agente OpenAI"""
+        try:
+            # Criar LLM
+            self.llm = llm_config.get_llm("openai", model=model_name)
+            
+            self.verbose = verbose
+            
+            if self.verbose:
+                print(f"✅ Agent criado com OpenAI ({model_name})")
+                
+        except Exception as e:
+            print(f"❌ Erro ao criar agent OpenAI: {e}")
+            self.llm = None
+
+    def run(
+        self, 
+        message: str, 
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Executa o agente
+        
+        Args:
+            message: Pergunta do utilizador
+            conversation_id: ID da conversa
+            
+        Returns:
+            Dict com success, response ou error
+        """
+        if self.llm is None:
+            return {
+                "success": False,
+                "error": "Agente OpenAI não inicializado",
+                "conversation_id": conversation_id
+            }
+
+        try:
+            # Invocar OpenAI
+            result = self.llm.invoke([HumanMessage(content=message)])
+            
+            return {
+                "success": True,
+                "response": result.content,
+                "conversation_id": conversation_id
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "conversation_id": conversation_id
+            }
+
+    async def arun(
+        self, 
+        message: str, 
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Versão async de run() (cancelável a meio do pedido HTTP)"""
+        if self.llm is None:
+            return {
+                "success": False,
+                "error": "Agente OpenAI não inicializado",
+                "conversation_id": conversation_id
+            }
+
+        try:
+            result = await self.llm.ainvoke([HumanMessage(content=message)])
+            
+            return {
+                "success": True,
+                "response": result.content,
+                "conversation_id": conversation_id
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "conversation_id": conversation_id
+            }
@@ -0,0 +1,85 @@
+# backend/agents/agent_routed.py
+"""
+Agente com routing por complexidade
+Pedidos simples vão para o modelo local pequeno, os restantes para o
+modelo grande ou para o Claude (ver agents/model_router.py)
+"""
+
+from typing import Dict, Any
+
+from config.llm_config import llm_config
+from .batch import BatchRunMixin
+from .model_router import model_router
+
+
+class AgentRouted(BatchRunMixin):
+    """Escolhe o agent pelo tier decidido no ModelRouter"""
+
+    def __init__(self, router=None, verbose: bool = False):
+        self.router = router or model_router
+        self.verbose = verbose
+        self._agents: Dict[str, Any] = {}
+
+    def _get_agent(self, tier: str):
+        """Agents criados sob pedido e reutilizados"""
+        if tier not in self._agents:
+            if tier == "small":
+                from .agent_ollama import AgentOLlama
+                self._agents[tier] = AgentOLlama(model_name=llm_config.ollama_small_model)
+            elif tier == "large":
+                from .agent_ollama import agent
+                self._agents[tier] = agent
+            elif tier == "claude":
+                from .agent_claude import AgentClaude
+                self._agents[tier] = AgentClaude(model_name="claude-sonnet-4")
+            else:
+                raise ValueError(f"Tier desconhecido: {tier}")
+        return self._agents[tier]
+
+    def run(
+        self,
+        message: str,
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Classifica o pedido e executa-o no agent do tier escolhido
+        
+        Returns:
+            Dict com success, response ou error e a decisão de routing
+        """
+        decision = self._route(message)
+        result = self._get_agent(decision.tier).run(
+            message=message,
+            conversation_id=conversation_id,
+            **kwargs
+        )
+        result["route"] = decision.to_dict()
+        return result
+
+    async def arun(
+        self,
+        message: str,
+        conversation_id: str = "default",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Versão async de run() (cancelável a meio da chamada ao modelo)"""
+        decision = self._route(message)
+        result = await self._get_agent(decision.tier).arun(
+            message=message,
+            conversation_id=conversation_id,
+            **kwargs
+        )
+        result["route"] = decision.to_dict()
+        return result
+
+    def _route(self, message: str):
+        decision = self.router.route(message)
+        
+        if self.verbose:
+            print(f"🔀 Router: {decision.tier} ({decision.reason}, {decision.overhead_ms:.3f} ms)")
+        return decision
+
+
+# Instância global
+routed_agent = AgentRouted()
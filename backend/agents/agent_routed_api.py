@@ -0,0 +1,43 @@
+# backend/agents/agent_routed_api.py
+
+from typing import Optional
+from fastapi import APIRouter, Header, Request, Response
+from agents.agent_routed import routed_agent
+from api.idempotency import IDEMPOTENCY_HEADER, run_idempotent
+from api.request_guard import run_until_disconnect
+from agents.model_router import model_router
+from .chat_request import AgentChatRequest
+
+router = APIRouter()
+
+
+@router.post("/api/agent/chat/routed")
+async def agent_chat_routed(
+    request: AgentChatRequest,
+    response: Response,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """
+    Chat com routing por complexidade
+    
+    Perguntas simples vão para o modelo pequeno; análises mais pesadas
+    para o modelo grande ou Claude
+    """
+    async def execute():
+        return await routed_agent.arun(
+            message=request.message,
+            conversation_id=request.conversation_id
+        )
+    return await run_until_disconnect(
+        http_request,
+        "agent_chat_routed",
+        lambda: run_idempotent(idempotency_key, "agent_chat_routed", request, execute, response)
+    )
+
+
+@router.get("/api/agent/router/decisions")
+async def get_router_decisions(limit: int = 50):
+    """Últimas decisões do model router"""
+    decisions = list(model_router.decisions)[-limit:]
+    return {"count": len(decisions), "decisions": decisions}
@@ -16,7 +16,7 @@ class CryptoAgentSingleton:
     def get_agent(self) -> AgentOLlama:
         """Retorna o agent atual"""
         if self._current_agent is None:
-            self._current_agent = AgentOLlama(model_name="gpt-oss:120b-cloud")
+            self._current_agent = AgentOLlama()
         return self._current_agent
     
     def switch_llm(self, llm_type: str) -> bool:
@@ -27,7 +27,7 @@ class CryptoAgentSingleton:
         if llm_type == "claude":
             self._current_agent = AgentClaude(model_name="claude-sonnet-4")
         elif llm_type == "ollama":
-            self._current_agent = AgentOLlama(model_name="gpt-oss:120b-cloud")
+            self._current_agent = AgentOLlama()
         else:
             raise ValueError(f"LLM desconhecida: {llm_type}")
         
@@ -1,27 +1,48 @@
+from typing import Optional
 from agents.agent_singleton import agent_manager
-from fastapi import APIRouter
+from config.model_warmup import model_warmup
+from fastapi import APIRouter, Header, Request, Response
+from api.idempotency import IDEMPOTENCY_HEADER, run_idempotent
+from api.request_guard import run_until_disconnect
 from .chat_request import AgentChatRequest
     
-router = APIRouter()
+async def _start_warmup():
+    # O provider inicial é o do agent_manager (o que recebe os pedidos), não o DEFAULT_LLM
+    await model_warmup.start(agent_manager.get_current_llm())
+
+router = APIRouter(on_startup=[_start_warmup], on_shutdown=[model_warmup.stop])
 
 @router.post("/api/agent/chat/singleton")
-async def agent_chat(request: AgentChatRequest):
+async def agent_chat(
+    request: AgentChatRequest,
+    response: Response,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
     """Chat - usa sempre a LLM atual"""
-    agent = agent_manager.get_agent()
-    result = agent.run(
-        message=request.message,
-        conversation_id="test_user_1"
+    async def execute():
+        agent = agent_manager.get_agent()
+        return await agent.arun(
+            message=request.message,
+            conversation_id="test_user_1"
+        )
+    return await run_until_disconnect(
+        http_request,
+        "agent_chat_singleton",
+        lambda: run_idempotent(idempotency_key, "agent_chat_singleton", request, execute, response)
     )
-    return result
 
 @router.post("/api/agent/switch-llm")
 async def switch_llm(llm_type: str):
-    """Troca a LLM globalmente"""
+    """Troca a LLM globalmente (e volta a aquecer os modelos se for Ollama)"""
     changed = agent_manager.switch_llm(llm_type)
+    if changed:
+        model_warmup.switch(llm_type)
     return {
         "success": True,
         "changed": changed,
-        "current_llm": agent_manager.get_current_llm()
+        "current_llm": agent_manager.get_current_llm(),
+        "warmup": model_warmup.gate()
     }
 
 @router.get("/api/agent/current-llm")
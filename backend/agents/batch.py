@@ -0,0 +1,174 @@
+# backend/agents/batch.py
+"""
+Execução em batch de muitas perguntas com paralelismo limitado
+
+Os resultados são devolvidos pela ordem em que terminam (não pela ordem
+de entrada) e cada erro fica no seu item, sem falhar o batch inteiro.
+"""
+
+import asyncio
+import inspect
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Tuple
+
+
+async def run_indexed_batch(
+    run_fn: Callable[..., Any],
+    items: Iterable[Tuple[int, str]],
+    max_concurrency: int = 4,
+    conversation_prefix: str = "batch",
+    rate_limiter=None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Executa run_fn(message=..., conversation_id=...) para cada (index, mensagem)
+
+    Os items são consumidos de forma lazy (podem vir de um ficheiro em stream).
+
+    Args:
+        run_fn: Função síncrona ou async que devolve o dict dos agents
+                ({"success", "response" | "error", ...})
+        items: Iterável de (index, mensagem)
+        max_concurrency: Nº máximo de execuções em simultâneo
+        conversation_prefix: Prefixo do conversation_id de cada item
+        rate_limiter: Opcional, objeto com `async acquire()` chamado antes de cada item
+
+    Yields:
+        Dict por item com index, success, response ou error e duration_s
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    pending = iter(items)
+    is_async = inspect.iscoroutinefunction(run_fn)
+    finished = object()
+
+    async def run_one(index: int, message: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        kwargs = {"message": message, "conversation_id": f"{conversation_prefix}_{index}"}
+        try:
+            if is_async:
+                result = await run_fn(**kwargs)
+            else:
+                result = await asyncio.to_thread(run_fn, **kwargs)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        item = {"index": index, "success": bool(result.get("success"))}
+        if item["success"]:
+            item["response"] = result.get("response")
+        else:
+            item["error"] = result.get("error")
+        item["duration_s"] = round(time.perf_counter() - start, 3)
+        return item
+
+    async def worker():
+        try:
+            for index, message in pending:
+                if rate_limiter is not None:
+                    await rate_limiter.acquire()
+                await queue.put(await run_one(index, message))
+        finally:
+            await queue.put(finished)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, max_concurrency))]
+    try:
+        running = len(workers)
+        while running:
+            item = await queue.get()
+            if item is finished:
+                running -= 1
+                continue
+            yield item
+        # Propaga exceções do iterável de entrada (ex: linha JSON inválida)
+        for task in workers:
+            task.result()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def run_batch(
+    run_fn: Callable[..., Any],
+    messages: List[str],
+    max_concurrency: int = 4,
+    conversation_prefix: str = "batch",
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Executa run_fn(message=..., conversation_id=...) para cada mensagem da lista
+
+    Yields:
+        Dict por item com index (posição na lista), success, response ou error e duration_s
+    """
+    async for item in run_indexed_batch(
+        run_fn,
+        enumerate(messages),
+        max_concurrency=min(max_concurrency, len(messages)),
+        conversation_prefix=conversation_prefix,
+    ):
+        yield item
+
+
+_batch_agents: Dict[str, Any] = {}
+
+AGENT_TYPES = ("ollama", "claude", "routed", "fallback", "langgraph")
+
+
+def get_run_fn(agent_type: str, use_async: bool = True) -> Callable[..., Any]:
+    """
+    Função run(message, conversation_id) de um agent configurado
+
+    Args:
+        agent_type: "ollama", "claude", "routed", "fallback" ou "langgraph"
+        use_async: Devolve a versão async (arun), cancelável a meio do pedido;
+                   com False devolve a versão síncrona (para usar em threads)
+    """
+    if agent_type == "langgraph":
+        from langgraph.agent_langgraph_api import get_langgraph_agent
+        from langgraph.agent_langgraph import arun_langgraph_agent, run_langgraph_agent
+        app = get_langgraph_agent()
+
+        if use_async:
+            async def arun_graph(message: str, conversation_id: str):
+                result = await arun_langgraph_agent(app, message, conversation_history=[])
+                return {"success": True, "response": result["response"]}
+
+            return arun_graph
+
+        def run_graph(message: str, conversation_id: str):
+            result = run_langgraph_agent(app, message, conversation_history=[])
+            return {"success": True, "response": result["response"]}
+
+        return run_graph
+
+    if agent_type == "ollama":
+        from .agent_ollama import agent
+    elif agent_type == "claude":
+        if "claude" not in _batch_agents:
+            from .agent_claude import AgentClaude
+            _batch_agents["claude"] = AgentClaude(model_name="claude-sonnet-4")
+        agent = _batch_agents["claude"]
+    elif agent_type == "routed":
+        from .agent_routed import routed_agent as agent
+    elif agent_type == "fallback":
+        from .agent_fallback import fallback_agent as agent
+    else:
+        raise ValueError(f"Agent desconhecido: {agent_type}")
+    return agent.arun if use_async else agent.run
+
+
+class BatchRunMixin:
+    """Adiciona arun_batch aos agents que têm run(message, conversation_id)"""
+
+    async def arun_batch(
+        self,
+        messages: List[str],
+        max_concurrency: int = 4,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Executa várias perguntas com paralelismo limitado
+
+        Uso:
+            async for item in agent.arun_batch(["BTC?", "ETH?"], max_concurrency=8):
+                print(item["index"], item.get("response"))
+        """
+        run_fn = getattr(self, "arun", self.run)
+        async for item in run_batch(run_fn, messages, max_concurrency=max_concurrency):
+            yield item
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class ChatRequest(BaseModel):
@@ -9,4 +10,5 @@ class AgentChatRequest(BaseModel):
     message: str
     conversation_id: str = "default"
     memory_type: str = "buffer"  # "buffer", "window", "summary"
-    verbose: bool = False
\ No newline at end of file
+    verbose: bool = False
+    hedge: Optional[bool] = None  # None = usa AGENT_HEDGING do .env
\ No newline at end of file
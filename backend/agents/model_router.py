@@ -0,0 +1,205 @@
+# backend/agents/model_router.py
+"""
+Router de modelos por complexidade do pedido
+
+Classifica cada pedido de forma barata (heurísticas com regex pré-compiladas,
+classificador de embeddings opcional) e escolhe o tier:
+- "small"  -> modelo local pequeno e rápido (OLLAMA_SMALL_MODEL)
+- "large"  -> modelo grande (OLLAMA_MODEL)
+- "claude" -> Claude, para pedidos de raciocínio mais pesado
+
+As regras são configuráveis por JSON (MODEL_ROUTER_RULES_FILE ou
+MODEL_ROUTER_RULES) e cada decisão é registada no log e nas métricas.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("small", "large", "claude")
+
+DEFAULT_RULES = {
+    # Regras explícitas, avaliadas por ordem; a primeira que casar decide
+    "rules": [
+        {"name": "greeting", "tier": "small",
+         "pattern": r"^\s*(ol[aá]|oi|hi|hello|hey|bom dia|boa tarde|boa noite|obrigad[oa]|thanks?)\W*$"},
+        {"name": "short_definition", "tier": "small",
+         "pattern": r"^\s*(o que [eé]|what is|what's|quem [eé]|who is)\s+[\w\s\-\.]{1,40}\??\s*$"},
+    ],
+    # Heurística de complexidade: keywords casam em palavras inteiras;
+    # "*" no fim marca um radical (previs* -> previsão, previsões)
+    "complex_keywords": [
+        "analisa*", "análise", "analy*", "analys*", "compara*", "compare", "explica porqu*",
+        "porquê", "why", "estratégia*", "strateg*", "previs*", "predict*", "forecast*",
+        "passo a passo", "step by step", "código", "code", "implementa*", "implement*",
+        "risco*", "risk*", "resume", "resumo", "summar*", "avalia*", "evaluat*",
+    ],
+    # Pedidos abertos (explicações, visões gerais): não são para o modelo pequeno
+    "open_keywords": [
+        "explica*", "explain*", "descreve", "describe", "tell me about", "fala-me",
+        "fala me", "como funciona", "how does", "how do", "diferença*", "difference*",
+        "vale a pena", "should i", "devo", "opini*", "perspetiva*", "outlook",
+    ],
+    "keyword_weight": 2.0,
+    "open_keyword_weight": 1.0,
+    "words_per_point": 25,
+    "question_weight": 1.0,
+    "code_weight": 6.0,
+    "small_max_score": 0.5,
+    "claude_min_score": 6.0,
+}
+
+
+def compile_keywords(keywords: List[str]) -> Optional["re.Pattern"]:
+    """Alternância de keywords com limites de palavra (sufixo * = radical)"""
+    if not keywords:
+        return None
+    parts = [
+        re.escape(k[:-1]) + r"\w*" if k.endswith("*") else re.escape(k)
+        for k in keywords
+    ]
+    return re.compile(r"\b(?:" + "|".join(parts) + r")\b", re.IGNORECASE)
+
+
+class RouteDecision:
+    """Resultado de uma decisão de routing"""
+
+    __slots__ = ("tier", "reason", "score", "overhead_ms")
+
+    def __init__(self, tier: str, reason: str, score: float, overhead_ms: float):
+        self.tier = tier
+        self.reason = reason
+        self.score = score
+        self.overhead_ms = overhead_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "tier": self.tier,
+            "reason": self.reason,
+            "score": round(self.score, 2),
+            "overhead_ms": round(self.overhead_ms, 4),
+        }
+
+
+def load_router_rules() -> dict:
+    """Carrega as regras do router (ficheiro JSON, JSON inline ou defaults)"""
+    rules = dict(DEFAULT_RULES)
+    rules_file = os.getenv("MODEL_ROUTER_RULES_FILE")
+    rules_json = os.getenv("MODEL_ROUTER_RULES")
+    try:
+        if rules_file:
+            with open(rules_file, "rt", encoding="utf-8") as f:
+                rules.update(json.load(f))
+        elif rules_json:
+            rules.update(json.loads(rules_json))
+    except Exception as e:
+        print(f"⚠️ Regras do model router inválidas, a usar defaults: {e}")
+    return rules
+
+
+class EmbeddingClassifier:
+    """
+    Classificador opcional por similaridade com exemplos de cada tier
+    Requer sentence-transformers; se não estiver instalado fica desativado
+    """
+
+    def __init__(self, examples: Dict[str, List[str]], model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.centroids = {}
+        for tier, phrases in examples.items():
+            vectors = self.model.encode(phrases, normalize_embeddings=True)
+            centroid = vectors.mean(axis=0)
+            self.centroids[tier] = centroid / ((centroid ** 2).sum() ** 0.5)
+
+    def classify(self, text: str) -> str:
+        vector = self.model.encode([text], normalize_embeddings=True)[0]
+        return max(self.centroids, key=lambda tier: float(vector @ self.centroids[tier]))
+
+
+class ModelRouter:
+    """Escolhe o tier de modelo para cada pedido"""
+
+    def __init__(self, rules: Optional[dict] = None, use_embeddings: bool = False, history_size: int = 200):
+        self.rules = rules or load_router_rules()
+        for rule in self.rules.get("rules", []):
+            if rule["tier"] not in TIERS:
+                raise ValueError(f"Tier desconhecido na regra {rule['name']}: {rule['tier']}")
+        self._compiled_rules = [
+            (rule["name"], rule["tier"], re.compile(rule["pattern"], re.IGNORECASE))
+            for rule in self.rules.get("rules", [])
+        ]
+        self._keyword_re = compile_keywords(self.rules.get("complex_keywords", []))
+        self._open_re = compile_keywords(self.rules.get("open_keywords", []))
+        self._code_re = re.compile(r"```|\bdef |\bclass |\bfunction\b|\{.*\}|;\s*$", re.MULTILINE)
+        self.decisions = deque(maxlen=history_size)
+
+        self.embedding_classifier = None
+        if use_embeddings and self.rules.get("embedding_examples"):
+            unknown = set(self.rules["embedding_examples"]) - set(TIERS)
+            if unknown:
+                raise ValueError(f"Tiers desconhecidos em embedding_examples: {sorted(unknown)}")
+            try:
+                self.embedding_classifier = EmbeddingClassifier(self.rules["embedding_examples"])
+            except Exception as e:
+                print(f"⚠️ Classificador de embeddings indisponível: {e}")
+
+    def score(self, message: str) -> float:
+        """Pontuação de complexidade (heurística, sem chamadas externas)"""
+        rules = self.rules
+        score = len(message.split()) / rules["words_per_point"]
+        score += max(0, message.count("?") - 1) * rules["question_weight"]
+        if self._keyword_re is not None:
+            score += len(self._keyword_re.findall(message)) * rules["keyword_weight"]
+        if self._open_re is not None and self._open_re.search(message):
+            score += rules.get("open_keyword_weight", 0.0)
+        if self._code_re.search(message):
+            score += rules["code_weight"]
+        return score
+
+    def route(self, message: str) -> RouteDecision:
+        """Classifica o pedido e regista a decisão"""
+        start = time.perf_counter()
+
+        tier, reason, score = None, None, 0.0
+        for name, rule_tier, pattern in self._compiled_rules:
+            if pattern.search(message):
+                tier, reason = rule_tier, f"rule:{name}"
+                break
+
+        if tier is None:
+            score = self.score(message)
+            if score <= self.rules["small_max_score"]:
+                tier, reason = "small", "score"
+            elif score >= self.rules["claude_min_score"]:
+                tier, reason = "claude", "score"
+            elif self.embedding_classifier is not None:
+                # Só consulta embeddings na zona ambígua (fora do caminho rápido)
+                tier, reason = self.embedding_classifier.classify(message), "embeddings"
+            else:
+                tier, reason = "large", "score"
+
+        decision = RouteDecision(tier, reason, score, (time.perf_counter() - start) * 1000)
+        self.decisions.append(decision.to_dict())
+        metrics.incr(f"router.tier.{tier}")
+        metrics.observe("router.overhead_ms", decision.overhead_ms)
+        logger.info(
+            "model_router tier=%s reason=%s score=%.2f overhead_ms=%.4f",
+            tier, reason, score, decision.overhead_ms,
+        )
+        return decision
+
+
+# Instância global
+model_router = ModelRouter(
+    use_embeddings=os.getenv("MODEL_ROUTER_EMBEDDINGS", "false").lower() == "true"
+)
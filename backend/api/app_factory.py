@@ -1,5 +1,12 @@
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from config.llm_config import llm_config
+from utils.tokens import preload_encoding
+from .compression import CompressionMiddleware, compression_settings
+from .rate_limiter import RateLimitMiddleware, rate_limit_settings
+from .responses import FastJSONResponse
 
 class FastAPIAppFactory:
     @staticmethod
@@ -8,7 +15,15 @@ class FastAPIAppFactory:
             title="LangChain Llama3 Exercise API",
             description="API for LangChain and Llama3 integration exercise",
             version="1.0.0",
+            default_response_class=FastJSONResponse,
         )
+
+        # Rate limiting por IP/API key (RATE_LIMIT_ENABLED=false desativa);
+        # registado antes do CORS para os 429 também levarem os headers CORS
+        if os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true":
+            rate_limit = rate_limit_settings()
+            app.add_middleware(RateLimitMiddleware, **rate_limit)
+            app.add_event_handler("shutdown", rate_limit["backend"].close)
         
         app.add_middleware(
         CORSMiddleware,
@@ -24,4 +39,15 @@ class FastAPIAppFactory:
         allow_headers=["*"],
 )
 
+        # Compressão gzip/brotli conforme o Accept-Encoding (COMPRESSION_ENABLED=false desativa)
+        if os.getenv("COMPRESSION_ENABLED", "true").lower() == "true":
+            app.add_middleware(CompressionMiddleware, **compression_settings())
+
+        # Health probes dos hosts Ollama (load balancer)
+        app.add_event_handler("startup", llm_config.ollama_balancer.start_health_checks)
+        app.add_event_handler("shutdown", llm_config.ollama_balancer.stop_health_checks)
+
+        # Tokenizer (tiktoken) carregado fora do event loop
+        app.add_event_handler("startup", preload_encoding)
+
         return app
\ No newline at end of file
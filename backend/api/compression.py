@@ -0,0 +1,209 @@
+# backend/api/compression.py
+"""
+Compressão das respostas negociada por cliente (Accept-Encoding)
+
+- brotli (se o pacote brotli/brotlicffi estiver instalado) ou gzip, conforme
+  as preferências (q-values) do cliente; em empate prefere brotli
+- Respostas pequenas (< COMPRESSION_MIN_SIZE) seguem sem compressão
+- Streaming (SSE, NDJSON): cada chunk é comprimido e despejado logo (sync
+  flush), sem acumular o corpo inteiro nem atrasar eventos
+- Bytes originais vs comprimidos ficam nas métricas (compression.*)
+
+Middleware ASGI puro: não passa pelo BaseHTTPMiddleware, por isso não
+bufferiza respostas nem interfere com o cancelamento dos pedidos.
+"""
+
+import os
+import zlib
+from typing import Dict, List, Optional
+
+from utils.metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Conteúdos que já vêm comprimidos (não vale a pena voltar a comprimir)
+INCOMPRESSIBLE_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "font/woff")
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encoding -> {encoding: q}"""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def choose_encoding(header: Optional[str], available: List[str]) -> Optional[str]:
+    """Melhor encoding aceite pelo cliente entre os disponíveis (por ordem de preferência)"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Comprime as respostas HTTP com gzip ou brotli"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        """
+        Args:
+            minimum_size: Respostas (não streaming) abaixo disto não são comprimidas
+            gzip_level: 1 (rápido) a 9 (menor)
+            brotli_quality: 0 (rápido) a 11 (menor); 4-5 é bom para respostas dinâmicas
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.available = (["br"] if brotli is not None else []) + ["gzip"]
+
+    def _stream(self, encoding: str):
+        if encoding == "br":
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept, self.available)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        stream = None  # None = ainda por decidir; False = passa sem compressão
+        raw_bytes = 0
+        compressed_bytes = 0
+
+        async def compressed_send(message):
+            nonlocal start_message, stream, raw_bytes, compressed_bytes
+
+            if message["type"] == "http.response.start":
+                # Só se decide com o primeiro chunk do corpo
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or stream is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is None:
+                if not self._should_compress(start_message, body, more_body):
+                    stream = False
+                    metrics.incr("compression.skipped")
+                    await send(start_message)
+                    await send(message)
+                    return
+                stream = self._stream(encoding)
+                headers = [
+                    (name, value) for name, value in start_message["headers"]
+                    if name not in (b"content-length", b"vary")
+                ]
+                vary = [value for name, value in start_message["headers"] if name == b"vary"]
+                headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                if not more_body:
+                    # Corpo completo: comprime de uma vez e mantém o Content-Length
+                    data = stream.finish(body)
+                    headers.append((b"content-length", str(len(data)).encode("latin-1")))
+                    start_message["headers"] = headers
+                    self._count(encoding, len(body), len(data))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                start_message["headers"] = headers
+                await send(start_message)
+
+            data = stream.chunk(body) if more_body else stream.finish(body)
+            raw_bytes += len(body)
+            compressed_bytes += len(data)
+            if not more_body:
+                self._count(encoding, raw_bytes, compressed_bytes)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, compressed_send)
+
+    def _should_compress(self, start_message, body: bytes, more_body: bool) -> bool:
+        if start_message["status"] < 200 or start_message["status"] in (204, 304):
+            return False
+        content_type = b""
+        for name, value in start_message["headers"]:
+            if name == b"content-encoding":
+                return False  # Já comprimida
+            if name == b"content-type":
+                content_type = value
+        if content_type.decode("latin-1").startswith(INCOMPRESSIBLE_TYPES):
+            return False
+        # Em streaming o tamanho total não se sabe: comprime sempre
+        return more_body or len(body) >= self.minimum_size
+
+    @staticmethod
+    def _count(encoding: str, raw: int, compressed: int):
+        metrics.incr("compression.responses")
+        metrics.incr("compression.bytes_raw", raw)
+        metrics.incr("compression.bytes_compressed", compressed)
+        metrics.incr(f"compression.{encoding}.bytes_raw", raw)
+        metrics.incr(f"compression.{encoding}.bytes_compressed", compressed)
+
+
+def compression_settings() -> Dict[str, int]:
+    """Configuração por env (COMPRESSION_*)"""
+    return {
+        "minimum_size": int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+        "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+    }
@@ -0,0 +1,174 @@
+# backend/api/idempotency.py
+"""
+Idempotency keys para os endpoints de chat
+
+Um cliente que repete o pedido com o mesmo header Idempotency-Key:
+- enquanto o primeiro run ainda corre -> fica à espera desse mesmo run
+- depois de terminar -> recebe o resultado guardado (sem voltar a chamar o LLM)
+
+Os resultados ficam num store limitado (LRU) com TTL.
+Reutilizar a chave com outro payload devolve 422.
+O run só é cancelado quando todos os clientes à espera dele desistem.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+from utils.metrics import metrics
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def fingerprint(payload: Any) -> str:
+    """Hash estável do payload do pedido"""
+    if hasattr(payload, "model_dump"):
+        payload = payload.model_dump()
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _is_success(result: Any) -> bool:
+    """Os endpoints de chat devolvem erros como dict (success=False ou chave error)"""
+    if isinstance(result, dict):
+        return result.get("success") is not False and "error" not in result
+    return True
+
+
+class IdempotencyStore:
+    """Runs em curso + resultados concluídos (LRU com TTL)"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._in_flight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        self._waiters: Dict[str, int] = {}
+        self._results: "OrderedDict[str, Tuple[str, Any, float]]" = OrderedDict()
+
+    def _get_result(self, key: str) -> Optional[Tuple[str, Any]]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        entry_fingerprint, result, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return entry_fingerprint, result
+
+    def _store_result(self, key: str, entry_fingerprint: str, result: Any):
+        self._results[key] = (entry_fingerprint, result, time.monotonic() + self.ttl_seconds)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+            metrics.incr("idempotency.evicted")
+
+    async def run(
+        self,
+        key: str,
+        payload_fingerprint: str,
+        fn: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Executa fn uma única vez por chave
+
+        Returns:
+            (resultado, replayed) - replayed=True se não houve novo run
+        """
+        stored = self._get_result(key)
+        if stored is not None:
+            self._check_fingerprint(key, stored[0], payload_fingerprint)
+            metrics.incr("idempotency.replayed")
+            return stored[1], True
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self._check_fingerprint(key, in_flight[0], payload_fingerprint)
+            metrics.incr("idempotency.attached")
+            return await self._wait(key, in_flight[1]), True
+
+        task = asyncio.create_task(fn())
+        self._in_flight[key] = (payload_fingerprint, task)
+
+        def on_done(done: asyncio.Task):
+            self._in_flight.pop(key, None)
+            # Só guarda sucessos; erros podem ser repetidos pelo cliente
+            if not done.cancelled() and done.exception() is None and _is_success(done.result()):
+                self._store_result(key, payload_fingerprint, done.result())
+
+        task.add_done_callback(on_done)
+        metrics.incr("idempotency.executed")
+        return await self._wait(key, task), False
+
+    async def _wait(self, key: str, task: asyncio.Task) -> Any:
+        """
+        Espera pelo run partilhado; o shield mantém-no vivo enquanto houver
+        outro cliente à espera, o último a desistir cancela-o
+        """
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+                metrics.incr("idempotency.cancelled")
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    @staticmethod
+    def _check_fingerprint(key: str, expected: str, actual: str):
+        if expected != actual:
+            metrics.incr("idempotency.conflict")
+            # A chave interna é "<scope>:<chave do cliente>"
+            client_key = key.partition(":")[2] or key
+            raise HTTPException(
+                status_code=422,
+                detail=f"{IDEMPOTENCY_HEADER} '{client_key}' já foi usada com outro pedido"
+            )
+
+
+# Instância global
+idempotency_store = IdempotencyStore(
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600")),
+)
+
+
+async def run_idempotent(
+    idempotency_key: Optional[str],
+    scope: str,
+    payload: Any,
+    fn: Callable[[], Awaitable[Any]],
+    response: Optional[Response] = None,
+) -> Any:
+    """
+    Helper para os endpoints: sem chave corre fn normalmente
+
+    Args:
+        idempotency_key: Valor do header Idempotency-Key (ou None)
+        scope: Identifica o endpoint (a mesma chave noutro endpoint é outro run)
+        payload: Body do pedido (para detetar reutilização da chave)
+        fn: Coroutine factory que executa o pedido
+        response: Response do FastAPI, para marcar replays no header
+    """
+    if not idempotency_key:
+        return await fn()
+
+    result, replayed = await idempotency_store.run(
+        f"{scope}:{idempotency_key}",
+        fingerprint(payload),
+        fn,
+    )
+    if response is not None and replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
@@ -0,0 +1,475 @@
+# backend/api/rate_limiter.py
+"""
+Rate limiting por cliente (token bucket por IP e por API key)
+
+- Cada pedido consome um token do bucket do IP e, se trouxer API key
+  (X-API-Key ou Authorization: Bearer), também do bucket da key; só passa
+  se ambos tiverem tokens (trocar de key não contorna o limite do IP)
+- Limites por rota: health checks baratos vs chat/LLM caro (RATE_LIMIT_*)
+- Backend local (por processo) ou partilhado entre workers num servidor
+  compatível com Redis (Redis/Valkey), com fallback para o local se falhar
+- Headers RateLimit-Limit/Remaining/Reset/Policy (draft IETF) em todas as
+  respostas limitadas; 429 + Retry-After quando o bucket está vazio
+
+Middleware ASGI puro (como o de compressão); WebSockets são limitados no
+connect (fecha com 1008 antes do accept). O token do connect/pedido é um
+adiantamento: os handlers cobram o custo real pela ClientQuota do scope
+(cada mensagem WebSocket, cada item de um batch).
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.exceptions import HTTPException
+
+from utils.metrics import metrics
+from utils.rate_limit import TokenBucket
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+class RateLimitRule:
+    """Limite aplicado a um grupo de rotas"""
+
+    __slots__ = ("name", "per_minute", "burst", "paths", "prefixes", "suffixes", "methods")
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: float,
+        burst: float,
+        paths: Sequence[str] = (),
+        prefixes: Sequence[str] = (),
+        suffixes: Sequence[str] = (),
+        methods: Optional[Sequence[str]] = None,
+    ):
+        """
+        Args:
+            per_minute: Tokens repostos por minuto (taxa sustentada)
+            burst: Capacidade do bucket (pedidos seguidos permitidos)
+            paths / prefixes / suffixes: Rotas abrangidas (vazio = todas)
+            methods: Só estes métodos HTTP (None = todos)
+        """
+        self.name = name
+        self.per_minute = per_minute
+        self.burst = burst
+        self.paths = tuple(paths)
+        self.prefixes = tuple(prefixes)
+        self.suffixes = tuple(suffixes)
+        self.methods = tuple(methods) if methods else None
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+    @property
+    def window(self) -> int:
+        """Segundos para encher o bucket vazio"""
+        return max(1, math.ceil(self.burst / self.rate))
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods is not None and method not in self.methods:
+            return False
+        if not (self.paths or self.prefixes or self.suffixes):
+            return True
+        return path in self.paths or path.startswith(self.prefixes) or path.endswith(self.suffixes)
+
+
+class RateLimitDecision:
+    __slots__ = ("allowed", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, remaining: float, retry_after: float):
+        self.allowed = allowed
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class LocalRateLimitBackend:
+    """Buckets em memória (um conjunto por processo/worker), LRU limitado"""
+
+    name = "local"
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str, rule: RateLimitRule) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rule.rate, capacity=rule.burst)
+            self._buckets[key] = bucket
+            # Os clientes inativos há mais tempo saem primeiro (voltam com o bucket cheio)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                metrics.incr("rate_limit.evicted")
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def acquire(self, keys: List[str], rule: RateLimitRule, cost: float = 1.0) -> RateLimitDecision:
+        """Consome `cost` tokens de todos os buckets, ou de nenhum"""
+        with self._lock:
+            buckets = [self._bucket(key, rule) for key in keys]
+            levels = [bucket.tokens for bucket in buckets]
+            retry_after = max((cost - tokens) / rule.rate for tokens in levels)
+            if retry_after > 0:
+                return RateLimitDecision(False, min(levels), retry_after)
+            for bucket in buckets:
+                bucket.try_acquire(cost)
+            return RateLimitDecision(True, min(levels) - cost, 0.0)
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": self.name, "clients": len(self._buckets), "max_keys": self.max_keys}
+
+
+# Token bucket atómico para vários buckets (tudo ou nada); relógio do servidor
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local allowed = 1
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(state[1]) or capacity
+  local ts = tonumber(state[2]) or now
+  tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+  levels[i] = tokens
+  if tokens < cost then
+    allowed = 0
+    wait = math.max(wait, (cost - tokens) / rate)
+  end
+end
+local remaining = capacity
+for i, key in ipairs(KEYS) do
+  local tokens = levels[i]
+  if allowed == 1 then tokens = tokens - cost end
+  remaining = math.min(remaining, tokens)
+  redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+  redis.call('PEXPIRE', key, ttl)
+end
+return {allowed, tostring(remaining), tostring(wait)}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Buckets partilhados por todos os workers num servidor compatível com Redis
+
+    Se o servidor não responder, o pedido é decidido pelo backend local
+    (limites por worker) em vez de falhar ou passar sem limite.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, key_prefix: str = "ratelimit", timeout: float = 0.25,
+                 fallback: Optional[LocalRateLimitBackend] = None):
+        if aioredis is None:
+            raise RuntimeError("Backend redis requer o pacote 'redis' (pip install redis)")
+        self.url = url
+        self.key_prefix = key_prefix
+        self._client = aioredis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._client.register_script(_TOKEN_BUCKET_SCRIPT)
+        self.fallback = fallback or LocalRateLimitBackend()
+        self._degraded = False
+
+    async def acquire(self, keys: List[str], rule: RateLimitRule, cost: float = 1.0) -> RateLimitDecision:
+        ttl_ms = rule.window * 2000
+        try:
+            allowed, remaining, retry_after = await self._script(
+                keys=[f"{self.key_prefix}:{key}" for key in keys],
+                args=[rule.rate, rule.burst, cost, ttl_ms],
+            )
+        except Exception as e:
+            metrics.incr("rate_limit.backend_errors")
+            if not self._degraded:
+                self._degraded = True
+                print(f"⚠️  Rate limit: backend redis indisponível ({type(e).__name__}), a usar limites locais")
+            return await self.fallback.acquire(keys, rule, cost)
+        if self._degraded:
+            self._degraded = False
+            print("✅ Rate limit: backend redis recuperado")
+        return RateLimitDecision(bool(int(allowed)), float(remaining), float(retry_after))
+
+    async def close(self):
+        await self._client.aclose()
+
+    def stats(self) -> Dict[str, str]:
+        return {"backend": self.name, "url": self.url.rsplit("@", 1)[-1]}
+
+
+# ============================================================================
+# QUOTA POR LIGAÇÃO
+# ============================================================================
+
+def retry_message(decision: RateLimitDecision) -> str:
+    return f"Demasiados pedidos, tenta novamente em {max(1, math.ceil(decision.retry_after))}s"
+
+
+class ClientQuota:
+    """
+    Buckets do cliente para a regra que apanhou o pedido ou WebSocket
+
+    O middleware guarda-a em scope["state"]["rate_limit"] com o token já
+    cobrado como crédito; os handlers cobram o custo real com charge().
+    """
+
+    def __init__(self, backend, rule: RateLimitRule, keys: List[str], decision: RateLimitDecision,
+                 prepaid: float = 1.0):
+        self.backend = backend
+        self.rule = rule
+        self.keys = keys
+        self.decision = decision
+        self.prepaid = prepaid
+
+    async def charge(self, cost: float = 1.0) -> RateLimitDecision:
+        """Consome `cost` tokens (primeiro o crédito do connect); tudo ou nada"""
+        covered = min(cost, self.prepaid)
+        if cost - covered <= 0:
+            self.prepaid -= covered
+            return self.decision
+        decision = await self.backend.acquire(self.keys, self.rule, cost - covered)
+        if decision.allowed:
+            self.prepaid -= covered
+            metrics.incr("rate_limit.allowed")
+        else:
+            metrics.incr("rate_limit.rejected")
+            metrics.incr(f"rate_limit.rejected.{self.rule.name}")
+        self.decision = decision
+        return decision
+
+
+def client_quota(connection) -> Optional[ClientQuota]:
+    """Quota do Request/WebSocket (None se o rate limiting estiver desligado)"""
+    return connection.scope.get("state", {}).get("rate_limit")
+
+
+async def charge_request(request, cost: float):
+    """
+    Cobra `cost` tokens ao cliente de um pedido HTTP
+
+    429 + Retry-After se o bucket ainda não tiver tokens; 413 (sem Retry-After)
+    se o custo for maior do que a capacidade do bucket, porque esperar não resolve.
+    """
+    quota = client_quota(request)
+    if quota is None:
+        return
+    if cost > quota.rule.burst:
+        metrics.incr(f"rate_limit.too_large.{quota.rule.name}")
+        raise HTTPException(
+            status_code=413,
+            detail=f"Pedido demasiado grande para o rate limit: custo {cost:g}, máximo {quota.rule.burst:g}",
+        )
+    decision = await quota.charge(cost)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=retry_message(decision),
+            headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+        )
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RateLimitMiddleware:
+    """Aplica a primeira regra que corresponde ao pedido (as regras são ordenadas)"""
+
+    def __init__(self, app, rules: List[RateLimitRule], backend, trust_proxy: bool = False):
+        """
+        Args:
+            rules: Por ordem de prioridade; a última deve apanhar tudo (default)
+            backend: LocalRateLimitBackend ou RedisRateLimitBackend
+            trust_proxy: Usar X-Forwarded-For como IP do cliente (só atrás de um proxy)
+        """
+        self.app = app
+        self.rules = rules
+        self.backend = backend
+        self.trust_proxy = trust_proxy
+
+    def _rule(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    def _client_ip(self, scope) -> str:
+        if self.trust_proxy:
+            forwarded = _header(scope, b"x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def _api_key(scope) -> Optional[str]:
+        key = _header(scope, b"x-api-key")
+        if not key:
+            auth = _header(scope, b"authorization")
+            if auth and auth[:7].lower() == "bearer ":
+                key = auth[7:].strip()
+        if not key:
+            return None
+        # Só o hash fica na memória/servidor partilhado
+        return hashlib.sha256(key.encode()).hexdigest()[:24]
+
+    def _keys(self, scope, rule: RateLimitRule) -> List[str]:
+        keys = [f"{rule.name}:ip:{self._client_ip(scope)}"]
+        api_key = self._api_key(scope)
+        if api_key:
+            keys.append(f"{rule.name}:key:{api_key}")
+        return keys
+
+    @staticmethod
+    def _headers(rule: RateLimitRule, decision: RateLimitDecision) -> List[Tuple[bytes, bytes]]:
+        remaining = max(0, math.floor(decision.remaining))
+        if decision.allowed:
+            reset = math.ceil((rule.burst - decision.remaining) / rule.rate)
+        else:
+            reset = math.ceil(decision.retry_after)
+        headers = [
+            (b"ratelimit-limit", str(int(rule.burst)).encode()),
+            (b"ratelimit-remaining", str(remaining).encode()),
+            (b"ratelimit-reset", str(max(0, reset)).encode()),
+            (b"ratelimit-policy", f"{int(rule.burst)};w={rule.window}".encode()),
+        ]
+        if not decision.allowed:
+            headers.append((b"retry-after", str(max(1, reset)).encode()))
+        return headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        rule = None if method == "OPTIONS" else self._rule(method, scope["path"])  # preflight CORS passa
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        keys = self._keys(scope, rule)
+        decision = await self.backend.acquire(keys, rule)
+        headers = self._headers(rule, decision)
+
+        if not decision.allowed:
+            metrics.incr("rate_limit.rejected")
+            metrics.incr(f"rate_limit.rejected.{rule.name}")
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1008, "reason": "rate limit"})
+                return
+            body = json.dumps({"detail": retry_message(decision)}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": headers + [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        metrics.incr("rate_limit.allowed")
+        quota = ClientQuota(self.backend, rule, keys, decision)
+        scope.setdefault("state", {})["rate_limit"] = quota
+        if scope["type"] == "websocket":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                # Estado depois do que o handler cobrou (ex.: mensagens de um batch)
+                headers = self._headers(rule, quota.decision)
+                if not quota.decision.allowed:
+                    # O 429 do handler já traz o seu Retry-After
+                    headers = [h for h in headers if h[0] != b"retry-after"]
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# ============================================================================
+# CONFIGURAÇÃO
+# ============================================================================
+
+# Rotas que chamam o LLM (incluindo runs em background e WebSocket)
+CHAT_PATHS = ("/api/chat",)
+# Cobrado por mensagem: bucket próprio com capacidade para o maior batch (1000 mensagens)
+BATCH_PATHS = ("/api/agent/chat/batch",)
+CHAT_PREFIXES = ("/api/langgraph/chat", "/api/langgraph/singleton/chat", "/api/agent/chat", "/ws/chat")
+HEALTH_PATHS = ("/", "/health", "/ready", "/api/metrics")
+
+
+def _limit(name: str, per_minute: str, burst: str) -> Tuple[float, float]:
+    return (
+        float(os.getenv(f"RATE_LIMIT_{name}_PER_MINUTE", per_minute)),
+        float(os.getenv(f"RATE_LIMIT_{name}_BURST", burst)),
+    )
+
+
+def default_rules() -> List[RateLimitRule]:
+    """Regras por omissão (RATE_LIMIT_<CHAT|BATCH|JOBS|HEALTH|DEFAULT>_PER_MINUTE / _BURST)"""
+    chat = _limit("CHAT", "12", "4")
+    batch = _limit("BATCH", "120", "1000")
+    jobs = _limit("JOBS", "6", "3")
+    health = _limit("HEALTH", "600", "60")
+    default = _limit("DEFAULT", "120", "30")
+    return [
+        RateLimitRule("health", *health, paths=HEALTH_PATHS, suffixes=("/health",)),
+        RateLimitRule("batch", *batch, paths=BATCH_PATHS),
+        RateLimitRule("chat", *chat, paths=CHAT_PATHS, prefixes=CHAT_PREFIXES),
+        RateLimitRule("jobs", *jobs, paths=("/api/jobs",), methods=("POST",)),
+        RateLimitRule("default", *default),
+    ]
+
+
+def create_rate_limit_backend():
+    """RATE_LIMIT_BACKEND=local (default) ou redis (RATE_LIMIT_REDIS_URL)"""
+    local = LocalRateLimitBackend(max_keys=int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000")))
+    if os.getenv("RATE_LIMIT_BACKEND", "local").lower() != "redis":
+        return local
+    url = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    try:
+        return RedisRateLimitBackend(url, fallback=local)
+    except RuntimeError as e:
+        print(f"⚠️  Rate limit: {e}; a usar backend local")
+        return local
+
+
+def rate_limit_settings() -> dict:
+    """Configuração por env (RATE_LIMIT_*)"""
+    return {
+        "rules": default_rules(),
+        "backend": create_rate_limit_backend(),
+        "trust_proxy": os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true",
+    }
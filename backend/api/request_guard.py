@@ -0,0 +1,142 @@
+# backend/api/request_guard.py
+"""
+Admission control, deadline e cancelamento quando o cliente desliga
+
+Cada pedido de chat ocupa um slot de admissão (CHAT_MAX_CONCURRENCY)
+enquanto corre. O run é uma task separada; se o cliente fechar a ligação
+a task é cancelada - o CancelledError chega à chamada HTTP do LLM e às
+tools em curso - e o slot é libertado logo.
+
+O orçamento de tempo (header X-Request-Timeout) conta desde a chegada do
+pedido, incluindo a fila de admissão, e é propagado ao run (utils/deadline.py).
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException, Request
+
+from utils.deadline import TIMEOUT_HEADER, deadline_scope, parse_timeout, remaining_timeout
+from utils.metrics import metrics
+
+# Intervalo entre verificações de desconexão do cliente
+DISCONNECT_POLL_INTERVAL = 0.1
+
+# Status usado quando o cliente fechou a ligação (convenção do nginx)
+CLIENT_CLOSED_REQUEST = 499
+
+# Margem além da deadline para o grafo montar a resposta parcial
+DEADLINE_GRACE_SECONDS = 1.0
+
+
+class AdmissionLimiter:
+    """Limita os runs de chat em simultâneo; os restantes esperam em fila"""
+
+    def __init__(self, max_concurrency: int = 32, queue_timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Ocupa um slot durante o bloco (503 se a fila não andar a tempo)"""
+        self.waiting += 1
+        metrics.set_gauge("admission.waiting", self.waiting)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), remaining_timeout(self.queue_timeout))
+        except asyncio.TimeoutError:
+            metrics.incr("admission.rejected")
+            raise HTTPException(status_code=503, detail="Servidor ocupado, tenta novamente")
+        finally:
+            self.waiting -= 1
+            metrics.set_gauge("admission.waiting", self.waiting)
+
+        self.in_flight += 1
+        metrics.set_gauge("admission.in_flight", self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("admission.in_flight", self.in_flight)
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+        }
+
+
+# Instância global
+admission = AdmissionLimiter(
+    max_concurrency=int(os.getenv("CHAT_MAX_CONCURRENCY", "32")),
+    queue_timeout=float(os.getenv("CHAT_QUEUE_TIMEOUT", "30")),
+)
+
+
+async def run_until_disconnect(
+    http_request: Request,
+    scope: str,
+    fn: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Executa fn com um slot de admissão, cancelando-a se o cliente desligar
+
+    Args:
+        http_request: Request do Starlette (para detetar a desconexão e
+                      ler o header X-Request-Timeout)
+        scope: Nome do endpoint, usado nas métricas
+        fn: Coroutine factory que executa o pedido
+
+    Raises:
+        HTTPException 499 se o cliente desligou (já ninguém lê a resposta)
+        HTTPException 504 se o run ultrapassou a deadline
+    """
+    timeout = parse_timeout(http_request.headers.get(TIMEOUT_HEADER))
+
+    async def admitted():
+        with deadline_scope(timeout) as deadline:
+            async with admission.slot():
+                try:
+                    # Os grafos param sozinhos com resposta parcial; isto é o
+                    # limite duro para os agents sem passos intermédios
+                    return await asyncio.wait_for(
+                        fn(), deadline.remaining() + DEADLINE_GRACE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    metrics.incr("deadline.exceeded.request")
+                    metrics.incr(f"deadline.exceeded.{scope}")
+                    raise HTTPException(
+                        status_code=504,
+                        detail=f"Tempo limite do pedido esgotado ({timeout:.1f}s)"
+                    )
+
+    task = asyncio.create_task(admitted())
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                break
+    except asyncio.CancelledError:
+        # O próprio handler foi cancelado (ex: shutdown do servidor)
+        task.cancel()
+        raise
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception:
+        # Terminou com erro entretanto; o cliente já não o vai ver
+        pass
+    metrics.incr("cancellation.client_disconnect")
+    metrics.incr(f"cancellation.{scope}")
+    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Cliente desligou")
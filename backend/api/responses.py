@@ -0,0 +1,26 @@
+# backend/api/responses.py
+"""
+Serialização JSON das respostas
+
+FastJSONResponse usa orjson quando está instalado (bastante mais rápido a
+serializar históricos grandes) e cai para o JSONResponse do Starlette se não.
+"""
+
+from typing import Any, Dict
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+
+def lean_response(content: Dict[str, Any], response: Response) -> Response:
+    """
+    Resposta já serializada, sem passar pela validação do response_model
+    Mantém os headers definidos no Response do endpoint (ex: Idempotent-Replayed)
+    """
+    return FastJSONResponse(content, headers=dict(response.headers))
@@ -0,0 +1,169 @@
+# backend/batch_runner.py
+"""
+Batch runner offline: corre um ficheiro JSONL de prompts por um agent
+
+Cada linha de entrada é um objeto JSON com "prompt" (ou "message") e,
+opcionalmente, "id"; também aceita uma string JSON simples.
+Os resultados são escritos à medida que terminam no JSONL de saída, com o
+nº da linha de entrada. Se o processo morrer, voltar a correr o mesmo
+comando retoma a partir das linhas já concluídas. Com --retry-failed, os
+registos com erro são removidos do output (reescrito) antes de voltar a
+correr essas linhas, para cada linha ficar com um só registo.
+
+Uso:
+    python batch_runner.py prompts.jsonl results.jsonl --agent ollama --concurrency 8 --rate 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from agents.batch import AGENT_TYPES, get_run_fn, run_indexed_batch
+from utils.rate_limit import TokenBucket
+
+
+def count_lines(path: str) -> int:
+    """Conta as linhas não vazias (as que read_prompts processa) em stream"""
+    with open(path, "rb") as f:
+        return sum(1 for raw in f if raw.strip())
+
+
+def load_completed(output_path: str, retry_failed: bool = False) -> set:
+    """
+    Linhas de entrada já concluídas num output anterior
+    (com retry_failed, as linhas que falharam voltam a correr)
+
+    Ignora uma última linha truncada (crash a meio da escrita) e
+    garante que o ficheiro acaba em newline antes de continuar a escrever.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    if retry_failed:
+        return drop_failed(output_path)
+
+    with open(output_path, "rb+") as f:
+        for raw in f:
+            try:
+                completed.add(json.loads(raw)["line"])
+            except (ValueError, KeyError):
+                continue
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    return completed
+
+
+def drop_failed(output_path: str) -> set:
+    """
+    Reescreve o output só com o primeiro registo bem sucedido de cada linha
+    (os erros vão voltar a correr; a troca do ficheiro é atómica)
+
+    Returns:
+        Linhas de entrada concluídas com sucesso
+    """
+    completed = set()
+    tmp_path = output_path + ".tmp"
+    with open(output_path, "rb") as src, open(tmp_path, "wb") as dst:
+        for raw in src:
+            try:
+                record = json.loads(raw)
+                line_no, success = record["line"], record["success"]
+            except (ValueError, KeyError):
+                continue
+            if success and line_no not in completed:
+                completed.add(line_no)
+                dst.write(raw.rstrip(b"\n") + b"\n")
+    os.replace(tmp_path, output_path)
+    return completed
+
+
+def read_prompts(input_path: str, completed: set):
+    """Gera (nº linha, prompt, id) em stream, saltando as linhas concluídas"""
+    with open(input_path, "rt", encoding="utf-8") as f:
+        for line_no, raw in enumerate(f, start=1):
+            if line_no in completed or not raw.strip():
+                continue
+            record = json.loads(raw)
+            if isinstance(record, str):
+                yield line_no, record, None
+            else:
+                yield line_no, record.get("prompt") or record.get("message"), record.get("id")
+
+
+def format_progress(done: int, total: int, failed: int, started: float) -> str:
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    remaining = max(0, total - done)
+    eta = remaining / rate if rate > 0 else float("inf")
+    eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta != float("inf") else "--:--:--"
+    return f"⏳ {done}/{total} ({failed} erros) | {rate:.2f} prompts/s | ETA {eta_text}"
+
+
+async def run(args) -> int:
+    completed = load_completed(args.output, retry_failed=args.retry_failed)
+    total = count_lines(args.input) - len(completed)
+
+    print(f"🚀 Batch runner: agent={args.agent} concurrency={args.concurrency} rate={args.rate or '∞'}/s")
+    if completed:
+        print(f"🔁 A retomar: {len(completed)} linhas já concluídas")
+
+    run_fn = get_run_fn(args.agent)
+    rate_limiter = TokenBucket(args.rate, capacity=args.burst) if args.rate else None
+    ids = {}
+
+    def items():
+        for line_no, prompt, record_id in read_prompts(args.input, completed):
+            ids[line_no] = record_id
+            yield line_no, prompt
+
+    done = failed = 0
+    started = last_report = time.perf_counter()
+
+    with open(args.output, "at", encoding="utf-8") as out:
+        async for item in run_indexed_batch(
+            run_fn,
+            items(),
+            max_concurrency=args.concurrency,
+            conversation_prefix="batch_line",
+            rate_limiter=rate_limiter,
+        ):
+            line_no = item.pop("index")
+            record = {"line": line_no, "id": ids.pop(line_no, None), **item}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+            done += 1
+            failed += not item["success"]
+            now = time.perf_counter()
+            if now - last_report >= args.progress_interval:
+                last_report = now
+                print(format_progress(done, total, failed, started), file=sys.stderr)
+
+    print(format_progress(done, total, failed, started), file=sys.stderr)
+    print(f"✅ Concluído: {done - failed} OK, {failed} erros -> {args.output}")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corre um JSONL de prompts por um agent")
+    parser.add_argument("input", help="JSONL de entrada")
+    parser.add_argument("output", help="JSONL de saída (append; usado para retomar)")
+    parser.add_argument("--agent", choices=AGENT_TYPES, default="ollama")
+    parser.add_argument("--concurrency", type=int, default=4, help="Execuções em simultâneo")
+    parser.add_argument("--rate", type=float, default=None, help="Máximo de prompts por segundo")
+    parser.add_argument("--burst", type=float, default=None, help="Burst do rate limit")
+    parser.add_argument("--retry-failed", action="store_true", help="Ao retomar, volta a correr as linhas com erro")
+    parser.add_argument("--progress-interval", type=float, default=1.0, help="Segundos entre linhas de progresso")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# backend/config/llm_batcher.py
+"""
+Gate de concorrência para prompts ao mesmo modelo
+
+Os prompts passam por uma fila partilhada e correm sobre o mesmo cliente LLM
+(uma connection pool), no máximo max_concurrency de cada vez, devolvendo a
+cada caller o seu resultado (ou o seu erro).
+
+Não há batching real: cada prompt é um ainvoke próprio (o abatch dos
+clientes LLM do langchain_community também os envia um a um), por isso
+não existe uma chamada partilhada a amortizar. A janela de recolha
+(max_wait_ms) é 0 por omissão; um valor > 0 só junta prompts para as
+métricas de batch e acrescenta latência.
+"""
+
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, List, Optional, Tuple
+
+from utils.metrics import metrics
+
+
+class MicroBatcher:
+    """Dispatcher que agrupa prompts concorrentes em batches"""
+
+    def __init__(
+        self,
+        llm,
+        name: str = "llm",
+        max_batch_size: int = 8,
+        max_wait_ms: float = 0.0,
+        max_concurrency: int = 16,
+        track: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        Args:
+            llm: Runnable LangChain (ainvoke)
+            name: Nome usado nas métricas
+            max_batch_size: Máximo de prompts recolhidos de uma vez
+            max_wait_ms: Tempo que o primeiro prompt espera por companhia (0 = despacha logo)
+            max_concurrency: Máximo de prompts em curso no LLM
+            track: Factory de context manager à volta de cada prompt
+                   (ex: contabilização no load balancer)
+        """
+        self.llm = llm
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.track = track
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop = None
+        self._running_batches = set()
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._worker = loop.create_task(self._collect_loop())
+
+    async def submit(self, prompt: Any) -> Any:
+        """Submete um prompt e espera pelo seu resultado"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future, time.perf_counter()))
+        return await future
+
+    async def _collect_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Sem janela: leva só o que já está na fila
+            while self.max_wait <= 0 and len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Não bloqueia a recolha do próximo batch enquanto este corre
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
+
+    async def _invoke(self, prompt: Any) -> Any:
+        async with self._semaphore:
+            with (self.track() if self.track else nullcontext()):
+                return await self.llm.ainvoke(prompt)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        # Callers que já desistiram (cancelados) não entram no batch
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        dispatched_at = time.perf_counter()
+        prefix = f"batcher.{self.name}"
+        metrics.incr(f"{prefix}.calls")
+        metrics.incr(f"{prefix}.items", len(batch))
+        metrics.observe(f"{prefix}.batch_size", len(batch))
+        for _, _, enqueued_at in batch:
+            metrics.observe(f"{prefix}.wait_ms", (dispatched_at - enqueued_at) * 1000)
+
+        results = await asyncio.gather(
+            *(self._invoke(prompt) for prompt, _, _ in batch),
+            return_exceptions=True
+        )
+
+        metrics.observe(f"{prefix}.batch_latency_s", time.perf_counter() - dispatched_at)
+        # Prompts despachados por batch
+        metrics.set_gauge(
+            f"{prefix}.items_per_call",
+            metrics.get_counter(f"{prefix}.items") / metrics.get_counter(f"{prefix}.calls")
+        )
+
+        # Cada caller recebe o resultado (ou o erro) do seu próprio prompt
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
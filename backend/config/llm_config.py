@@ -3,22 +3,28 @@
 Configuração centralizada para LLMs (OpenAI, Ollama)
 """
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Union
 from pathlib import Path
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_community.llms import Ollama
+from langchain_core.runnables import Runnable, RunnableConfig
+from .ollama_balancer import OllamaLoadBalancer
+from .llm_batcher import MicroBatcher
 
 load_dotenv()
 
 
+@lru_cache(maxsize=1)
 def is_running_in_docker() -> bool:
-    """Deteta se está a correr em Docker"""
+    """Deteta se está a correr em Docker (calculado uma vez por processo)"""
     if Path("/.dockerenv").exists():
         return True
     try:
         with open("/proc/1/cgroup", "rt") as f:
-            return "docker" in f.read() or "containerd" in f.read()
+            content = f.read()
+        return "docker" in content or "containerd" in content
     except Exception:
         return False
 
@@ -32,20 +38,96 @@ def get_ollama_url() -> str:
     return "http://host.docker.internal:11434" if is_running_in_docker() else "http://localhost:11434"
 
 
+def get_ollama_urls() -> List[str]:
+    """
+    Retorna a lista de URLs Ollama
+    
+    OLLAMA_BASE_URLS aceita vários hosts separados por vírgula;
+    sem ela, usa o URL único de get_ollama_url()
+    """
+    env_urls = os.getenv("OLLAMA_BASE_URLS")
+    if env_urls:
+        urls = [url.strip() for url in env_urls.split(",") if url.strip()]
+        if urls:
+            return urls
+    
+    return [get_ollama_url()]
+
+
+def parse_keep_alive(value: str) -> Union[int, str]:
+    """OLLAMA_KEEP_ALIVE: duração ("30m", "2h") ou segundos ("-1" = sempre carregado)"""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+class BalancedLLM(Runnable):
+    """
+    LLM Ollama que escolhe o host no load balancer em cada chamada
+
+    Mantém um cliente por host (criado pela factory) e contabiliza pedidos em
+    curso e latência de cada chamada. bind(...) funciona como num modelo normal
+    (os kwargs ligados chegam ao invoke do cliente do host).
+    """
+
+    def __init__(self, balancer: OllamaLoadBalancer, factory: Callable[[str], Runnable],
+                 affinity_key: Optional[str] = None):
+        self.balancer = balancer
+        self.factory = factory
+        self.affinity_key = affinity_key
+        self._clients: Dict[str, Runnable] = {}
+
+    def client(self, url: str) -> Runnable:
+        """Cliente para um host específico (criado sob pedido e reutilizado)"""
+        if url not in self._clients:
+            self._clients[url] = self.factory(url)
+        return self._clients[url]
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        with self.balancer.request(self.affinity_key) as host:
+            return self.client(host.url).invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        with self.balancer.request(self.affinity_key) as host:
+            return await self.client(host.url).ainvoke(input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator[Any]:
+        with self.balancer.request(self.affinity_key) as host:
+            yield from self.client(host.url).stream(input, config, **kwargs)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AsyncIterator[Any]:
+        with self.balancer.request(self.affinity_key) as host:
+            async for chunk in self.client(host.url).astream(input, config, **kwargs):
+                yield chunk
+
+
 class LLMConfig:
     """Classe para gerir configuração de LLMs"""
     
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.ollama_url = get_ollama_url()
+        self.ollama_urls = get_ollama_urls()
+        self.ollama_url = self.ollama_urls[0]
         self.default_model = os.getenv("DEFAULT_LLM", "ollama")
+        self.ollama_model = os.getenv("OLLAMA_MODEL", "gpt-oss:120b-cloud")
+        self.ollama_small_model = os.getenv("OLLAMA_SMALL_MODEL", "llama3.2:3b")
+        self.ollama_keep_alive = parse_keep_alive(os.getenv("OLLAMA_KEEP_ALIVE", "30m"))
+        self.ollama_balancer = OllamaLoadBalancer(
+            self.ollama_urls,
+            strategy=os.getenv("OLLAMA_LB_STRATEGY", "latency"),
+            affinity=os.getenv("OLLAMA_LB_AFFINITY", "false").lower() == "true",
+            probe_interval=float(os.getenv("OLLAMA_LB_PROBE_INTERVAL", "10")),
+        )
+        self._batchers = {}
         
-    def get_llm(self, model_type: Optional[str] = None, **kwargs):
+    def get_llm(self, model_type: Optional[str] = None, conversation_id: Optional[str] = None, **kwargs):
         """
         Retorna uma instância de LLM configurada
         
         Args:
             model_type: "openai" ou "ollama" (usa default se None)
+            conversation_id: Usado para afinidade de host no Ollama
             **kwargs: Argumentos adicionais para o LLM
         """
         llm_type = model_type or self.default_model
@@ -53,10 +135,40 @@ class LLMConfig:
         if llm_type == "openai":
             return self._get_openai_llm(**kwargs)
         elif llm_type == "ollama":
-            return self._get_ollama_llm(**kwargs)
+            return self._get_ollama_llm(conversation_id=conversation_id, **kwargs)
         else:
             raise ValueError(f"Tipo de LLM não suportado: {llm_type}")
     
+    def get_batcher(self, model_type: Optional[str] = None, **kwargs) -> MicroBatcher:
+        """
+        Retorna o gate de concorrência partilhado para um modelo
+        
+        Prompts concorrentes para o mesmo modelo/host correm em paralelo até
+        BATCH_MAX_CONCURRENCY (BATCH_MAX_WAIT_MS = janela de recolha, 0 por omissão).
+        No Ollama há um por host, escolhido pelo load balancer a cada chamada.
+        
+        Uso:
+            response = await llm_config.get_batcher("ollama").submit(prompt)
+        """
+        llm_type = model_type or self.default_model
+        track = None
+        if llm_type == "ollama":
+            host = self.ollama_balancer.select()
+            kwargs.setdefault("base_url", host.url)
+            track = lambda: self.ollama_balancer.track(host)
+        
+        key = (llm_type, tuple(sorted((k, str(v)) for k, v in kwargs.items())))
+        if key not in self._batchers:
+            self._batchers[key] = MicroBatcher(
+                self.get_llm(llm_type, **kwargs),
+                name=llm_type,
+                max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "8")),
+                max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "0")),
+                max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", "16")),
+                track=track,
+            )
+        return self._batchers[key]
+    
     def _get_openai_llm(self, **kwargs):
         """Configura OpenAI LLM"""
         if not self.openai_api_key:
@@ -71,16 +183,28 @@ class LLMConfig:
         
         return ChatOpenAI(**default_params)
     
-    def _get_ollama_llm(self, **kwargs):
-        """Configura Ollama LLM"""
+    def _get_ollama_llm(self, conversation_id: Optional[str] = None, **kwargs):
+        """
+        Configura Ollama LLM
+        
+        Sem base_url devolve um BalancedLLM: o host é escolhido pelo load
+        balancer em cada chamada (afinidade por conversation_id se estiver
+        ativa). Passar base_url em kwargs fixa o cliente nesse host.
+        """
         default_params = {
-            "model": "gpt-oss:120b-cloud",
-            "base_url": self.ollama_url,
-            "temperature": 0.7
+            "model": self.ollama_model,
+            "temperature": 0.7,
+            "keep_alive": self.ollama_keep_alive,
         }
         default_params.update(kwargs)
         
-        return Ollama(**default_params)
+        if "base_url" in default_params:
+            return Ollama(**default_params)
+        return BalancedLLM(
+            self.ollama_balancer,
+            lambda url: Ollama(**default_params, base_url=url),
+            affinity_key=conversation_id,
+        )
 
 
 # Instância global para facilitar imports
@@ -0,0 +1,302 @@
+# backend/config/model_warmup.py
+"""
+Warm-up e keep-alive dos modelos Ollama
+
+- No arranque da app e depois de cada switch de LLM, carrega os modelos
+  configurados em todos os hosts com uma geração mínima (num_predict=1) e
+  o keep_alive de OLLAMA_KEEP_ALIVE, para o primeiro pedido não pagar o load
+- Em background consulta /api/ps de cada host (modelos residentes) e volta a
+  aquecer os que foram descarregados num host saudável
+- Os listeners (readiness) são avisados sempre que o estado muda: enquanto
+  o modelo ativo (OLLAMA_MODEL, ou OLLAMA_WARMUP_MODELS) não estiver quente
+  em pelo menos um host, a app não está pronta
+- Modelos opcionais (OLLAMA_WARMUP_OPTIONAL_MODELS, por omissão o modelo
+  pequeno do router) são aquecidos só nos hosts que os listam no /api/tags
+  e nunca bloqueiam a readiness
+
+Modelos cloud (sufixo -cloud) correm remotamente: não aparecem no /api/ps,
+contam como quentes depois de uma geração de warm-up bem sucedida.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+
+from utils.metrics import metrics
+from .llm_config import llm_config
+from .ollama_balancer import OllamaLoadBalancer, normalize_model
+
+
+def is_cloud_model(model: str) -> bool:
+    return model.endswith("-cloud") or model.endswith(":cloud")
+
+
+class ModelWarmup:
+    """Pré-carrega modelos Ollama e acompanha quais estão residentes"""
+
+    def __init__(
+        self,
+        balancer: OllamaLoadBalancer,
+        models: List[str],
+        optional_models: Optional[List[str]] = None,
+        keep_alive: Union[int, str] = "30m",
+        timeout: float = 300.0,
+        check_interval: float = 60.0,
+        enabled: bool = True,
+    ):
+        """
+        Args:
+            balancer: Load balancer com os hosts Ollama
+            models: Modelos a aquecer (quando o provider é ollama); bloqueiam a readiness
+            optional_models: Aquecidos se o host os tiver; não bloqueiam a readiness
+            keep_alive: Tempo que o Ollama mantém o modelo carregado ("30m", "-1" = sempre)
+            timeout: Timeout de cada geração de warm-up (inclui o load)
+            check_interval: Segundos entre verificações de /api/ps
+            enabled: False = não aquece (a readiness não fica à espera)
+        """
+        self.balancer = balancer
+        self.models = list(dict.fromkeys(models))
+        self.optional_models = [m for m in dict.fromkeys(optional_models or []) if m not in self.models]
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.enabled = enabled
+
+        self.provider: Optional[str] = None
+        self.phase = "pending"
+        self._warm: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._errors: Dict[Tuple[str, str], str] = {}
+        self._resident: Dict[str, Optional[Dict[str, Dict[str, Any]]]] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._warm_task: Optional[asyncio.Task] = None
+        self._check_task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------------
+
+    async def start(self, provider: str):
+        """Arranque da app com o provider ativo do agent_manager: aquece em background e inicia as verificações"""
+        self.switch(provider)
+        if self.enabled and self._check_task is None:
+            self._check_task = asyncio.create_task(self._check_loop())
+
+    async def stop(self):
+        for task in (self._warm_task, self._check_task):
+            if task is not None:
+                task.cancel()
+        self._warm_task = self._check_task = None
+
+    def switch(self, provider: str):
+        """Provider ativo mudou (startup ou switch de LLM): volta a aquecer"""
+        self.provider = provider
+        if self._warm_task is not None and not self._warm_task.done():
+            self._warm_task.cancel()
+        if not self.enabled or not self.uses_ollama:
+            self.phase = "disabled" if not self.enabled else "not_required"
+            self._notify()
+            return
+        self.phase = "warming"
+        self._warm.clear()
+        self._notify()
+        self._warm_task = asyncio.create_task(self._warm_all())
+
+    @property
+    def uses_ollama(self) -> bool:
+        return self.provider == "ollama"
+
+    # ------------------------------------------------------------------------
+    # Warm-up
+    # ------------------------------------------------------------------------
+
+    async def _warm_all(self):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            # Hosts em paralelo; no mesmo host um modelo de cada vez (não disputam memória)
+            await asyncio.gather(*(
+                self._warm_host(client, host.url, self._host_models(host)) for host in self.balancer.hosts
+            ))
+            await self._refresh_resident(client)
+        self.phase = "ready" if self.is_warm() else "failed"
+        metrics.observe("warmup.duration_s", time.perf_counter() - start)
+        print(f"{'🔥' if self.phase == 'ready' else '⚠️ '} Warm-up dos modelos: {self.phase} "
+              f"({time.perf_counter() - start:.1f}s)")
+        self._notify()
+
+    def _host_models(self, host) -> List[str]:
+        """
+        Modelos a aquecer no host: os que o último probe (/api/tags) lista; os
+        obrigatórios também enquanto a lista do host ainda não é conhecida
+        (um host sem o modelo nunca o carrega, só geraria erros a cada verificação)
+        """
+        required = [m for m in self.models if host.models is None or host.has_model(m)]
+        return required + [m for m in self.optional_models if host.has_model(m)]
+
+    async def _warm_host(self, client: httpx.AsyncClient, url: str, models: List[str]):
+        for model in models:
+            await self._warm_model(client, url, model)
+
+    async def _warm_model(self, client: httpx.AsyncClient, url: str, model: str) -> bool:
+        """Geração mínima que obriga o host a carregar o modelo"""
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/api/generate", json={
+                "model": model,
+                "prompt": "ok",
+                "stream": False,
+                "keep_alive": self.keep_alive,
+                "options": {"num_predict": 1},
+            })
+            response.raise_for_status()
+            load_duration = response.json().get("load_duration", 0) / 1e9
+        except Exception as e:
+            metrics.incr("warmup.failures")
+            self._errors[(url, model)] = f"{type(e).__name__}: {e}"
+            self._warm.pop((url, model), None)
+            return False
+        self._errors.pop((url, model), None)
+        self._warm[(url, model)] = {
+            "warmed_at": time.time(),
+            "seconds": round(time.perf_counter() - start, 3),
+            "load_seconds": round(load_duration, 3),
+        }
+        metrics.incr("warmup.models")
+        return True
+
+    # ------------------------------------------------------------------------
+    # Residência (/api/ps) e keep-alive
+    # ------------------------------------------------------------------------
+
+    async def _refresh_resident(self, client: httpx.AsyncClient):
+        async def ps(url: str):
+            try:
+                response = await client.get(f"{url}/api/ps", timeout=5.0)
+                response.raise_for_status()
+                self._resident[url] = {
+                    normalize_model(m["name"]): {
+                        "expires_at": m.get("expires_at"),
+                        "size_vram": m.get("size_vram"),
+                    }
+                    for m in response.json().get("models", [])
+                }
+            except Exception:
+                self._resident[url] = None  # desconhecido
+        await asyncio.gather(*(ps(host.url) for host in self.balancer.hosts))
+
+    def _is_ready_on(self, url: str, model: str) -> bool:
+        if (url, model) not in self._warm:
+            return False
+        if is_cloud_model(model):
+            return True
+        resident = self._resident.get(url)
+        return resident is None or normalize_model(model) in resident
+
+    def is_warm(self) -> bool:
+        """Cada modelo obrigatório está quente em pelo menos um host saudável"""
+        hosts = [host.url for host in self.balancer.hosts if host.healthy]
+        return all(any(self._is_ready_on(url, model) for url in hosts) for model in self.models)
+
+    async def _check_loop(self):
+        """Deteta modelos descarregados e volta a aquecê-los"""
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            while True:
+                await asyncio.sleep(self.check_interval)
+                if not self.uses_ollama or (self._warm_task is not None and not self._warm_task.done()):
+                    continue
+                try:
+                    await self._refresh_resident(client)
+                    cold = {}
+                    for host in self.balancer.hosts:
+                        if host.healthy:
+                            models = [m for m in self._host_models(host) if not self._is_ready_on(host.url, m)]
+                            if models:
+                                cold[host.url] = models
+                    if cold:
+                        metrics.incr("warmup.rewarm")
+                        if not self.is_warm():
+                            # Nenhum host tem o modelo carregado: não pronto até voltar a aquecer
+                            self.phase = "warming"
+                            self._notify()
+                        await asyncio.gather(*(
+                            self._warm_host(client, url, models) for url, models in cold.items()
+                        ))
+                        await self._refresh_resident(client)
+                    phase = "ready" if self.is_warm() else "failed"
+                    if cold or phase != self.phase:
+                        self.phase = phase
+                        self._notify()
+                except Exception as e:
+                    print(f"⚠️ Erro na verificação de modelos residentes: {e}")
+
+    # ------------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------------
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """Chamado com gate() sempre que o estado do warm-up muda"""
+        self._listeners.append(listener)
+        listener(self.gate())
+
+    def _notify(self):
+        gate = self.gate()
+        for listener in self._listeners:
+            listener(gate)
+
+    def gate(self) -> Dict[str, Any]:
+        """Resumo para a readiness"""
+        ok = self.phase in ("ready", "disabled", "not_required")
+        detail = None
+        if not ok:
+            pending = [m for m in self.models if not any(
+                self._is_ready_on(h.url, m) for h in self.balancer.hosts if h.healthy
+            )]
+            detail = f"warm-up {self.phase}: {', '.join(pending) or 'a aguardar'}"
+        return {"ok": ok, "detail": detail, "phase": self.phase, "provider": self.provider}
+
+    def snapshot(self) -> Dict[str, Any]:
+        hosts = []
+        for host in self.balancer.hosts:
+            resident = self._resident.get(host.url)
+            hosts.append({
+                "url": host.url,
+                "healthy": host.healthy,
+                "resident": resident,
+                "models": {
+                    model: {
+                        "warm": self._is_ready_on(host.url, model),
+                        **self._warm.get((host.url, model), {}),
+                        "error": self._errors.get((host.url, model)),
+                    }
+                    for model in self.models + self.optional_models
+                },
+            })
+        return {
+            "phase": self.phase,
+            "provider": self.provider,
+            "keep_alive": self.keep_alive,
+            "models": self.models,
+            "optional_models": self.optional_models,
+            "hosts": hosts,
+        }
+
+
+def _env_models(name: str, default: List[str]) -> List[str]:
+    env_models = os.getenv(name)
+    if env_models is None:
+        return default
+    return [m.strip() for m in env_models.split(",") if m.strip()]
+
+
+# Instância global
+model_warmup = ModelWarmup(
+    llm_config.ollama_balancer,
+    models=_env_models("OLLAMA_WARMUP_MODELS", [llm_config.ollama_model]),
+    optional_models=_env_models("OLLAMA_WARMUP_OPTIONAL_MODELS", [llm_config.ollama_small_model]),
+    keep_alive=llm_config.ollama_keep_alive,
+    timeout=float(os.getenv("OLLAMA_WARMUP_TIMEOUT", "300")),
+    check_interval=float(os.getenv("OLLAMA_WARMUP_CHECK_INTERVAL", "60")),
+    enabled=os.getenv("OLLAMA_WARMUP_ENABLED", "true").lower() == "true",
+)
@@ -0,0 +1,259 @@
+# backend/config/ollama_balancer.py
+"""
+Load balancer para vários hosts Ollama
+
+- Seleção por least-outstanding-requests ou ponderada pela latência (EWMA)
+- Health probes em background que ejetam e readmitem hosts
+- Afinidade opcional por conversation_id (reaproveita o KV cache do prompt)
+- Os probes guardam os modelos de cada host (readiness sem pedidos extra)
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+import httpx
+
+
+def normalize_model(name: str) -> str:
+    return name if ":" in name else f"{name}:latest"
+
+
+class OllamaHost:
+    """Estado de um host Ollama visto pelo balancer"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+        self.total_requests = 0
+        self.last_error: Optional[str] = None
+        self.models: Optional[FrozenSet[str]] = None  # None = ainda sem probe OK
+        self.last_probe_at: Optional[float] = None
+
+    def has_model(self, model: str) -> bool:
+        """Se o último probe listou o modelo (sem tag = :latest)"""
+        return self.models is not None and normalize_model(model) in self.models
+
+    def score(self, strategy: str) -> float:
+        """Custo estimado de enviar mais um pedido para este host (menor é melhor)"""
+        if strategy == "least_outstanding":
+            return float(self.outstanding)
+        # latency: pedidos em curso ponderados pela latência média observada
+        # (host sem amostras tem custo 0 para ser explorado primeiro)
+        latency = self.ewma_latency if self.ewma_latency is not None else 0.0
+        return (self.outstanding + 1) * latency
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "ewma_latency_s": round(self.ewma_latency, 4) if self.ewma_latency is not None else None,
+            "total_requests": self.total_requests,
+            "last_error": self.last_error,
+            "models": sorted(self.models) if self.models is not None else None,
+        }
+
+
+class OllamaLoadBalancer:
+    """Distribui pedidos por vários hosts Ollama"""
+
+    STRATEGIES = ("least_outstanding", "latency")
+
+    def __init__(
+        self,
+        urls: List[str],
+        strategy: str = "latency",
+        affinity: bool = False,
+        probe_interval: float = 10.0,
+        probe_timeout: float = 2.0,
+        eject_after: int = 2,
+        readmit_after: int = 1,
+        ewma_alpha: float = 0.3,
+    ):
+        """
+        Args:
+            urls: Lista de base URLs Ollama
+            strategy: "least_outstanding" ou "latency"
+            affinity: Se True, a mesma conversa vai sempre para o mesmo host saudável
+            probe_interval: Segundos entre health probes
+            probe_timeout: Timeout de cada probe
+            eject_after: Falhas consecutivas até ejetar o host
+            readmit_after: Probes OK consecutivos até readmitir o host
+            ewma_alpha: Peso da última amostra na média de latência
+        """
+        if not urls:
+            raise ValueError("É necessário pelo menos um URL Ollama")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Estratégia de balanceamento não suportada: {strategy}")
+
+        self.hosts = [OllamaHost(url) for url in dict.fromkeys(urls)]
+        self.strategy = strategy
+        self.affinity = affinity
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.eject_after = eject_after
+        self.readmit_after = readmit_after
+        self.ewma_alpha = ewma_alpha
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._probe_listeners: List[Callable[[], None]] = []
+
+    # ------------------------------------------------------------------------
+    # Seleção
+    # ------------------------------------------------------------------------
+
+    def select(self, conversation_id: Optional[str] = None) -> OllamaHost:
+        """Escolhe o host para o próximo pedido"""
+        with self._lock:
+            candidates = [h for h in self.hosts if h.healthy]
+            if not candidates:
+                # Fail open: sem hosts saudáveis, tenta todos
+                candidates = self.hosts
+
+            if self.affinity and conversation_id:
+                return self._rendezvous(candidates, conversation_id)
+
+            return min(candidates, key=lambda h: h.score(self.strategy))
+
+    def pick_url(self, conversation_id: Optional[str] = None) -> str:
+        """Atalho para obter só o URL do host escolhido"""
+        return self.select(conversation_id).url
+
+    @staticmethod
+    def _rendezvous(candidates: List[OllamaHost], key: str) -> OllamaHost:
+        """Rendezvous hashing: estável e só remapeia conversas do host ejetado"""
+        def weight(host: OllamaHost) -> int:
+            digest = hashlib.blake2b(f"{host.url}|{key}".encode(), digest_size=8).digest()
+            return int.from_bytes(digest, "big")
+        return max(candidates, key=weight)
+
+    # ------------------------------------------------------------------------
+    # Tracking de pedidos
+    # ------------------------------------------------------------------------
+
+    @contextmanager
+    def track(self, host: OllamaHost):
+        """Contabiliza um pedido em curso e a sua latência"""
+        with self._lock:
+            host.outstanding += 1
+            host.total_requests += 1
+        start = time.perf_counter()
+        try:
+            yield host
+        except Exception as e:
+            self._record_failure(host, str(e))
+            raise
+        else:
+            self._record_success(host, time.perf_counter() - start)
+        finally:
+            with self._lock:
+                host.outstanding -= 1
+
+    @contextmanager
+    def request(self, conversation_id: Optional[str] = None):
+        """Seleciona um host e contabiliza o pedido feito dentro do bloco"""
+        host = self.select(conversation_id)
+        with self.track(host):
+            yield host
+
+    def _record_success(self, host: OllamaHost, latency: Optional[float] = None):
+        with self._lock:
+            if latency is not None:
+                if host.ewma_latency is None:
+                    host.ewma_latency = latency
+                else:
+                    host.ewma_latency = (
+                        self.ewma_alpha * latency + (1 - self.ewma_alpha) * host.ewma_latency
+                    )
+            host.consecutive_failures = 0
+            host.consecutive_successes += 1
+            if not host.healthy and host.consecutive_successes >= self.readmit_after:
+                host.healthy = True
+                print(f"✅ Ollama host readmitido: {host.url}")
+
+    def _record_failure(self, host: OllamaHost, error: str):
+        with self._lock:
+            host.last_error = error
+            host.consecutive_successes = 0
+            host.consecutive_failures += 1
+            if host.healthy and host.consecutive_failures >= self.eject_after:
+                host.healthy = False
+                print(f"⚠️ Ollama host ejetado: {host.url} ({error})")
+
+    # ------------------------------------------------------------------------
+    # Health probes
+    # ------------------------------------------------------------------------
+
+    def probe(self, host: OllamaHost) -> bool:
+        """Faz um probe a /api/tags e atualiza o estado do host"""
+        try:
+            response = httpx.get(f"{host.url}/api/tags", timeout=self.probe_timeout)
+            response.raise_for_status()
+            models = frozenset(
+                normalize_model(model["name"]) for model in response.json().get("models", [])
+            )
+        except Exception as e:
+            with self._lock:
+                host.last_probe_at = time.time()
+            self._record_failure(host, str(e))
+            return False
+        with self._lock:
+            host.models = models
+            host.last_probe_at = time.time()
+        self._record_success(host)
+        return True
+
+    def probe_all(self):
+        for host in self.hosts:
+            self.probe(host)
+        for listener in self._probe_listeners:
+            try:
+                listener()
+            except Exception as e:
+                print(f"⚠️ Erro num listener dos probes Ollama: {e}")
+
+    def add_probe_listener(self, listener: Callable[[], None]):
+        """Chamado (na thread dos probes) depois de cada ronda de probes"""
+        self._probe_listeners.append(listener)
+
+    def start_health_checks(self):
+        """Arranca a thread de health probes (idempotente)"""
+        if self._probe_thread is not None and self._probe_thread.is_alive():
+            return
+        self._stop.clear()
+        self._probe_thread = threading.Thread(
+            target=self._probe_loop, name="ollama-health-probe", daemon=True
+        )
+        self._probe_thread.start()
+
+    def stop_health_checks(self):
+        self._stop.set()
+        if self._probe_thread is not None:
+            self._probe_thread.join(timeout=self.probe_timeout + 1)
+            self._probe_thread = None
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.probe_interval)
+
+    # ------------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "affinity": self.affinity,
+                "hosts": [h.to_dict() for h in self.hosts],
+            }
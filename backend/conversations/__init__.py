@@ -0,0 +1,4 @@
+from .conversation_log import ConversationLog
+from .conversation_store import Conversation, ConversationStore, Turn
+
+__all__ = ["Conversation", "ConversationLog", "ConversationStore", "Turn"]
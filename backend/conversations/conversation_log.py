@@ -0,0 +1,587 @@
+# backend/conversations/conversation_log.py
+"""
+Log append-only das conversas em disco (sobrevive a restarts)
+
+Formato:
+- Segmentos seg-<id>.log em CONVERSATION_LOG_DIR; só o segmento ativo
+  recebe escritas e roda ao passar de CONVERSATION_LOG_SEGMENT_MB
+- Cada segmento começa com um cabeçalho (magic, LSN mínimo, flags) seguido de
+  registos: cabeçalho fixo (crc32, LSN, timestamp, tipo, tamanhos),
+  conversation_id e payload JSON {"role", "content"}
+- Tipos: TURN (um turno) e DELETE (tombstone da conversa)
+- LSN global e crescente: ordena os registos no rebuild e serve de versão
+  das conversas (nunca volta atrás, mesmo depois de compactar)
+
+Em memória fica só um índice por conversa (offsets dos payloads, em arrays
+compactos); os históricos são lidos por mmap, sem carregar os ficheiros.
+
+A compactação (thread em background) apaga as conversas expiradas
+(CONVERSATION_TTL_DAYS) e, quando a fração de lixo nos segmentos fechados
+passa CONVERSATION_LOG_COMPACT_RATIO, copia os registos vivos para um novo
+segmento e remove os antigos.
+
+Um só processo pode usar a pasta: o log guarda o LSN seguinte em memória,
+e dois workers a escrever no mesmo segmento repetiam LSNs (o rebuild
+descartava um dos registos). O primeiro processo fica com um flock
+exclusivo sobre a pasta; nos restantes o log é desativado (histórico só
+em memória).
+
+No arranque o índice é reconstruído lendo só os cabeçalhos dos registos;
+o CRC só é verificado no segmento ativo, o único que pode ter ficado com
+uma escrita a meio (é truncado no último registo válido).
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+SEGMENT_MAGIC = b"CLOG0001"
+SEGMENT_HEADER = struct.Struct("<8sQB")  # magic, LSN mínimo, flags
+SEGMENT_COMPACTED = 1  # Escrito de uma vez pela compactação (nunca fica a meio)
+RECORD_HEADER = struct.Struct("<IQdBHI")  # crc32, lsn, ts, kind, len(cid), len(payload)
+
+LOCK_FILE = "LOCK"
+
+KIND_TURN = 1
+KIND_DELETE = 2
+
+# Offsets no índice: (id do segmento << OFFSET_BITS) | offset do payload
+OFFSET_BITS = 40
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+
+
+class ConversationIndex:
+    """Localização em disco dos turnos de uma conversa"""
+
+    __slots__ = ("locations", "lengths", "version", "created_at", "updated_at")
+
+    def __init__(self, created_at: float):
+        self.locations = array("Q")
+        self.lengths = array("I")
+        self.version = 0
+        self.created_at = created_at
+        self.updated_at = created_at
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+
+def _segment_name(segment_id: int) -> str:
+    return f"seg-{segment_id:08d}.log"
+
+
+class ConversationLog:
+    """
+    Log de conversas em segmentos append-only com índice em memória
+
+    Thread-safe (um lock para escritas, leituras e compactação).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: Optional[float] = 30 * 24 * 3600,
+        compact_ratio: float = 0.5,
+        compact_interval: float = 300.0,
+        fsync: bool = False,
+    ):
+        """
+        Args:
+            directory: Pasta dos segmentos (criada se não existir)
+            segment_bytes: Tamanho a partir do qual o segmento ativo roda
+            ttl_seconds: Conversas sem atividade há mais do que isto são apagadas (None = nunca)
+            compact_ratio: Fração de lixo nos segmentos fechados que dispara a compactação
+            compact_interval: Intervalo da thread de compactação
+            fsync: fsync a cada escrita (mais lento; por omissão só ao rodar/compactar)
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.ttl_seconds = ttl_seconds
+        self.compact_ratio = compact_ratio
+        self.compact_interval = compact_interval
+        self.fsync = fsync
+        self.on_expired: Optional[Callable[[List[str]], None]] = None
+
+        self._index: Dict[str, ConversationIndex] = {}
+        self._segment_sizes: Dict[int, int] = {}  # bytes de registos por segmento
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._next_lsn = 1
+        self._active_id = 0
+        self._active_file = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        self._dir_lock = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_directory()
+        start = time.perf_counter()
+        records = self._rebuild()
+        duration = time.perf_counter() - start
+        metrics.observe("conversation_log.rebuild_s", duration)
+        print(f"📚 Conversation log: {len(self._index)} conversas, {records} registos ({duration:.2f}s)")
+
+    def _lock_directory(self):
+        """Lock exclusivo sobre a pasta; falha se outro processo já a usa"""
+        if fcntl is None:
+            return
+        f = open(os.path.join(self.directory, LOCK_FILE), "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            raise RuntimeError(f"{self.directory} já está em uso por outro processo (um worker por log)")
+        self._dir_lock = f
+
+    # ------------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------------
+
+    def append(self, conversation_id: str, messages: List[Dict[str, str]]) -> int:
+        """
+        Acrescenta turnos à conversa
+
+        Returns:
+            Versão da conversa (LSN do último registo)
+        """
+        with self._lock:
+            entry = self._index.get(conversation_id)
+            now = time.time()
+            if entry is None:
+                entry = self._index[conversation_id] = ConversationIndex(now)
+            for msg in messages:
+                payload = json.dumps(
+                    {"role": msg["role"], "content": msg["content"]}, ensure_ascii=False
+                ).encode("utf-8")
+                lsn, location = self._write(KIND_TURN, conversation_id, payload, now)
+                entry.locations.append(location)
+                entry.lengths.append(len(payload))
+                entry.version = lsn
+            entry.updated_at = now
+            self._flush()
+            return entry.version
+
+    def delete(self, conversation_id: str) -> Optional[int]:
+        """Apaga a conversa (tombstone); devolve o LSN do tombstone ou None se não existia"""
+        with self._lock:
+            if self._index.pop(conversation_id, None) is None:
+                return None
+            lsn, _ = self._write(KIND_DELETE, conversation_id, b"", time.time())
+            self._flush()
+            metrics.incr("conversation_log.deleted")
+            return lsn
+
+    def _write(self, kind: int, conversation_id: str, payload: bytes, ts: float) -> Tuple[int, int]:
+        """Escreve um registo no segmento ativo; devolve (lsn, localização do payload)"""
+        cid = conversation_id.encode("utf-8")
+        size = RECORD_HEADER.size + len(cid) + len(payload)
+        active_size = self._segment_sizes[self._active_id]
+        if active_size and SEGMENT_HEADER.size + active_size + size > self.segment_bytes:
+            self._rotate()
+
+        lsn = self._next_lsn
+        self._next_lsn += 1
+        body = struct.pack("<QdBHI", lsn, ts, kind, len(cid), len(payload)) + cid + payload
+        crc = zlib.crc32(body)
+        offset = self._active_file.tell()
+        self._active_file.write(struct.pack("<I", crc) + body)
+        self._segment_sizes[self._active_id] += size
+        metrics.incr("conversation_log.bytes_written", size)
+
+        payload_offset = offset + RECORD_HEADER.size + len(cid)
+        return lsn, (self._active_id << OFFSET_BITS) | payload_offset
+
+    def _flush(self):
+        self._active_file.flush()
+        if self.fsync:
+            os.fsync(self._active_file.fileno())
+
+    # ------------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------------
+
+    def read(self, conversation_id: str, start: int = 0, limit: Optional[int] = None) -> Optional[List[Dict[str, str]]]:
+        """
+        Turnos da conversa lidos por mmap (None se não existir)
+
+        Args:
+            start: Índice do primeiro turno
+            limit: Nº máximo de turnos (None = até ao fim)
+        """
+        with self._lock:
+            entry = self._index.get(conversation_id)
+            if entry is None:
+                return None
+            end = len(entry) if limit is None else min(len(entry), start + limit)
+            turns = []
+            for i in range(start, end):
+                location = entry.locations[i]
+                data = self._map(location >> OFFSET_BITS)
+                offset = location & OFFSET_MASK
+                turns.append(json.loads(data[offset:offset + entry.lengths[i]]))
+            return turns
+
+    def info(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Metadados da conversa (sem ler os turnos)"""
+        with self._lock:
+            entry = self._index.get(conversation_id)
+            if entry is None:
+                return None
+            return {
+                "conversation_id": conversation_id,
+                "turns": len(entry),
+                "version": entry.version,
+                "created_at": entry.created_at,
+                "updated_at": entry.updated_at,
+            }
+
+    def list_info(self) -> List[Dict[str, Any]]:
+        """Metadados de todas as conversas"""
+        with self._lock:
+            return [
+                {
+                    "conversation_id": cid,
+                    "turns": len(entry),
+                    "version": entry.version,
+                    "created_at": entry.created_at,
+                    "updated_at": entry.updated_at,
+                }
+                for cid, entry in self._index.items()
+            ]
+
+    def conversation_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._index)
+
+    @property
+    def last_lsn(self) -> int:
+        """LSN do último registo escrito (muda a cada alteração do log)"""
+        with self._lock:
+            return self._next_lsn - 1
+
+    def _map(self, segment_id: int) -> mmap.mmap:
+        """mmap do segmento; o ativo é remapeado quando cresceu desde o último map"""
+        data = self._maps.get(segment_id)
+        if segment_id == self._active_id:
+            self._active_file.flush()
+            size = self._active_file.tell()
+            if data is not None and len(data) < size:
+                data.close()
+                data = None
+        if data is None:
+            with open(self._segment_path(segment_id), "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment_id] = data
+        return data
+
+    # ------------------------------------------------------------------------
+    # Segmentos
+    # ------------------------------------------------------------------------
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, _segment_name(segment_id))
+
+    def _list_segments(self) -> List[int]:
+        ids = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".log.tmp"):
+                # Compactação interrompida: os segmentos originais continuam lá
+                os.remove(os.path.join(self.directory, name))
+            elif name.startswith("seg-") and name.endswith(".log"):
+                ids.append(int(name[4:-4]))
+        return sorted(ids)
+
+    def _open_segment(self, segment_id: int):
+        """Cria um segmento novo e torna-o o ativo"""
+        path = self._segment_path(segment_id)
+        f = open(path, "ab")
+        f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, self._next_lsn, 0))
+        self._active_id = segment_id
+        self._active_file = f
+        self._segment_sizes[segment_id] = 0
+
+    def _rotate(self):
+        """Fecha o segmento ativo e abre o seguinte"""
+        self._active_file.flush()
+        os.fsync(self._active_file.fileno())
+        self._active_file.close()
+        old = self._maps.pop(self._active_id, None)
+        if old is not None:
+            old.close()
+        self._open_segment(max(self._segment_sizes) + 1)
+        metrics.incr("conversation_log.segments_rotated")
+
+    # ------------------------------------------------------------------------
+    # Rebuild do índice
+    # ------------------------------------------------------------------------
+
+    def _rebuild(self) -> int:
+        """Reconstrói o índice a partir dos segmentos; devolve o nº de registos lidos"""
+        segments = self._list_segments()
+        records = []  # (lsn, kind, cid, localização, len(payload), ts)
+        max_lsn = 0
+        active_id = None
+
+        for segment_id in reversed(segments):
+            data = self._open_for_rebuild(segment_id)
+            if data is None:
+                continue
+            _, base_lsn, flags = SEGMENT_HEADER.unpack_from(data, 0)
+            max_lsn = max(max_lsn, base_lsn - 1)
+            # O ativo é o segmento normal mais recente; os compactados são escritos
+            # de uma vez e os restantes foram fechados com fsync ao rodar
+            verify = active_id is None and not flags & SEGMENT_COMPACTED
+            if verify:
+                active_id = segment_id
+            end = self._scan_segment(segment_id, data, verify, records)
+            data.close()
+            self._segment_sizes[segment_id] = end - SEGMENT_HEADER.size
+
+        # Registos copiados pela compactação podem aparecer em segmentos mais
+        # recentes do que outros posteriores: a ordem certa é a do LSN
+        records.sort(key=lambda record: record[0])
+        seen_lsn = 0
+        for lsn, kind, cid, location, payload_len, ts in records:
+            if lsn == seen_lsn:
+                continue  # Duplicado (compactação interrompida antes de apagar os antigos)
+            seen_lsn = lsn
+            if kind == KIND_DELETE:
+                self._index.pop(cid, None)
+                continue
+            entry = self._index.get(cid)
+            if entry is None:
+                entry = self._index[cid] = ConversationIndex(ts)
+            entry.locations.append(location)
+            entry.lengths.append(payload_len)
+            entry.version = lsn
+            entry.updated_at = ts
+
+        self._next_lsn = max(max_lsn, seen_lsn) + 1
+        if active_id is not None:
+            self._active_id = active_id
+            self._active_file = open(self._segment_path(active_id), "ab")
+        else:
+            self._open_segment(max(self._segment_sizes, default=0) + 1)
+        return len(records)
+
+    def _open_for_rebuild(self, segment_id: int) -> Optional[mmap.mmap]:
+        """mmap de um segmento para o rebuild (None e apagado se nem tem cabeçalho)"""
+        path = self._segment_path(segment_id)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size >= SEGMENT_HEADER.size:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if data[:len(SEGMENT_MAGIC)] == SEGMENT_MAGIC:
+                    return data
+                data.close()
+                raise ValueError(f"Segmento inválido: {path}")
+        # Criado mas sem cabeçalho completo (crash logo após rodar)
+        os.remove(path)
+        return None
+
+    def _scan_segment(self, segment_id: int, data: mmap.mmap, verify: bool, records: list) -> int:
+        """Lê os cabeçalhos dos registos do segmento; devolve o offset do fim válido"""
+        offset = SEGMENT_HEADER.size
+        size = len(data)
+        while offset + RECORD_HEADER.size <= size:
+            crc, lsn, ts, kind, cid_len, payload_len = RECORD_HEADER.unpack_from(data, offset)
+            end = offset + RECORD_HEADER.size + cid_len + payload_len
+            if end > size or (verify and zlib.crc32(data[offset + 4:end]) != crc):
+                break
+            cid_start = offset + RECORD_HEADER.size
+            cid = data[cid_start:cid_start + cid_len].decode("utf-8")
+            location = (segment_id << OFFSET_BITS) | (cid_start + cid_len)
+            records.append((lsn, kind, cid, location, payload_len, ts))
+            offset = end
+
+        if offset < size:
+            path = self._segment_path(segment_id)
+            if not verify:
+                raise ValueError(f"Segmento corrompido: {path} (offset {offset})")
+            # Escrita interrompida a meio: descarta o resto
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+            metrics.incr("conversation_log.truncated_tail")
+            print(f"⚠️ Conversation log: registo incompleto descartado em {path}")
+        return offset
+
+    # ------------------------------------------------------------------------
+    # Compactação
+    # ------------------------------------------------------------------------
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """Apaga as conversas sem atividade há mais de ttl_seconds"""
+        if not self.ttl_seconds:
+            return []
+        cutoff = (now or time.time()) - self.ttl_seconds
+        with self._lock:
+            expired = [cid for cid, entry in self._index.items() if entry.updated_at < cutoff]
+            for cid in expired:
+                self.delete(cid)
+        if expired:
+            metrics.incr("conversation_log.expired", len(expired))
+        return expired
+
+    def garbage_ratio(self) -> float:
+        """Fração de bytes mortos nos segmentos fechados"""
+        with self._lock:
+            sealed_total, sealed_live = self._sealed_usage()
+            return 1 - sealed_live / sealed_total if sealed_total else 0.0
+
+    def _sealed_usage(self) -> Tuple[int, int]:
+        """(bytes totais, bytes vivos) dos segmentos fechados. Requer o lock"""
+        total = sum(size for sid, size in self._segment_sizes.items() if sid != self._active_id)
+        live = 0
+        for cid, entry in self._index.items():
+            overhead = RECORD_HEADER.size + len(cid.encode("utf-8"))
+            for location, length in zip(entry.locations, entry.lengths):
+                if location >> OFFSET_BITS != self._active_id:
+                    live += overhead + length
+        return total, live
+
+    def compact(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Copia os registos vivos dos segmentos fechados para um segmento novo
+        e apaga os antigos (se a fração de lixo justificar, ou force=True)
+        """
+        with self._lock:
+            sealed = [sid for sid in self._segment_sizes if sid != self._active_id]
+            sealed_total, sealed_live = self._sealed_usage()
+            ratio = 1 - sealed_live / sealed_total if sealed_total else 0.0
+            if not sealed or (not force and ratio < self.compact_ratio):
+                return {"compacted": False, "garbage_ratio": round(ratio, 4)}
+
+            start = time.perf_counter()
+            new_id = max(self._segment_sizes) + 1
+            tmp_path = self._segment_path(new_id) + ".tmp"
+            moved: List[Tuple[ConversationIndex, int, int]] = []  # (entry, posição, nova localização)
+
+            with open(tmp_path, "wb") as out:
+                out.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, self._next_lsn, SEGMENT_COMPACTED))
+                written = 0
+                for cid, entry in self._index.items():
+                    header_len = RECORD_HEADER.size + len(cid.encode("utf-8"))
+                    for i, location in enumerate(entry.locations):
+                        segment_id = location >> OFFSET_BITS
+                        if segment_id == self._active_id:
+                            continue
+                        payload_offset = location & OFFSET_MASK
+                        record_start = payload_offset - header_len
+                        record_end = payload_offset + entry.lengths[i]
+                        new_offset = SEGMENT_HEADER.size + written
+                        # O registo é copiado tal como está (CRC e LSN incluídos)
+                        out.write(self._map(segment_id)[record_start:record_end])
+                        written += record_end - record_start
+                        moved.append((entry, i, (new_id << OFFSET_BITS) | (new_offset + header_len)))
+                out.flush()
+                os.fsync(out.fileno())
+            if written:
+                os.replace(tmp_path, self._segment_path(new_id))
+                self._segment_sizes[new_id] = written
+            else:
+                # Nada vivo: basta apagar (o segmento ativo mantém o LSN mínimo)
+                os.remove(tmp_path)
+
+            for entry, i, location in moved:
+                entry.locations[i] = location
+            for segment_id in sealed:
+                data = self._maps.pop(segment_id, None)
+                if data is not None:
+                    data.close()
+                os.remove(self._segment_path(segment_id))
+                del self._segment_sizes[segment_id]
+
+            duration = time.perf_counter() - start
+            metrics.incr("conversation_log.compactions")
+            metrics.incr("conversation_log.bytes_reclaimed", sealed_total - written)
+            metrics.observe("conversation_log.compaction_s", duration)
+            return {
+                "compacted": True,
+                "garbage_ratio": round(ratio, 4),
+                "segments_removed": len(sealed),
+                "bytes_before": sealed_total,
+                "bytes_after": written,
+                "duration_s": round(duration, 4),
+            }
+
+    def _compaction_loop(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                expired = self.expire()
+                if expired and self.on_expired is not None:
+                    self.on_expired(expired)
+                self.compact()
+            except Exception as e:
+                metrics.incr("conversation_log.compaction_errors")
+                print(f"⚠️ Erro na compactação do conversation log: {e}")
+
+    def start_compaction(self):
+        """Inicia a thread de compactação (idempotente)"""
+        if self._compactor is None or not self._compactor.is_alive():
+            self._stop.clear()
+            self._compactor = threading.Thread(
+                target=self._compaction_loop, name="conversation-log-compaction", daemon=True
+            )
+            self._compactor.start()
+
+    def close(self):
+        """Para a compactação e fecha os ficheiros"""
+        self._stop.set()
+        with self._lock:
+            for data in self._maps.values():
+                data.close()
+            self._maps.clear()
+            if self._active_file is not None and not self._active_file.closed:
+                self._active_file.flush()
+                os.fsync(self._active_file.fileno())
+                self._active_file.close()
+            if self._dir_lock is not None:
+                self._dir_lock.close()  # Liberta o flock
+                self._dir_lock = None
+
+    # ------------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "conversations": len(self._index),
+                "segments": len(self._segment_sizes),
+                "active_segment": self._active_id,
+                "bytes": sum(self._segment_sizes.values()),
+                "next_lsn": self._next_lsn,
+            }
+
+
+def create_conversation_log() -> Optional[ConversationLog]:
+    """Log configurado por env (CONVERSATION_LOG_ENABLED=false desativa)"""
+    if os.getenv("CONVERSATION_LOG_ENABLED", "true").lower() != "true":
+        return None
+    ttl_days = float(os.getenv("CONVERSATION_TTL_DAYS", "30"))
+    try:
+        return ConversationLog(
+            directory=os.getenv("CONVERSATION_LOG_DIR", "data/conversations"),
+            segment_bytes=int(float(os.getenv("CONVERSATION_LOG_SEGMENT_MB", "16")) * 1024 * 1024),
+            ttl_seconds=ttl_days * 24 * 3600 if ttl_days > 0 else None,
+            compact_ratio=float(os.getenv("CONVERSATION_LOG_COMPACT_RATIO", "0.5")),
+            compact_interval=float(os.getenv("CONVERSATION_LOG_COMPACT_INTERVAL", "300")),
+            fsync=os.getenv("CONVERSATION_LOG_FSYNC", "false").lower() == "true",
+        )
+    except Exception as e:
+        print(f"⚠️ Conversation log indisponível (histórico só em memória): {e}")
+        return None
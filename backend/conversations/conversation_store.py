@@ -0,0 +1,446 @@
+# backend/conversations/conversation_store.py
+"""
+Histórico das conversas guardado no servidor, por conversation_id
+
+Cada turno é um registo compacto (__slots__) em vez de uma mensagem
+LangChain completa:
+- role internado (uma única string "user"/"assistant" partilhada)
+- conteúdo em bytes UTF-8; turnos antigos comprimidos com zlib quando compensa
+
+O total ocupado é contabilizado por conversa e limitado por um orçamento
+global (CONVERSATION_STORE_MAX_MB): ao excedê-lo, as conversas paradas há
+mais tempo são removidas (LRU).
+
+Com o log em disco ativo (conversation_log.py) o store funciona como cache:
+as escritas passam pelo log e uma conversa removida da memória (ou de antes
+de um restart) é recarregada do log quando volta a ser pedida. A versão de
+cada conversa passa a ser o LSN do log, que nunca volta atrás. O log é
+aberto no startup da app (attach_log), não ao importar o módulo.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import metrics
+from .conversation_log import ConversationLog
+
+# Digest de uma conversa vazia; cada turno encadeia:
+# sha256(digest_anterior + "\n" + role + "\n" + content) em hex
+EMPTY_DIGEST = hashlib.sha256(b"").hexdigest()
+
+
+def chain_digest(digest: str, role: str, content: str) -> str:
+    """Digest da conversa depois de acrescentar um turno"""
+    return hashlib.sha256(f"{digest}\n{role}\n{content}".encode("utf-8")).hexdigest()
+
+
+def history_digest(messages: List[Dict[str, str]]) -> str:
+    """Digest encadeado de uma lista de mensagens (igual ao de uma conversa com esses turnos)"""
+    digest = EMPTY_DIGEST
+    for msg in messages:
+        digest = chain_digest(digest, msg["role"], msg["content"])
+    return digest
+
+
+class HistoryConflict(Exception):
+    """A conversa mudou desde a versão em que o cliente se baseou"""
+
+    def __init__(self, conversation_id: str, expected: int, current: int):
+        super().__init__(f"Conversa {conversation_id}: versão {expected} esperada, atual {current}")
+        self.conversation_id = conversation_id
+        self.expected = expected
+        self.current = current
+
+
+class Turn:
+    """Um turno da conversa (role + conteúdo, possivelmente comprimido)"""
+
+    __slots__ = ("role", "data", "compressed", "created_at")
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self.data = content.encode("utf-8")
+        self.compressed = False
+        self.created_at = time.time()
+
+    @property
+    def content(self) -> str:
+        data = zlib.decompress(self.data) if self.compressed else self.data
+        return data.decode("utf-8")
+
+    def compress(self, min_bytes: int) -> int:
+        """Comprime o conteúdo se for grande e ficar mais pequeno; devolve bytes poupados"""
+        if self.compressed or len(self.data) < min_bytes:
+            return 0
+        packed = zlib.compress(self.data, 6)
+        saved = len(self.data) - len(packed)
+        if saved <= 0:
+            return 0
+        self.data = packed
+        self.compressed = True
+        return saved
+
+    def nbytes(self) -> int:
+        # O role é partilhado (internado) e não conta para o turno
+        return sys.getsizeof(self) + sys.getsizeof(self.data)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+
+class Conversation:
+    """Turnos de uma conversa e a sua contabilidade de memória"""
+
+    __slots__ = ("id", "turns", "nbytes", "version", "digest", "created_at", "updated_at", "last_access")
+
+    def __init__(self, conversation_id: str):
+        self.id = conversation_id
+        self.turns: List[Turn] = []
+        self.nbytes = sys.getsizeof(self) + sys.getsizeof(self.turns)
+        self.version = 0
+        self.digest = EMPTY_DIGEST
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.last_access = self.created_at
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "conversation_id": self.id,
+            "turns": len(self.turns),
+            "compressed_turns": sum(1 for t in self.turns if t.compressed),
+            "bytes": self.nbytes,
+            "version": self.version,
+            "idle_s": round(time.time() - self.last_access, 1),
+        }
+
+
+class ConversationStore:
+    """
+    Conversas em memória com orçamento global e evicção LRU
+
+    Thread-safe: é usado tanto pelos endpoints async como pelos runs em threads.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        keep_recent: int = 8,
+        compress_min_bytes: int = 256,
+        log: Optional[ConversationLog] = None,
+    ):
+        """
+        Args:
+            max_bytes: Orçamento total de memória
+            keep_recent: Nº de turnos recentes de cada conversa que ficam por comprimir
+            compress_min_bytes: Tamanho mínimo de um turno para valer a pena comprimir
+            log: Log em disco (None = só memória)
+        """
+        self.max_bytes = max_bytes
+        self.keep_recent = keep_recent
+        self.compress_min_bytes = compress_min_bytes
+        self.log: Optional[ConversationLog] = None
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._total_bytes = 0
+        self._revision = 0
+        self._lock = threading.Lock()
+        if log is not None:
+            self.attach_log(log)
+
+    def attach_log(self, log: ConversationLog):
+        """Liga o log em disco (no startup da app, para o import não mexer em ficheiros)"""
+        with self._lock:
+            self.log = log
+            log.on_expired = self._forget
+
+    # ------------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------------
+
+    def get_history(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        """Histórico como lista de dicts {role, content}, ou None se não existir"""
+        with self._lock:
+            conversation = self._load(conversation_id)
+            if conversation is None:
+                return None
+            turns = list(conversation.turns)
+        return [turn.to_dict() for turn in turns]
+
+    def get_version(self, conversation_id: str) -> Optional[int]:
+        """Versão da conversa (cresce a cada alteração)"""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None:
+                return conversation.version
+        info = self.log.info(conversation_id) if self.log is not None else None
+        return info["version"] if info else None
+
+    def snapshot(self, conversation_id: str) -> Dict[str, Any]:
+        """Versão, digest e histórico completo (versão 0 e vazio se não existir)"""
+        with self._lock:
+            conversation = self._load(conversation_id)
+            if conversation is None:
+                return {"version": 0, "hash": EMPTY_DIGEST, "history": []}
+            version, digest, turns = conversation.version, conversation.digest, list(conversation.turns)
+        return {"version": version, "hash": digest, "history": [turn.to_dict() for turn in turns]}
+
+    def state(self, conversation_id: str) -> Dict[str, Any]:
+        """Versão e digest atuais (sem ler os turnos)"""
+        with self._lock:
+            conversation = self._load(conversation_id)
+            return self._state(conversation)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return self.get_version(conversation_id) is not None
+
+    def get_page(self, conversation_id: str, limit: int, before: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Página de turnos que acaba antes do índice `before` (None = os mais recentes)
+        Só os turnos da página são descomprimidos.
+
+        Returns:
+            {"version", "total_turns", "start", "turns"} ou None se a conversa não existir
+        """
+        with self._lock:
+            conversation = self._load(conversation_id)
+            if conversation is None:
+                return None
+            total = len(conversation.turns)
+            end = total if before is None else min(before, total)
+            start = max(0, end - limit)
+            turns = conversation.turns[start:end]
+            version = conversation.version
+        return {
+            "version": version,
+            "total_turns": total,
+            "start": start,
+            "turns": [turn.to_dict() for turn in turns],
+        }
+
+    def list_conversations(self) -> List[Dict[str, Any]]:
+        """Metadados de todas as conversas (do log, se ativo; senão as em memória)"""
+        if self.log is not None:
+            return self.log.list_info()
+        with self._lock:
+            return [
+                {
+                    "conversation_id": c.id,
+                    "turns": len(c.turns),
+                    "version": c.version,
+                    "created_at": c.created_at,
+                    "updated_at": c.updated_at,
+                }
+                for c in self._conversations.values()
+            ]
+
+    @property
+    def revision(self) -> int:
+        """Muda sempre que o conjunto de conversas muda (usado no ETag da listagem)"""
+        if self.log is not None:
+            return self.log.last_lsn
+        return self._revision
+
+    # ------------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------------
+
+    def append(self, conversation_id: str, messages: List[Dict[str, str]]) -> int:
+        """
+        Acrescenta turnos à conversa (cria-a se não existir)
+
+        Args:
+            conversation_id: ID da conversa
+            messages: Lista de dicts {role, content}
+
+        Returns:
+            Nova versão da conversa
+        """
+        with self._lock:
+            return self._append(conversation_id, messages)
+
+    def append_if(self, conversation_id: str, messages: List[Dict[str, str]], expected_version: int) -> Dict[str, Any]:
+        """
+        Acrescenta turnos só se a conversa ainda estiver na versão esperada
+
+        Raises:
+            HistoryConflict se entretanto outro pedido alterou a conversa
+        """
+        with self._lock:
+            conversation = self._load(conversation_id)
+            current = conversation.version if conversation is not None else 0
+            if current != expected_version:
+                metrics.incr("conversations.conflicts")
+                raise HistoryConflict(conversation_id, expected_version, current)
+            self._append(conversation_id, messages)
+            return self._state(self._conversations[conversation_id])
+
+    def sync(self, conversation_id: str, history: List[Dict[str, str]]) -> int:
+        """
+        Acerta a conversa com o histórico completo de um run
+
+        Normalmente só faltam os turnos novos no fim e só esses são
+        acrescentados (se foi removida por LRU, volta a ser criada); se o
+        histórico não começar pelos turnos guardados (mais curto ou com
+        conteúdo diferente, comparado pelo digest), é substituída.
+        """
+        with self._lock:
+            conversation = self._load(conversation_id)
+            stored = len(conversation.turns) if conversation else 0
+            if stored and (stored > len(history) or history_digest(history[:stored]) != conversation.digest):
+                # Recomeça sem perder a versão (continua a crescer)
+                freed = sum(turn.nbytes() for turn in conversation.turns)
+                conversation.turns = []
+                conversation.nbytes -= freed
+                conversation.digest = EMPTY_DIGEST
+                self._total_bytes -= freed
+                tombstone = self.log.delete(conversation_id) if self.log is not None else None
+                conversation.version = tombstone or conversation.version + 1
+                stored = 0
+            return self._append(conversation_id, history[stored:])
+
+    def delete(self, conversation_id: str) -> bool:
+        """Apaga a conversa da memória e do log"""
+        with self._lock:
+            removed = self._remove(conversation_id)
+            if self.log is not None:
+                removed = self.log.delete(conversation_id) is not None or removed
+            self._changed()
+            return removed
+
+    # ------------------------------------------------------------------------
+    # Memória
+    # ------------------------------------------------------------------------
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Bytes por conversa (mais recentes primeiro) e total ocupado"""
+        with self._lock:
+            conversations = [c.stats() for c in reversed(self._conversations.values())]
+            total = self._total_bytes
+        return {
+            "total_bytes": total,
+            "max_bytes": self.max_bytes,
+            "usage": round(total / self.max_bytes, 4) if self.max_bytes else None,
+            "conversations_count": len(conversations),
+            "conversations": conversations,
+            "log": self.log.stats() if self.log is not None else None,
+        }
+
+    def _append(self, conversation_id: str, messages: List[Dict[str, str]]) -> int:
+        """Acrescenta turnos (memória e log) e aplica compressão e orçamento. Requer o lock"""
+        conversation = self._load(conversation_id)
+        if conversation is None:
+            conversation = self._create(conversation_id)
+            metrics.incr("conversations.created")
+
+        if messages:
+            conversation.updated_at = time.time()
+            if self.log is not None:
+                conversation.version = self.log.append(conversation_id, messages)
+            else:
+                conversation.version += len(messages)
+        self._add_turns(conversation, messages)
+        self._evict(keep=conversation_id)
+        self._changed()
+        return conversation.version
+
+    @staticmethod
+    def _state(conversation: Optional[Conversation]) -> Dict[str, Any]:
+        if conversation is None:
+            return {"version": 0, "hash": EMPTY_DIGEST, "turns": 0}
+        return {"version": conversation.version, "hash": conversation.digest, "turns": len(conversation.turns)}
+
+    def _create(self, conversation_id: str) -> Conversation:
+        """Requer o lock"""
+        conversation = Conversation(conversation_id)
+        self._conversations[conversation_id] = conversation
+        self._total_bytes += conversation.nbytes
+        return conversation
+
+    def _add_turns(self, conversation: Conversation, messages: List[Dict[str, str]]):
+        """Requer o lock"""
+        before = conversation.nbytes
+        for msg in messages:
+            turn = Turn(msg["role"], msg["content"])
+            conversation.turns.append(turn)
+            conversation.nbytes += turn.nbytes()
+            conversation.digest = chain_digest(conversation.digest, msg["role"], msg["content"])
+        self._compress_old(conversation, len(messages))
+        self._total_bytes += conversation.nbytes - before
+
+    def _load(self, conversation_id: str) -> Optional[Conversation]:
+        """Conversa em memória ou, se não estiver, recarregada do log. Requer o lock"""
+        conversation = self._touch(conversation_id)
+        if conversation is not None or self.log is None:
+            return conversation
+        info = self.log.info(conversation_id)
+        if info is None:
+            return None
+        conversation = self._create(conversation_id)
+        self._add_turns(conversation, self.log.read(conversation_id) or [])
+        conversation.version = info["version"]
+        conversation.created_at = info["created_at"]
+        conversation.updated_at = info["updated_at"]
+        metrics.incr("conversations.loaded")
+        self._evict(keep=conversation_id)
+        self._changed()
+        return conversation
+
+    def _forget(self, conversation_ids: List[str]):
+        """Remove da memória conversas apagadas no log (ex: expiradas)"""
+        with self._lock:
+            for conversation_id in conversation_ids:
+                self._remove(conversation_id)
+            self._changed()
+
+    def _remove(self, conversation_id: str) -> bool:
+        """Requer o lock"""
+        conversation = self._conversations.pop(conversation_id, None)
+        if conversation is None:
+            return False
+        self._total_bytes -= conversation.nbytes
+        return True
+
+    def _touch(self, conversation_id: str) -> Optional[Conversation]:
+        """Marca a conversa como usada agora (fim da fila LRU). Requer o lock"""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is not None:
+            conversation.last_access = time.time()
+            self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    def _compress_old(self, conversation: Conversation, added: int):
+        """Comprime os turnos que acabaram de sair da janela recente. Requer o lock"""
+        end = len(conversation.turns) - self.keep_recent
+        for turn in conversation.turns[max(0, end - added):max(0, end)]:
+            before = turn.nbytes()
+            if turn.compress(self.compress_min_bytes):
+                conversation.nbytes += turn.nbytes() - before
+                metrics.incr("conversations.compressed_turns")
+
+    def _evict(self, keep: str):
+        """Remove conversas paradas há mais tempo até caber no orçamento. Requer o lock"""
+        while self._total_bytes > self.max_bytes and len(self._conversations) > 1:
+            oldest_id = next(iter(self._conversations))
+            if oldest_id == keep:
+                break
+            self._remove(oldest_id)
+            metrics.incr("conversations.evicted")
+
+    def _changed(self):
+        """Regista uma alteração (revisão da listagem e gauges). Requer o lock"""
+        self._revision += 1
+        metrics.set_gauge("conversations.count", len(self._conversations))
+        metrics.set_gauge("conversations.bytes", self._total_bytes)
+
+
+# Instância global
+conversation_store = ConversationStore(
+    max_bytes=int(float(os.getenv("CONVERSATION_STORE_MAX_MB", "64")) * 1024 * 1024),
+    keep_recent=int(os.getenv("CONVERSATION_KEEP_RECENT_TURNS", "8")),
+    compress_min_bytes=int(os.getenv("CONVERSATION_COMPRESS_MIN_BYTES", "256")),
+)
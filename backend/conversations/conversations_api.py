@@ -0,0 +1,185 @@
+# backend/conversations/conversations_api.py
+
+import base64
+import hashlib
+import json
+from bisect import bisect_right
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from .conversation_log import create_conversation_log
+from .conversation_store import conversation_store
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# ============================================================================
+# ROUTER
+# ============================================================================
+
+def _start_log():
+    # Criado só no startup: importar a app não cria data/ nem reconstrói o índice
+    if conversation_store.log is None:
+        log = create_conversation_log()
+        if log is None:
+            return
+        conversation_store.attach_log(log)
+    conversation_store.log.start_compaction()
+
+def _close_log():
+    if conversation_store.log is not None:
+        conversation_store.log.close()
+
+router = APIRouter(
+    prefix="/api/agent",
+    tags=["Conversations"],
+    on_startup=[_start_log],
+    on_shutdown=[_close_log]
+)
+
+# ============================================================================
+# PAGINAÇÃO E CACHE CONDICIONAL
+# ============================================================================
+
+def _encode_cursor(data: dict) -> str:
+    """Cursor opaco para o cliente (JSON em base64 url-safe)"""
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(data, dict):
+            raise ValueError(cursor)
+        return data
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """True se o If-None-Match do cliente já inclui este ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def _conversation_etag(conversation_id: str, version: int) -> str:
+    """ETag da conversa: o id vem do cliente, por isso entra só como hash (ASCII, sem aspas)"""
+    digest = hashlib.sha1(conversation_id.encode("utf-8")).hexdigest()[:12]
+    return f'"{digest}-{version}"'
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+@router.get("/conversations")
+async def list_conversations(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Lista as conversas, as atualizadas mais recentemente primeiro
+    
+    - Paginação por cursor: passar next_cursor para obter a página seguinte
+    - ETag muda quando alguma conversa muda; com If-None-Match devolve 304
+    """
+    etag = f'"conversations-{conversation_store.revision}"'
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    
+    conversations = sorted(
+        conversation_store.list_conversations(),
+        key=lambda c: (-c["updated_at"], c["conversation_id"])
+    )
+    
+    start = 0
+    if cursor:
+        after = _decode_cursor(cursor)
+        try:
+            after_key = (-float(after["u"]), str(after["id"]))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        keys = [(-c["updated_at"], c["conversation_id"]) for c in conversations]
+        start = bisect_right(keys, after_key)
+    
+    page = conversations[start:start + limit]
+    next_cursor = None
+    if start + limit < len(conversations):
+        last = page[-1]
+        next_cursor = _encode_cursor({"u": last["updated_at"], "id": last["conversation_id"]})
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return {
+        "conversations": page,
+        "total": len(conversations),
+        "next_cursor": next_cursor,
+    }
+
+@router.get("/conversation/{conversation_id}/history")
+async def conversation_history(
+    conversation_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Histórico da conversa, paginado do mais recente para o mais antigo
+    
+    - Sem cursor: os últimos `limit` turnos; next_cursor aponta para os anteriores
+    - ETag é a versão da conversa; com If-None-Match devolve 304 sem ler o histórico
+    """
+    version = conversation_store.get_version(conversation_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+    etag = _conversation_etag(conversation_id, version)
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    
+    before = None
+    if cursor:
+        before = _decode_cursor(cursor).get("before")
+        if not isinstance(before, int) or before < 0:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    page = conversation_store.get_page(conversation_id, limit, before)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+    
+    start = page["start"]
+    response.headers["ETag"] = _conversation_etag(conversation_id, page["version"])
+    response.headers["Cache-Control"] = "no-cache"
+    return {
+        "conversation_id": conversation_id,
+        "version": page["version"],
+        "total_turns": page["total_turns"],
+        "turns": [
+            {"index": start + i, **turn} for i, turn in enumerate(page["turns"])
+        ],
+        "next_cursor": _encode_cursor({"before": start}) if start > 0 else None,
+    }
+
+@router.get("/conversations/memory")
+async def conversations_memory():
+    """
+    Memória ocupada pelas conversas guardadas no servidor
+    
+    - total_bytes / max_bytes: footprint total e orçamento (CONVERSATION_STORE_MAX_MB)
+    - conversations: bytes, turnos e turnos comprimidos por conversa
+    """
+    return conversation_store.memory_report()
+
+@router.delete("/conversation/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """Apaga a conversa (memória e log; o espaço em disco é libertado na compactação)"""
+    if not conversation_store.delete(conversation_id):
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+    return {"conversation_id": conversation_id, "deleted": True}
@@ -0,0 +1,113 @@
+# backend/conversations/history_sync.py
+"""
+Delta sync do histórico entre clientes e o store de conversas
+
+Modo completo (por omissão): o cliente envia o histórico todo em cada pedido.
+
+Modo delta: o cliente envia history_version e/ou history_hash (devolvidos na
+resposta anterior) e em `history` só as mensagens acrescentadas desde essa
+versão. O servidor junta-as ao histórico guardado e a resposta traz só os
+turnos novos, com a nova versão e hash.
+
+Se a versão ou o hash não baterem certo com o servidor, o pedido falha com
+409 (history_resync_required) em vez de reconstruir o histórico às cegas;
+o cliente volta a sincronizar por GET /api/agent/conversation/{id}/history
+ou reenvia o histórico completo sem versão.
+
+history_hash: sha256 encadeado por turno (ver chain_digest).
+"""
+
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from utils.metrics import metrics
+from .conversation_store import HistoryConflict, conversation_store
+
+
+class SyncedHistory:
+    """Histórico de um pedido e a base em que assenta"""
+
+    __slots__ = ("conversation_id", "history", "base_version", "base_turns")
+
+    def __init__(self, conversation_id: str, history: List[Dict[str, str]],
+                 base_version: Optional[int] = None, base_turns: int = 0):
+        self.conversation_id = conversation_id
+        self.history = history
+        self.base_version = base_version  # None = modo completo
+        self.base_turns = base_turns
+
+    @property
+    def is_delta(self) -> bool:
+        return self.base_version is not None
+
+
+def _resync_error(conversation_id: str, reason: str, state: Dict[str, Any]) -> HTTPException:
+    metrics.incr("history_sync.resync")
+    return HTTPException(
+        status_code=409,
+        detail={
+            "error": "history_resync_required",
+            "message": f"Histórico desatualizado ({reason}); sincroniza antes de continuar",
+            "conversation_id": conversation_id,
+            "history_version": state["version"],
+            "history_hash": state["hash"],
+            "total_turns": state.get("turns", len(state.get("history", []))),
+        }
+    )
+
+
+def prepare_history(
+    conversation_id: str,
+    history: List[Dict[str, str]],
+    history_version: Optional[int] = None,
+    history_hash: Optional[str] = None,
+) -> SyncedHistory:
+    """
+    Histórico completo a usar no run
+
+    Modo completo: o enviado pelo cliente ou, se vier vazio, o guardado.
+    Modo delta: o guardado + as mensagens novas (409 se a base não coincidir).
+    """
+    if history_version is None and history_hash is None:
+        if history:
+            return SyncedHistory(conversation_id, history)
+        return SyncedHistory(conversation_id, conversation_store.get_history(conversation_id) or [])
+
+    snapshot = conversation_store.snapshot(conversation_id)
+    if history_version is not None and history_version != snapshot["version"]:
+        raise _resync_error(conversation_id, "versão", snapshot)
+    if history_hash is not None and history_hash != snapshot["hash"]:
+        raise _resync_error(conversation_id, "hash", snapshot)
+
+    metrics.incr("history_sync.delta")
+    stored = snapshot["history"]
+    return SyncedHistory(conversation_id, stored + history, snapshot["version"], len(stored))
+
+
+def commit_history(synced: SyncedHistory, result_history: List[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Guarda o histórico do run no store
+
+    Returns:
+        {"history", "history_version", "history_hash"} para a resposta;
+        em modo delta "history" tem só os turnos novos
+    """
+    conversation_id = synced.conversation_id
+    if not synced.is_delta:
+        conversation_store.sync(conversation_id, result_history)
+        state = conversation_store.state(conversation_id)
+        new_turns = result_history
+    else:
+        new_turns = result_history[synced.base_turns:]
+        try:
+            state = conversation_store.append_if(conversation_id, new_turns, synced.base_version)
+        except HistoryConflict:
+            # Outro pedido alterou a conversa durante este run
+            raise _resync_error(conversation_id, "alterado durante o pedido", conversation_store.state(conversation_id))
+
+    return {
+        "history": new_turns,
+        "history_version": state["version"],
+        "history_hash": state["hash"],
+    }
@@ -0,0 +1,3 @@
+from .job_manager import Job, JobManager
+
+__all__ = ["Job", "JobManager"]
@@ -0,0 +1,283 @@
+# backend/jobs/job_manager.py
+"""
+Jobs em background para tarefas longas do agent
+
+- POST devolve logo um job_id; o run corre num worker pool limitado
+- Progresso por nó do grafo (agent, tools, ...) fica disponível para polling/SSE
+- Jobs terminados são removidos após JOBS_TTL_SECONDS
+- Cancelamento cooperativo entre passos do grafo
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import metrics
+
+
+class JobQueueFull(Exception):
+    """Demasiados jobs em espera"""
+
+
+class JobCancelled(Exception):
+    """O job foi cancelado durante a execução"""
+
+
+class Job:
+    """Estado de um job"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+    def __init__(self, kind: str, payload: Dict[str, Any], max_events: int = 200):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = self.QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self.events_dropped = 0
+        self.max_events = max_events
+        self.cancel_event = threading.Event()
+        self.future = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in self.FINAL_STATES
+
+    def add_event(self, event_type: str, **data):
+        """Regista um evento de progresso (lista limitada a max_events)"""
+        with self._lock:
+            seq = len(self.events) + self.events_dropped
+            self.events.append({"seq": seq, "type": event_type, "ts": time.time(), **data})
+            if len(self.events) > self.max_events:
+                self.events.pop(0)
+                self.events_dropped += 1
+
+    def events_since(self, seq: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [e for e in self.events if e["seq"] >= seq]
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def to_dict(self, include_events: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+        if include_events:
+            with self._lock:
+                data["progress"] = list(self.events)
+        return data
+
+
+def _run_langgraph_job(job: Job, app) -> Dict[str, Any]:
+    """Corre o grafo passo a passo, registando progresso e verificando cancelamento"""
+    from langgraph.agent_langgraph import build_messages, build_result
+
+    history = job.payload.get("history") or []
+    messages = build_messages(job.payload["message"], history)
+    final_messages = list(messages)
+    steps = []
+
+    for update in app.stream({"messages": messages}, stream_mode="updates"):
+        job.check_cancelled()
+        for node, node_update in update.items():
+            new_messages = (node_update or {}).get("messages", [])
+            final_messages.extend(new_messages)
+            steps.extend((node_update or {}).get("steps", []))
+            tool_calls = [
+                call["name"]
+                for msg in new_messages
+                for call in (getattr(msg, "tool_calls", None) or [])
+            ]
+            job.add_event("node", node=node, tool_calls=tool_calls)
+
+    result = build_result(
+        {"messages": final_messages, "steps": steps}, job.payload["message"], history
+    )
+    return {
+        "response": result["response"],
+        "conversation_id": job.payload.get("conversation_id"),
+        "history": result["history"],
+        "partial": result["partial"],
+        "cost": result["cost"],
+    }
+
+
+def _run_agent_job(job: Job, run_fn) -> Dict[str, Any]:
+    job.add_event("node", node="agent", tool_calls=[])
+    result = run_fn(
+        message=job.payload["message"],
+        conversation_id=job.payload.get("conversation_id") or "default",
+    )
+    if not result.get("success"):
+        raise RuntimeError(result.get("error"))
+    return result
+
+
+class JobManager:
+    """Worker pool limitado + registo de jobs com TTL"""
+
+    def __init__(self, max_workers: int = 4, max_queued: int = 100, ttl_seconds: float = 3600.0):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-job")
+        self._stop = threading.Event()
+        self._cleanup_thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------------
+    # Submissão e execução
+    # ------------------------------------------------------------------------
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> Job:
+        """Cria o job e coloca-o no worker pool"""
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status == Job.QUEUED)
+            if queued >= self.max_queued:
+                metrics.incr("jobs.rejected")
+                raise JobQueueFull(f"Demasiados jobs em espera ({queued})")
+            job = Job(kind, payload)
+            self._jobs[job.id] = job
+
+        job.add_event("status", status=Job.QUEUED)
+        job.future = self._executor.submit(self._execute, job)
+        metrics.incr("jobs.submitted")
+        self._ensure_cleanup()
+        return job
+
+    def _execute(self, job: Job):
+        if job.cancel_event.is_set():
+            # Cancelado depois de um worker o apanhar, antes de começar
+            self._mark_cancelled(job)
+            return
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        job.add_event("status", status=Job.RUNNING)
+
+        try:
+            if job.kind in ("langgraph", "langgraph_singleton"):
+                job.result = _run_langgraph_job(job, _get_graph(job.kind))
+            else:
+                from agents.batch import get_run_fn
+                job.result = _run_agent_job(job, get_run_fn(job.kind, use_async=False))
+            job.check_cancelled()
+            job.status = Job.SUCCEEDED
+        except JobCancelled:
+            job.status = Job.CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = Job.FAILED
+        finally:
+            job.finished_at = time.time()
+            job.add_event("status", status=job.status)
+            metrics.incr(f"jobs.{job.status}")
+            metrics.observe("jobs.duration_s", job.finished_at - job.started_at)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela o job: se ainda está em fila nem chega a correr"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._mark_cancelled(job)
+        return job
+
+    @staticmethod
+    def _mark_cancelled(job: Job):
+        """Job que nunca chegou a correr: fica terminado (TTL, fim do SSE, max_queued)"""
+        job.status = Job.CANCELLED
+        job.finished_at = time.time()
+        job.add_event("status", status=Job.CANCELLED)
+        metrics.incr("jobs.cancelled")
+
+    # ------------------------------------------------------------------------
+    # Limpeza por TTL
+    # ------------------------------------------------------------------------
+
+    def cleanup_expired(self) -> int:
+        """Remove jobs terminados há mais de ttl_seconds"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.done and job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if expired:
+            metrics.incr("jobs.expired", len(expired))
+        return len(expired)
+
+    def _ensure_cleanup(self):
+        if self._cleanup_thread is None or not self._cleanup_thread.is_alive():
+            self._cleanup_thread = threading.Thread(
+                target=self._cleanup_loop, name="agent-job-cleanup", daemon=True
+            )
+            self._cleanup_thread.start()
+
+    def _cleanup_loop(self):
+        interval = min(60.0, max(1.0, self.ttl_seconds / 4))
+        while not self._stop.wait(interval):
+            self.cleanup_expired()
+
+    def shutdown(self):
+        self._stop.set()
+        for job in list(self._jobs.values()):
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for job in list(self._jobs.values()):
+            if job.status == Job.QUEUED and job.future is not None and job.future.cancelled():
+                self._mark_cancelled(job)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+
+def _get_graph(kind: str):
+    if kind == "langgraph_singleton":
+        from langgraph.agent_langgraph_singleton_api import get_langgraph_agent
+    else:
+        from langgraph.agent_langgraph_api import get_langgraph_agent
+    return get_langgraph_agent()
+
+
+# Instância global
+job_manager = JobManager(
+    max_workers=int(os.getenv("JOBS_MAX_WORKERS", "4")),
+    max_queued=int(os.getenv("JOBS_MAX_QUEUED", "100")),
+    ttl_seconds=float(os.getenv("JOBS_TTL_SECONDS", "3600")),
+)
@@ -0,0 +1,112 @@
+# backend/jobs/jobs_api.py
+
+import asyncio
+import json
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from api.rate_limiter import charge_request
+from .job_manager import Job, JobQueueFull, job_manager
+
+# ============================================================================
+# ROUTER
+# ============================================================================
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"], on_shutdown=[job_manager.shutdown])
+
+# ============================================================================
+# MODELOS PYDANTIC
+# ============================================================================
+
+class JobMessage(BaseModel):
+    role: str
+    content: str
+
+class JobRequest(BaseModel):
+    message: str
+    conversation_id: Optional[str] = None
+    history: Optional[List[JobMessage]] = []
+    agent: Literal["langgraph", "langgraph_singleton", "ollama", "claude", "routed", "fallback"] = "langgraph"
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+def _get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job não encontrado ou expirado: {job_id}")
+    return job
+
+@router.post("", status_code=202)
+async def create_job(request: JobRequest, http_request: Request):
+    """
+    Cria um job em background e devolve logo o job_id
+    
+    O cliente acompanha por GET /api/jobs/{id} ou pelo feed SSE
+    /api/jobs/{id}/events - um retry do cliente não volta a correr o agent
+    """
+    # Um item (mensagem) por job: o rate limit de jobs cobra um token por mensagem
+    await charge_request(http_request, 1)
+    payload = {
+        "message": request.message,
+        "conversation_id": request.conversation_id,
+        "history": [msg.model_dump() for msg in request.history] if request.history else [],
+    }
+    try:
+        job = job_manager.submit(request.agent, payload)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events"
+    }
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Estado, progresso e resultado do job"""
+    return _get_job_or_404(job_id).to_dict()
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, since: int = 0):
+    """
+    Feed SSE com o progresso do job
+    
+    Emite cada evento (status, nó do grafo) e termina com um evento
+    "result" quando o job acaba. `since` permite retomar a partir de um seq.
+    """
+    job = _get_job_or_404(job_id)
+    
+    async def event_stream():
+        next_seq = since
+        while True:
+            for event in job.events_since(next_seq):
+                next_seq = event["seq"] + 1
+                yield f"id: {event['seq']}\nevent: progress\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            
+            if job.done:
+                data = json.dumps(job.to_dict(include_events=False), ensure_ascii=False)
+                yield f"event: result\ndata: {data}\n\n"
+                return
+            
+            await asyncio.sleep(0.25)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancela o job (em fila: não chega a correr; a correr: para no próximo passo)"""
+    _get_job_or_404(job_id)
+    job = job_manager.cancel(job_id)
+    return {"job_id": job.id, "status": job.status, "cancel_requested": True}
+
+@router.get("")
+async def jobs_stats():
+    """Nº de jobs por estado"""
+    return job_manager.stats()
@@ -4,8 +4,10 @@ from typing import TypedDict, Annotated, Sequence
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
 import operator
+from .fast_path import create_fast_path_node, route_after_fast_path
+from .graph_nodes import create_model_node, create_tool_executor, is_partial, stop_reason
+from .run_cost import record_cost_metrics, summarize_cost
 
 # ============================================================================
 # ESTADO DO AGENT
@@ -14,6 +16,8 @@ import operator
 class AgentState(TypedDict):
     """Estado do agent LangGraph"""
     messages: Annotated[Sequence[BaseMessage], operator.add]
+    # Registo de custo de cada passo (LLM e tools) - ver run_cost.py
+    steps: Annotated[list, operator.add]
     # Podes adicionar mais campos conforme necessário
     # conversation_id: str
     # user_id: str
@@ -34,12 +38,6 @@ def should_continue(state: AgentState) -> str:
     # Caso contrário, termina
     return END
 
-def call_model(state: AgentState, llm):
-    """Chama o modelo LLM"""
-    messages = state["messages"]
-    response = llm.invoke(messages)
-    return {"messages": [response]}
-
 # ============================================================================
 # CRIAR GRAFO LANGGRAPH
 # ============================================================================
@@ -67,11 +65,22 @@ def create_langgraph_agent(tools: list, verbose: bool = False):
     workflow = StateGraph(AgentState)
     
     # 3. Adicionar nós
-    workflow.add_node("agent", lambda state: call_model(state, llm_with_tools))
-    workflow.add_node("tools", ToolNode(tools))
+    workflow.add_node("agent", create_model_node(llm_with_tools))
+    workflow.add_node("tools", create_tool_executor(tools))
+    
+    # Fast path determinístico (responde sem LLM a perguntas estruturadas)
+    workflow.add_node("fast_path", create_fast_path_node(tools))
     
     # 4. Definir entry point
-    workflow.set_entry_point("agent")
+    workflow.set_entry_point("fast_path")
+    workflow.add_conditional_edges(
+        "fast_path",
+        route_after_fast_path,
+        {
+            "agent": "agent",
+            END: END
+        }
+    )
     
     # 5. Adicionar edges condicionais
     workflow.add_conditional_edges(
@@ -91,7 +100,7 @@ def create_langgraph_agent(tools: list, verbose: bool = False):
     
     if verbose:
         print("✅ LangGraph agent criado")
-        print(f"   • Nós: agent, tools")
+        print(f"   • Nós: fast_path, agent, tools")
         print(f"   • Tools disponíveis: {len(tools)}")
     
     return app
@@ -100,7 +109,20 @@ def create_langgraph_agent(tools: list, verbose: bool = False):
 # EXECUTAR AGENT
 # ============================================================================
 
-def run_langgraph_agent(app, message: str, conversation_history: list = None):
+def build_messages(message: str, conversation_history: list = None) -> list:
+    """Converte o histórico (lista de dicts) e a mensagem atual em mensagens LangChain"""
+    messages = []
+    if conversation_history:
+        for msg in conversation_history:
+            if msg["role"] == "user":
+                messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                messages.append(AIMessage(content=msg["content"]))
+    
+    messages.append(HumanMessage(content=message))
+    return messages
+
+def run_langgraph_agent(app, message: str, conversation_history: list = None, include_messages: bool = False):
     """
     Executa o agent LangGraph
     
@@ -108,40 +130,55 @@ def run_langgraph_agent(app, message: str, conversation_history: list = None):
         app: Grafo LangGraph compilado
         message: Mensagem do utilizador
         conversation_history: Histórico opcional (lista de dicts)
+        include_messages: Incluir as mensagens LangChain do run (full_messages, para debug)
     
     Returns:
         dict com resposta e histórico
     """
     
-    # Converter histórico para mensagens LangChain
-    messages = []
-    if conversation_history:
-        for msg in conversation_history:
-            if msg["role"] == "user":
-                messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                messages.append(AIMessage(content=msg["content"]))
-    
-    # Adicionar mensagem atual
-    messages.append(HumanMessage(content=message))
+    # Converter histórico + mensagem atual para mensagens LangChain
+    messages = build_messages(message, conversation_history)
     
     # Executar grafo
     result = app.invoke({"messages": messages})
     
+    return build_result(result, message, conversation_history, include_messages)
+
+async def arun_langgraph_agent(app, message: str, conversation_history: list = None):
+    """
+    Versão async de run_langgraph_agent
+    
+    Cancelar a task cancela o nó em curso (chamada ao LLM ou tools)
+    """
+    messages = build_messages(message, conversation_history)
+    result = await app.ainvoke({"messages": messages})
+    return build_result(result, message, conversation_history)
+
+def build_result(result: dict, message: str, conversation_history: list = None, include_messages: bool = False) -> dict:
+    """Extrai a resposta do estado final, atualiza o histórico e regista o custo"""
+    
     # Extrair resposta
     last_message = result["messages"][-1]
     response_text = last_message.content
     
+    # Custo do run (iterações, tokens por passo, tempo em tools)
+    cost = summarize_cost(result.get("steps") or [], stop_reason(last_message))
+    record_cost_metrics(cost)
+    
     # Construir histórico atualizado
     updated_history = conversation_history or []
     updated_history.append({"role": "user", "content": message})
     updated_history.append({"role": "assistant", "content": response_text})
     
-    return {
+    output = {
         "response": response_text,
         "history": updated_history,
-        "full_messages": result["messages"]  # Para debug
+        "partial": is_partial(last_message),  # Tempo ou limites esgotados a meio do run
+        "cost": cost,
     }
+    if include_messages:
+        output["full_messages"] = result["messages"]  # Para debug
+    return output
 
 # ============================================================================
 # EXEMPLO DE USO
@@ -1,9 +1,17 @@
 # backend/agents/agent_langgraph_api.py
 
-from fastapi import APIRouter, HTTPException
+import uuid
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
-from .agent_langgraph import create_langgraph_agent, run_langgraph_agent
+from typing import Any, Optional, List, Dict, Literal
+from api.idempotency import IDEMPOTENCY_HEADER, run_idempotent
+from api.request_guard import run_until_disconnect
+from api.responses import lean_response
+from conversations.history_sync import commit_history, prepare_history
+from utils.deadline import TIMEOUT_HEADER, parse_timeout
+from .agent_langgraph import create_langgraph_agent, arun_langgraph_agent
+from .graph_events import sse_chat_stream
 
 # ============================================================================
 # ROUTER
@@ -23,11 +31,33 @@ class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
     history: Optional[List[Message]] = []
+    # Delta sync: versão/hash da resposta anterior; history traz só as mensagens novas
+    history_version: Optional[int] = None
+    history_hash: Optional[str] = None
+    # Resposta lean: só o turno novo (sem history nem detalhe de custo)
+    lean: bool = False
+
+class ChatStreamRequest(ChatRequest):
+    # Tipos de evento a receber (None = todos); "done"/"error" vêm sempre
+    events: Optional[List[Literal["node", "token", "tool_start", "tool_end"]]] = None
 
 class ChatResponse(BaseModel):
     response: str
     conversation_id: str
     history: List[Message]
+    partial: bool = False
+    metadata: Dict[str, Any] = {}
+    history_version: Optional[int] = None
+    history_hash: Optional[str] = None
+
+def request_history(request: ChatRequest, conversation_id: str):
+    """Histórico do pedido (completo ou delta) reconciliado com o guardado no servidor"""
+    return prepare_history(
+        conversation_id,
+        [msg.dict() for msg in request.history] if request.history else [],
+        history_version=request.history_version,
+        history_hash=request.history_hash
+    )
 
 # ============================================================================
 # AGENT GLOBAL (Singleton)
@@ -57,45 +87,114 @@ def get_langgraph_agent():
 # ============================================================================
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_with_langgraph(request: ChatRequest):
+async def chat_with_langgraph(
+    request: ChatRequest,
+    response: Response,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
     """
     Chat com LangGraph agent
     
-    - Mantém histórico de conversação
+    - Mantém histórico de conversação (guardado no servidor por conversation_id;
+      sem history no pedido, usa o guardado)
+    - Delta sync: com history_version/history_hash, history traz só as mensagens
+      novas e a resposta só os turnos novos; 409 se a base estiver desatualizada
     - Usa ferramentas disponíveis
     - Grafo de estados para decisões
+    - Idempotency-Key: retries não voltam a correr o grafo
+    - Se o cliente desligar, o grafo (LLM e tools em curso) é cancelado
+    - X-Request-Timeout: orçamento total; ao esgotar devolve resposta parcial
+    - metadata.cost: iterações, tokens por passo e tempo em tools
+    - lean=true: só response, partial e versão/hash do histórico (combina com delta sync)
     """
     
-    try:
+    async def execute():
         # Obter agent
         app = get_langgraph_agent()
         
-        # Converter history para formato dict
-        history_dicts = [msg.dict() for msg in request.history] if request.history else []
+        # Gerar conversation_id se não existe
+        conversation_id = request.conversation_id or f"conv_{uuid.uuid4().hex[:12]}"
+        
+        # History do pedido (ou delta) juntado ao guardado no servidor
+        synced = request_history(request, conversation_id)
         
         # Executar agent
-        result = run_langgraph_agent(
+        result = await arun_langgraph_agent(
             app=app,
             message=request.message,
-            conversation_history=history_dicts
+            conversation_history=synced.history
         )
+        committed = commit_history(synced, result["history"])
         
-        # Gerar conversation_id se não existe
-        conversation_id = request.conversation_id or f"conv_{hash(request.message)}"
+        if request.lean:
+            return {
+                "response": result["response"],
+                "conversation_id": conversation_id,
+                "partial": result["partial"],
+                "history_version": committed["history_version"],
+                "history_hash": committed["history_hash"],
+            }
         
         # Converter resposta
         return ChatResponse(
             response=result["response"],
             conversation_id=conversation_id,
-            history=[Message(**msg) for msg in result["history"]]
+            history=[Message(**msg) for msg in committed["history"]],
+            partial=result["partial"],
+            metadata={"cost": result["cost"]},
+            history_version=committed["history_version"],
+            history_hash=committed["history_hash"]
         )
-        
+    
+    try:
+        result = await run_until_disconnect(
+            http_request,
+            "langgraph_chat",
+            lambda: run_idempotent(idempotency_key, "langgraph_chat", request, execute, response)
+        )
+        # Lean: serializado diretamente, sem reconstruir o ChatResponse
+        return lean_response(result, response) if request.lean else result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erro no LangGraph agent: {str(e)}"
         )
 
+@router.post("/chat/stream")
+async def chat_stream_with_langgraph(request: ChatStreamRequest, http_request: Request):
+    """
+    Chat com LangGraph agent em streaming (Server-Sent Events)
+    
+    Eventos: node (entrada num nó), tool_start (tool e argumentos),
+    tool_end (duração), token (texto do modelo); termina com "done"
+    (mesmos campos do /chat) ou "error".
+    
+    - events: subscreve só os tipos indicados (ex: ["node", "tool_end"])
+    - X-Request-Timeout: orçamento total; ao esgotar "done" vem com partial=true
+    - Se o cliente desligar, o grafo é cancelado
+    """
+    
+    app = get_langgraph_agent()
+    conversation_id = request.conversation_id or f"conv_{uuid.uuid4().hex[:12]}"
+    synced = request_history(request, conversation_id)
+    
+    return StreamingResponse(
+        sse_chat_stream(
+            app,
+            message=request.message,
+            synced=synced,
+            lean=request.lean,
+            event_types=request.events,
+            timeout=parse_timeout(http_request.headers.get(TIMEOUT_HEADER)),
+            scope="langgraph_chat_stream",
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/health")
 async def health_check():
     """Verifica se o LangGraph agent está funcional"""
@@ -1,13 +1,17 @@
 # backend/langgraph/agent_langgraph_singleton.py
 
 from typing import TypedDict, Annotated, Sequence
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
 import operator
+from .fast_path import create_fast_path_node, route_after_fast_path
+from .agent_langgraph import build_messages, build_result
+from .graph_nodes import create_model_node, create_tool_executor
 from agents.agent_singleton import CryptoAgentSingleton
 
 from langchain_anthropic import ChatAnthropic
 from langchain_ollama import ChatOllama
+from config.llm_config import BalancedLLM
 from tools.ollama_tools import bind_tools_ollama
 
 # ============================================================================
@@ -17,6 +21,8 @@ from tools.ollama_tools import bind_tools_ollama
 class AgentState(TypedDict):
     """Estado do agent LangGraph"""
     messages: Annotated[Sequence[BaseMessage], operator.add]
+    # Registo de custo de cada passo (LLM e tools) - ver run_cost.py
+    steps: Annotated[list, operator.add]
 
 # ============================================================================
 # FUNÇÕES DO GRAFO
@@ -32,62 +38,6 @@ def should_continue(state: AgentState) -> str:
     
     return END
 
-def call_model(state: AgentState, llm):
-    """Chama o modelo LLM do singleton"""
-    messages = state["messages"]
-    response = llm.invoke(messages)
-    return {"messages": [response]}
-
-def create_tool_executor(tools: list):
-    """
-    Cria uma função para executar tools manualmente
-    Evita problemas do ToolNode com type hints
-    """
-    def execute_tools(state: AgentState):
-        """Executa tools baseado nos tool_calls"""
-        messages = state["messages"]
-        last_message = messages[-1]
-        
-        tool_messages = []
-        
-        # Executar cada tool_call
-        for tool_call in last_message.tool_calls:
-            # Encontrar a tool pelo nome
-            tool = next((t for t in tools if t.name == tool_call["name"]), None)
-            
-            if tool:
-                try:
-                    # Executar tool
-                    result = tool.invoke(tool_call["args"])
-                    
-                    # Criar mensagem de resposta
-                    tool_messages.append(
-                        ToolMessage(
-                            content=str(result),
-                            tool_call_id=tool_call["id"]
-                        )
-                    )
-                except Exception as e:
-                    # Em caso de erro, retornar mensagem de erro
-                    tool_messages.append(
-                        ToolMessage(
-                            content=f"Erro ao executar {tool_call['name']}: {str(e)}",
-                            tool_call_id=tool_call["id"]
-                        )
-                    )
-            else:
-                # Tool não encontrada
-                tool_messages.append(
-                    ToolMessage(
-                        content=f"Tool '{tool_call['name']}' não encontrada",
-                        tool_call_id=tool_call["id"]
-                    )
-                )
-        
-        return {"messages": tool_messages}
-    
-    return execute_tools
-
 # ============================================================================
 # CRIAR GRAFO LANGGRAPH
 # ============================================================================
@@ -113,7 +63,7 @@ def create_langgraph_agent(tools: list, verbose: bool = False):
     if isinstance(llm, ChatAnthropic):
         # Claude suporta bind_tools nativamente
         llm_with_tools = llm.bind_tools(tools)
-    elif isinstance(llm, ChatOllama):
+    elif isinstance(llm, (ChatOllama, BalancedLLM)):
         # Ollama precisa de formato JSON
         llm_with_tools = bind_tools_ollama(llm, tools)
     else:
@@ -123,14 +73,25 @@ def create_langgraph_agent(tools: list, verbose: bool = False):
     workflow = StateGraph(AgentState)
     
     # 3. Adicionar nós
-    workflow.add_node("agent", lambda state: call_model(state, llm_with_tools))
+    workflow.add_node("agent", create_model_node(llm_with_tools))
     
     # Usar executor custom em vez de ToolNode
     tool_executor = create_tool_executor(tools)
     workflow.add_node("tools", tool_executor)
     
+    # Fast path determinístico (responde sem LLM a perguntas estruturadas)
+    workflow.add_node("fast_path", create_fast_path_node(tools))
+    
     # 4. Definir entry point
-    workflow.set_entry_point("agent")
+    workflow.set_entry_point("fast_path")
+    workflow.add_conditional_edges(
+        "fast_path",
+        route_after_fast_path,
+        {
+            "agent": "agent",
+            END: END
+        }
+    )
     
     # 5. Adicionar edges condicionais
     workflow.add_conditional_edges(
@@ -151,7 +112,7 @@ def create_langgraph_agent(tools: list, verbose: bool = False):
     if verbose:
         current_llm = agent_singleton.get_current_llm()
         print(f"✅ LangGraph agent criado com {current_llm}")
-        print(f"   • Nós: agent, tools")
+        print(f"   • Nós: fast_path, agent, tools")
         print(f"   • Tools disponíveis: {len(tools)}")
     
     return app
@@ -160,7 +121,7 @@ def create_langgraph_agent(tools: list, verbose: bool = False):
 # EXECUTAR AGENT
 # ============================================================================
 
-def run_langgraph_agent(app, message: str, conversation_history: list = None):
+def run_langgraph_agent(app, message: str, conversation_history: list = None, include_messages: bool = False):
     """
     Executa o agent LangGraph
     
@@ -168,37 +129,26 @@ def run_langgraph_agent(app, message: str, conversation_history: list = None):
         app: Grafo LangGraph compilado
         message: Mensagem do utilizador
         conversation_history: Histórico opcional (lista de dicts)
+        include_messages: Incluir as mensagens LangChain do run (full_messages, para debug)
     
     Returns:
         dict com resposta e histórico
     """
     
-    # Converter histórico para mensagens LangChain
-    messages = []
-    if conversation_history:
-        for msg in conversation_history:
-            if msg["role"] == "user":
-                messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                messages.append(AIMessage(content=msg["content"]))
-    
-    # Adicionar mensagem atual
-    messages.append(HumanMessage(content=message))
+    # Converter histórico + mensagem atual para mensagens LangChain
+    messages = build_messages(message, conversation_history)
     
     # Executar grafo
     result = app.invoke({"messages": messages})
     
-    # Extrair resposta
-    last_message = result["messages"][-1]
-    response_text = last_message.content
-    
-    # Construir histórico atualizado
-    updated_history = conversation_history or []
-    updated_history.append({"role": "user", "content": message})
-    updated_history.append({"role": "assistant", "content": response_text})
+    return build_result(result, message, conversation_history, include_messages)
+
+async def arun_langgraph_agent(app, message: str, conversation_history: list = None):
+    """
+    Versão async de run_langgraph_agent
     
-    return {
-        "response": response_text,
-        "history": updated_history,
-        "full_messages": result["messages"]
-    }
\ No newline at end of file
+    Cancelar a task cancela o nó em curso (chamada ao LLM ou tools)
+    """
+    messages = build_messages(message, conversation_history)
+    result = await app.ainvoke({"messages": messages})
+    return build_result(result, message, conversation_history)
@@ -0,0 +1,283 @@
+# backend/langgraph/agent_langgraph_ws_api.py
+"""
+Chat por WebSocket com sessão persistente por ligação
+
+A sessão fica ligada a um conversation_id; o histórico vem do store de
+conversas ao ligar e é lá guardado a cada turno, por isso cada turno evita
+o setup HTTP e o envio do histórico.
+
+Protocolo (JSON):
+    cliente -> {"type": "message", "content": "...", "id": "opcional",
+                "events": ["node", "token", "tool_start", "tool_end"] (opcional)}
+               {"type": "cancel"}
+               {"type": "ping"} | {"type": "pong"}
+    servidor -> {"type": "session", "conversation_id": ...}
+                {"type": "start" | "node" | "token" | "tool_start" | "tool_end" | "done"
+                         | "cancelled" | "error", "message_id": ...}
+                {"type": "ping"} (heartbeat)
+
+Cada mensagem consome um token do rate limit de chat; sem tokens, responde
+{"type": "error", "retry_after": s} e a ligação continua aberta.
+Uma nova mensagem enquanto a anterior ainda está a ser respondida cancela-a.
+Os eventos passam por uma fila limitada: um cliente lento trava o run (e a
+leitura do stream do LLM) em vez de acumular output no servidor; se não
+consumir nada durante WS_SEND_TIMEOUT_SECONDS a ligação é fechada.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from api.rate_limiter import client_quota, retry_message
+from api.request_guard import admission
+from conversations.conversation_store import conversation_store
+from utils.deadline import DEFAULT_TIMEOUT_SECONDS, deadline_scope
+from utils.metrics import metrics
+from .agent_langgraph import build_messages, build_result
+from .graph_events import EVENT_TYPES, stream_graph_events
+
+router = APIRouter()
+
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "30"))
+
+GRAPHS = ("langgraph", "langgraph_singleton")
+
+
+class SlowConsumer(Exception):
+    """O cliente deixou de ler os eventos enviados"""
+
+
+class HeartbeatTimeout(Exception):
+    """O cliente não deu sinal de vida dentro do intervalo"""
+
+
+def _get_graph(kind: str):
+    if kind == "langgraph_singleton":
+        from .agent_langgraph_singleton_api import get_langgraph_agent
+    else:
+        from .agent_langgraph_api import get_langgraph_agent
+    return get_langgraph_agent()
+
+
+class ChatSession:
+    """Estado de uma ligação WebSocket"""
+
+    def __init__(self, websocket: WebSocket, conversation_id: str, graph_kind: str):
+        self.websocket = websocket
+        self.conversation_id = conversation_id
+        self.graph_kind = graph_kind
+        self.history = conversation_store.get_history(conversation_id) or []
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.run_task: Optional[asyncio.Task] = None
+        self.message_id: Optional[str] = None
+        self.last_seen = time.monotonic()
+        self.quota = client_quota(websocket)
+
+    async def send(self, event: Dict[str, Any]):
+        """Coloca um evento na fila; bloqueia se o cliente não estiver a ler"""
+        await self.outbox.put(event)
+
+    def send_nowait(self, event: Dict[str, Any]):
+        """
+        Eventos originados na leitura (pong, erros, cancelled): nunca bloqueiam
+        o receiver, senão um cliente lento deixava de conseguir cancelar; com a
+        fila cheia a ligação é fechada como slow consumer
+        """
+        try:
+            self.outbox.put_nowait(event)
+        except asyncio.QueueFull:
+            raise SlowConsumer()
+
+    # ------------------------------------------------------------------------
+    # Tasks da ligação
+    # ------------------------------------------------------------------------
+
+    async def sender(self):
+        while True:
+            event = await self.outbox.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_json(event), WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                raise SlowConsumer()
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_SECONDS)
+            if time.monotonic() - self.last_seen > 2 * WS_HEARTBEAT_SECONDS:
+                raise HeartbeatTimeout()
+            await self.send({"type": "ping", "ts": time.time()})
+
+    async def receiver(self):
+        while True:
+            raw = await self.websocket.receive_text()
+            self.last_seen = time.monotonic()
+            try:
+                data = json.loads(raw)
+                msg_type = data.get("type")
+            except (ValueError, AttributeError):
+                self.send_nowait({"type": "error", "error": "Mensagem JSON inválida"})
+                continue
+
+            if msg_type == "message" and isinstance(data.get("content"), str):
+                events = data.get("events")
+                if events is not None and (
+                    not isinstance(events, list) or not set(events) <= set(EVENT_TYPES)
+                ):
+                    self.send_nowait({"type": "error", "error": f"events inválido; tipos: {list(EVENT_TYPES)}"})
+                    continue
+                if self.quota is not None:
+                    # Cada mensagem conta como um pedido de chat (o connect paga a primeira)
+                    decision = await self.quota.charge(1)
+                    if not decision.allowed:
+                        self.send_nowait({
+                            "type": "error",
+                            "message_id": data.get("id"),
+                            "error": retry_message(decision),
+                            "retry_after": max(1, math.ceil(decision.retry_after)),
+                        })
+                        continue
+                await self.start_run(data.get("id") or uuid.uuid4().hex, data["content"], events)
+            elif msg_type == "cancel":
+                await self.cancel_run("client")
+            elif msg_type == "ping":
+                self.send_nowait({"type": "pong", "ts": time.time()})
+            elif msg_type == "pong":
+                pass
+            else:
+                self.send_nowait({"type": "error", "error": f"Tipo de mensagem inválido: {msg_type}"})
+
+    # ------------------------------------------------------------------------
+    # Runs do agent
+    # ------------------------------------------------------------------------
+
+    async def start_run(self, message_id: str, content: str, events=None):
+        await self.cancel_run("new_message")
+        self.message_id = message_id
+        self.run_task = asyncio.create_task(self.run(message_id, content, events))
+        metrics.incr("ws.messages")
+
+    async def cancel_run(self, reason: str):
+        """Cancela a resposta em curso (LLM e tools incluídos)"""
+        task = self.run_task
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        metrics.incr(f"ws.cancelled.{reason}")
+        self.send_nowait({"type": "cancelled", "message_id": self.message_id, "reason": reason})
+
+    async def run(self, message_id: str, content: str, events=None):
+        await self.send({"type": "start", "message_id": message_id})
+        try:
+            state = None
+            with deadline_scope(DEFAULT_TIMEOUT_SECONDS):
+                async with admission.slot():
+                    app = _get_graph(self.graph_kind)
+                    messages = build_messages(content, self.history)
+                    async for event in stream_graph_events(app, {"messages": messages}, events):
+                        if event["type"] == "result":
+                            state = event["state"]
+                        else:
+                            await self.send({**event, "message_id": message_id})
+
+            result = build_result(state, content, list(self.history))
+            self.history = result["history"]
+            conversation_store.sync(self.conversation_id, self.history)
+            await self.send({
+                "type": "done",
+                "message_id": message_id,
+                "response": result["response"],
+                "partial": result["partial"],
+                "cost": result["cost"],
+            })
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.incr("ws.errors")
+            await self.send({"type": "error", "message_id": message_id, "error": str(e)})
+
+    # ------------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------------
+
+    async def serve(self):
+        await self.send({
+            "type": "session",
+            "conversation_id": self.conversation_id,
+            "graph": self.graph_kind,
+            "heartbeat_s": WS_HEARTBEAT_SECONDS,
+        })
+        tasks = [
+            asyncio.create_task(self.sender()),
+            asyncio.create_task(self.receiver()),
+            asyncio.create_task(self.heartbeat()),
+        ]
+        close_code = None
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            error = next(iter(done)).exception()
+            if isinstance(error, SlowConsumer):
+                metrics.incr("ws.closed.slow_consumer")
+                close_code = 1013  # Try again later
+            elif isinstance(error, HeartbeatTimeout):
+                metrics.incr("ws.closed.heartbeat_timeout")
+                close_code = 1001  # Going away
+            elif isinstance(error, WebSocketDisconnect):
+                metrics.incr("ws.closed.client")
+            elif error is not None:
+                metrics.incr("ws.closed.error")
+                close_code = 1011  # Internal error
+        finally:
+            if self.run_task is not None and not self.run_task.done():
+                self.run_task.cancel()
+                metrics.incr("ws.cancelled.disconnect")
+            for task in tasks:
+                task.cancel()
+            # O run (e o seu sync para o store) acaba antes de a ligação fechar
+            await asyncio.gather(*tasks, *(t for t in (self.run_task,) if t is not None), return_exceptions=True)
+            if close_code is not None:
+                try:
+                    await self.websocket.close(code=close_code)
+                except Exception:
+                    pass
+
+
+_active_sessions = 0
+
+
+@router.websocket("/ws/chat")
+async def ws_chat(websocket: WebSocket, conversation_id: Optional[str] = None, graph: str = "langgraph"):
+    """
+    Chat por WebSocket com streaming de tokens e eventos de tools
+
+    Query params:
+        conversation_id: ID da conversa (gerado se não vier)
+        graph: "langgraph" ou "langgraph_singleton"
+    """
+    global _active_sessions
+
+    if graph not in GRAPHS:
+        await websocket.close(code=1008)  # Policy violation
+        return
+
+    await websocket.accept()
+    session = ChatSession(websocket, conversation_id or f"ws_{uuid.uuid4().hex[:12]}", graph)
+
+    _active_sessions += 1
+    metrics.set_gauge("ws.sessions", _active_sessions)
+    try:
+        await session.serve()
+    finally:
+        _active_sessions -= 1
+        metrics.set_gauge("ws.sessions", _active_sessions)
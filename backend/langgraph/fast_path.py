@@ -0,0 +1,100 @@
+# backend/langgraph/fast_path.py
+"""
+Fast path determinístico para o grafo LangGraph
+
+Perguntas estruturadas ("price of ETH", "BTC 24h change") são reconhecidas
+por regex, respondidas chamando a tool diretamente e formatadas por
+template - sem nenhuma chamada ao modelo. O resto segue para o nó "agent".
+"""
+
+import json
+import re
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END
+
+from utils.metrics import metrics
+
+
+def _symbol(group: str) -> str:
+    return rf"(?P<{group}>[A-Za-z]{{2,10}})"
+
+
+# (intent, tool, regex) - as regex têm de casar com a mensagem inteira,
+# para que perguntas compostas ("preço do ETH e porquê caiu?") sigam para o LLM
+FAST_PATH_INTENTS = [
+    ("change_24h", "crypto_price", re.compile(
+        rf"^\s*(?:(?:varia[çc][ãa]o|change)\s+(?:24h|24 horas|diária)\s+(?:d[eoa]s?\s+|of\s+)?{_symbol('symbol_a')}"
+        rf"|{_symbol('symbol_b')}\s+(?:24h|24 horas)(?:\s+(?:change|varia[çc][ãa]o))?)\s*\??\s*$",
+        re.IGNORECASE,
+    )),
+    ("price", "crypto_price", re.compile(
+        rf"^\s*(?:(?:qual\s+[ée]\s+o\s+)?(?:pre[çc]o|price|cota[çc][ãa]o)\s+(?:atual\s+)?(?:d[eoa]s?\s+|of\s+)?{_symbol('symbol_a')}"
+        rf"|{_symbol('symbol_b')}\s+(?:price|pre[çc]o))\s*\??\s*$",
+        re.IGNORECASE,
+    )),
+]
+
+TEMPLATES = {
+    "price": "{symbol} está a {price:,.2f} {currency} ({change_24h:+.2f}% nas últimas 24h).",
+    "change_24h": "{symbol} variou {change_24h:+.2f}% nas últimas 24h (preço atual: {price:,.2f} {currency}).",
+}
+
+
+def match_intent(text: str):
+    """Retorna (intent, tool_name, symbol) ou None"""
+    for intent, tool_name, pattern in FAST_PATH_INTENTS:
+        match = pattern.match(text)
+        if match:
+            symbol = next(v for k, v in match.groupdict().items() if k.startswith("symbol") and v)
+            return intent, tool_name, symbol
+    return None
+
+
+def create_fast_path_node(tools: list):
+    """
+    Cria o nó de fast path
+
+    Em caso de acerto devolve a resposta final como AIMessage;
+    caso contrário não altera o estado e o grafo segue para "agent"
+    """
+    tools_by_name = {t.name: t for t in tools}
+
+    def fast_path(state):
+        last_message = state["messages"][-1]
+        if not isinstance(last_message, HumanMessage) or not isinstance(last_message.content, str):
+            return {"messages": []}
+
+        matched = match_intent(last_message.content)
+        if matched is None:
+            metrics.incr("langgraph.fast_path.miss")
+            return {"messages": []}
+
+        intent, tool_name, symbol = matched
+        tool = tools_by_name.get(tool_name)
+        if tool is None:
+            metrics.incr("langgraph.fast_path.miss")
+            return {"messages": []}
+
+        try:
+            quote = json.loads(tool.invoke(symbol))
+            if quote.get("change_24h") is None:
+                quote["change_24h"] = 0.0
+            answer = TEMPLATES[intent].format(**quote)
+        except Exception:
+            # Símbolo desconhecido, tool em baixo, etc: o LLM trata do pedido
+            metrics.incr("langgraph.fast_path.error")
+            return {"messages": []}
+
+        metrics.incr("langgraph.fast_path.hit")
+        metrics.incr(f"langgraph.fast_path.hit.{intent}")
+        return {"messages": [AIMessage(content=answer)]}
+
+    return fast_path
+
+
+def route_after_fast_path(state) -> str:
+    """Termina se o fast path respondeu, senão segue para o agent"""
+    if isinstance(state["messages"][-1], AIMessage):
+        return END
+    return "agent"
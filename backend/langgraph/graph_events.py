@@ -0,0 +1,167 @@
+# backend/langgraph/graph_events.py
+"""
+Eventos estruturados de um run do grafo, a partir de astream_events (v2)
+
+Traduz os eventos internos do LangChain em eventos simples para clientes:
+- node: entrada num nó do grafo ("agent", "tools"), com o número do passo
+- token: pedaço de texto gerado pelo modelo
+- tool_start: tool chamada, com argumentos
+- tool_end: tool terminou, com duração (e erro, se falhou)
+- result: estado final do grafo (último evento)
+
+Os clientes podem subscrever só alguns tipos (ex: sem "token" quando só
+interessa o progresso); os restantes não chegam a ser serializados.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+
+from api.request_guard import admission
+from conversations.history_sync import SyncedHistory, commit_history
+from utils.deadline import deadline_scope
+from utils.metrics import metrics
+from .agent_langgraph import build_messages, build_result
+
+# Tipos de evento que um cliente pode subscrever ("result" é sempre emitido)
+EVENT_TYPES = ("node", "token", "tool_start", "tool_end")
+
+
+def _chunk_text(chunk) -> str:
+    """Texto de um chunk do modelo (Claude pode devolver lista de blocos)"""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+
+def _is_node_start(event) -> bool:
+    """on_chain_start do próprio nó (não dos runnables internos nem das edges)"""
+    return any(tag.startswith("graph:step:") for tag in event.get("tags", ()))
+
+
+async def stream_graph_events(
+    app,
+    graph_input: Dict[str, Any],
+    event_types: Optional[Iterable[str]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Executa o grafo e gera eventos à medida que acontecem
+
+    Args:
+        app: Grafo LangGraph compilado
+        graph_input: Estado inicial ({"messages": [...]})
+        event_types: Tipos a emitir (None = todos os de EVENT_TYPES)
+
+    Yields:
+        Dicts com "type" e os campos do evento; o último é {"type": "result", "state": ...}
+    """
+    wanted = set(EVENT_TYPES if event_types is None else event_types)
+    tool_started_at: Dict[str, float] = {}
+    final_state = None
+
+    async for event in app.astream_events(graph_input, version="v2"):
+        kind = event["event"]
+
+        if kind == "on_chain_start":
+            if "node" in wanted and _is_node_start(event):
+                yield {
+                    "type": "node",
+                    "node": event["name"],
+                    "step": event["metadata"].get("langgraph_step"),
+                }
+
+        elif kind == "on_chat_model_stream":
+            if "token" not in wanted:
+                continue
+            text = _chunk_text(event["data"]["chunk"])
+            if text:
+                yield {"type": "token", "content": text}
+
+        elif kind == "on_tool_start":
+            tool_started_at[event["run_id"]] = time.perf_counter()
+            if "tool_start" in wanted:
+                yield {"type": "tool_start", "tool": event["name"], "args": event["data"].get("input")}
+
+        elif kind in ("on_tool_end", "on_tool_error"):
+            started = tool_started_at.pop(event["run_id"], None)
+            if "tool_end" not in wanted:
+                continue
+            duration = time.perf_counter() - started if started is not None else None
+            tool_event = {
+                "type": "tool_end",
+                "tool": event["name"],
+                "duration_s": round(duration, 4) if duration is not None else None,
+            }
+            if kind == "on_tool_error":
+                tool_event["error"] = str(event["data"].get("error"))
+            yield tool_event
+
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            # Fim do run raiz: output é o estado final do grafo
+            final_state = event["data"].get("output")
+
+    yield {"type": "result", "state": final_state}
+
+
+def sse_event(event_type: str, data: Dict[str, Any]) -> str:
+    """Formata um evento Server-Sent Events"""
+    return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def sse_chat_stream(
+    app,
+    message: str,
+    synced: SyncedHistory,
+    event_types: Optional[Iterable[str]],
+    timeout: float,
+    scope: str,
+    lean: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Run de chat em streaming SSE (usado pelos endpoints /chat/stream)
+
+    Termina com um evento "done" (mesmos campos do ChatResponse; com lean sem
+    history nem metadata) ou "error".
+    Ocupa um slot de admissão durante o run; se o cliente desligar o
+    StreamingResponse cancela o gerador, e com ele o grafo.
+    """
+    try:
+        state = None
+        with deadline_scope(timeout):
+            async with admission.slot():
+                graph_input = {"messages": build_messages(message, synced.history)}
+                async for event in stream_graph_events(app, graph_input, event_types):
+                    if event["type"] == "result":
+                        state = event["state"]
+                    else:
+                        yield sse_event(event["type"], event)
+
+        result = build_result(state, message, list(synced.history))
+        committed = commit_history(synced, result["history"])
+        done = {
+            "response": result["response"],
+            "conversation_id": synced.conversation_id,
+            "partial": result["partial"],
+            **committed,
+        }
+        if lean:
+            del done["history"]
+        else:
+            done["metadata"] = {"cost": result["cost"]}
+        yield sse_event("done", done)
+    except asyncio.CancelledError:
+        metrics.incr("cancellation.client_disconnect")
+        metrics.incr(f"cancellation.{scope}")
+        raise
+    except HTTPException as e:
+        yield sse_event("error", {"status": e.status_code, "error": e.detail})
+    except Exception as e:
+        metrics.incr(f"{scope}.errors")
+        yield sse_event("error", {"status": 500, "error": str(e)})
@@ -0,0 +1,258 @@
+# backend/langgraph/graph_nodes.py
+"""
+Nós partilhados pelos grafos LangGraph (modelo e execução de tools)
+
+Cada nó tem versão sync (app.invoke) e async (app.ainvoke). Na versão
+async cancelar o run cancela a chamada HTTP ao LLM e as tools em curso.
+
+Deadline: cada passo usa como timeout o tempo que sobra do pedido
+(utils/deadline.py). Quando o orçamento esgota, o nó "agent" deixa de
+chamar o LLM e devolve a melhor resposta parcial, terminando o grafo.
+
+Loop guard: os nós registam cada passo em state["steps"] (ver run_cost.py);
+atingido um limite de iterações, tokens ou tool calls, o run termina da
+mesma forma, com resposta parcial.
+
+O output das tools é compactado antes de voltar ao modelo (tool_output.py).
+"""
+
+import asyncio
+import os
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from utils.deadline import get_deadline
+from utils.metrics import metrics
+from .run_cost import default_limits, limit_reached, model_step, run_stats, tool_step
+from .tool_output import acompact_tool_output, compact_tool_output
+
+# Timeout próprio de cada tool (limitado pelo tempo que sobra do pedido)
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+
+# Máximo de caracteres de cada resultado de tool na resposta parcial
+PARTIAL_TOOL_PREVIEW = 500
+
+PARTIAL_INTROS = {
+    "deadline": "⏱️ Não consegui concluir a resposta dentro do tempo limite.",
+    "max_iterations": "⚠️ Parei antes de concluir: atingido o limite de passos do agent.",
+    "max_prompt_tokens": "⚠️ Parei antes de concluir: atingido o limite de tokens do pedido.",
+}
+
+
+def partial_answer(messages, reason: str = "deadline") -> AIMessage:
+    """
+    Melhor resposta possível quando o run é interrompido: o que o modelo
+    já escreveu e os resultados das tools obtidos desde a última pergunta
+    """
+    since_question = []
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        since_question.append(msg)
+    since_question.reverse()
+
+    parts = [PARTIAL_INTROS[reason]]
+    drafts = [m.content for m in since_question if isinstance(m, AIMessage) and m.content]
+    if drafts:
+        parts.append(drafts[-1])
+
+    tool_results = [m for m in since_question if isinstance(m, ToolMessage)]
+    if tool_results:
+        lines = ["Resultados obtidos até agora:"]
+        for msg in tool_results:
+            content = str(msg.content)
+            if len(content) > PARTIAL_TOOL_PREVIEW:
+                content = content[:PARTIAL_TOOL_PREVIEW] + "…"
+            lines.append(f"- {msg.name or 'tool'}: {content}")
+        parts.append("\n".join(lines))
+
+    return AIMessage(
+        content="\n\n".join(parts),
+        response_metadata={"partial": True, "finish_reason": reason}
+    )
+
+
+def is_partial(message) -> bool:
+    """True se a mensagem é uma resposta parcial (tempo ou limites esgotados)"""
+    return bool(getattr(message, "response_metadata", {}).get("partial"))
+
+
+def stop_reason(message):
+    """Motivo da paragem antecipada do run (None se terminou normalmente)"""
+    if is_partial(message):
+        return message.response_metadata.get("finish_reason")
+    return None
+
+
+def last_question(messages):
+    """Última pergunta do utilizador (usada para escolher os snippets relevantes)"""
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage) and isinstance(msg.content, str):
+            return msg.content
+    return None
+
+
+def create_model_node(llm, limits=None) -> RunnableLambda:
+    """Nó "agent": chama o LLM com as mensagens do estado"""
+    limits = limits or default_limits
+
+    def should_stop(state):
+        deadline = get_deadline()
+        if deadline is not None and deadline.expired:
+            return "deadline"
+        return limit_reached(state.get("steps") or [], state["messages"], limits)
+
+    def stopped(state, reason: str):
+        if reason == "deadline":
+            # Nome de métrica da deadline (igual ao do pedido e das tools)
+            metrics.incr("deadline.exceeded.agent")
+        metrics.incr(f"agent_run.guard.{reason}")
+        return {"messages": [partial_answer(state["messages"], reason)]}
+
+    def call_model(state):
+        reason = should_stop(state)
+        if reason:
+            return stopped(state, reason)
+
+        start = time.perf_counter()
+        response = llm.invoke(state["messages"])
+        step = model_step(response, state["messages"], time.perf_counter() - start)
+        return {"messages": [response], "steps": [step]}
+
+    async def acall_model(state):
+        reason = should_stop(state)
+        if reason:
+            return stopped(state, reason)
+
+        deadline = get_deadline()
+        start = time.perf_counter()
+        try:
+            if deadline is None:
+                response = await llm.ainvoke(state["messages"])
+            else:
+                response = await asyncio.wait_for(
+                    llm.ainvoke(state["messages"]),
+                    timeout=deadline.remaining()
+                )
+        except Exception:
+            if deadline is None or not deadline.expired:
+                raise
+            return stopped(state, "deadline")
+        step = model_step(response, state["messages"], time.perf_counter() - start)
+        return {"messages": [response], "steps": [step]}
+
+    return RunnableLambda(call_model, afunc=acall_model, name="agent")
+
+
+def create_tool_executor(tools: list, limits=None) -> RunnableLambda:
+    """
+    Cria o nó que executa tools manualmente
+    Evita problemas do ToolNode com type hints
+    """
+    tools_by_name = {t.name: t for t in tools}
+    limits = limits or default_limits
+
+    def tool_message(tool_call, content: str) -> ToolMessage:
+        return ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"])
+
+    def error_message(tool_call, error: Exception) -> ToolMessage:
+        return tool_message(tool_call, f"Erro ao executar {tool_call['name']}: {str(error)}")
+
+    def not_found_message(tool_call) -> ToolMessage:
+        return tool_message(tool_call, f"Tool '{tool_call['name']}' não encontrada")
+
+    def timeout_message(tool_call) -> ToolMessage:
+        metrics.incr("deadline.exceeded.tool")
+        return tool_message(tool_call, f"Tempo esgotado ao executar {tool_call['name']}")
+
+    def limit_message(tool_call) -> ToolMessage:
+        metrics.incr("agent_run.guard.max_tool_calls")
+        return tool_message(
+            tool_call,
+            f"Limite de {limits.max_tool_calls} tool calls atingido; {tool_call['name']} não foi executada"
+        )
+
+    def split_allowed(state):
+        """Tool calls dentro do limite do run e os que o excedem"""
+        tool_calls = state["messages"][-1].tool_calls
+        used = run_stats(state.get("steps") or [])["tool_calls"]
+        allowed = max(0, limits.max_tool_calls - used)
+        return tool_calls[:allowed], tool_calls[allowed:]
+
+    def execute_tools(state):
+        """Executa tools baseado nos tool_calls"""
+        deadline = get_deadline()
+        allowed, over_limit = split_allowed(state)
+        query = last_question(state["messages"])
+        tool_messages = []
+        steps = []
+
+        for tool_call in allowed:
+            tool = tools_by_name.get(tool_call["name"])
+            start = time.perf_counter()
+            token_counts = {}
+            if tool is None:
+                tool_messages.append(not_found_message(tool_call))
+                status = "not_found"
+            elif deadline is not None and deadline.expired:
+                tool_messages.append(timeout_message(tool_call))
+                status = "timeout"
+            else:
+                try:
+                    result = tool.invoke(tool_call["args"])
+                    content, token_counts = compact_tool_output(str(result), query)
+                    tool_messages.append(tool_message(tool_call, content))
+                    status = "ok"
+                except Exception as e:
+                    tool_messages.append(error_message(tool_call, e))
+                    status = "error"
+            steps.append(
+                tool_step(tool_call["name"], status, time.perf_counter() - start, **token_counts)
+            )
+
+        for tool_call in over_limit:
+            tool_messages.append(limit_message(tool_call))
+            steps.append(tool_step(tool_call["name"], "limit", 0.0))
+
+        return {"messages": tool_messages, "steps": steps}
+
+    async def aexecute_tools(state):
+        """Executa os tool_calls em paralelo (canceláveis em conjunto)"""
+        deadline = get_deadline()
+        allowed, over_limit = split_allowed(state)
+        query = last_question(state["messages"])
+
+        async def run_one(tool_call):
+            tool = tools_by_name.get(tool_call["name"])
+            if tool is None:
+                return not_found_message(tool_call), tool_step(tool_call["name"], "not_found", 0.0)
+            timeout = TOOL_TIMEOUT_SECONDS if deadline is None else deadline.timeout(TOOL_TIMEOUT_SECONDS)
+            if timeout <= 0:
+                return timeout_message(tool_call), tool_step(tool_call["name"], "timeout", 0.0)
+
+            start = time.perf_counter()
+            token_counts = {}
+            try:
+                result = await asyncio.wait_for(tool.ainvoke(tool_call["args"]), timeout=timeout)
+                content, token_counts = await acompact_tool_output(str(result), query)
+                message, status = tool_message(tool_call, content), "ok"
+            except asyncio.TimeoutError:
+                message, status = timeout_message(tool_call), "timeout"
+            except Exception as e:
+                message, status = error_message(tool_call, e), "error"
+            duration = time.perf_counter() - start
+            return message, tool_step(tool_call["name"], status, duration, **token_counts)
+
+        results = await asyncio.gather(*(run_one(tool_call) for tool_call in allowed))
+        results += [
+            (limit_message(tool_call), tool_step(tool_call["name"], "limit", 0.0))
+            for tool_call in over_limit
+        ]
+        return {
+            "messages": [message for message, _ in results],
+            "steps": [step for _, step in results],
+        }
+
+    return RunnableLambda(execute_tools, afunc=aexecute_tools, name="tools")
@@ -0,0 +1,140 @@
+# backend/langgraph/run_cost.py
+"""
+Limites e contabilização de custo por run do ciclo agent ↔ tools
+
+Cada nó acrescenta ao estado ("steps") um registo do que fez: chamadas ao
+LLM com tokens e latência, execuções de tools com duração. Os limites
+(AGENT_MAX_ITERATIONS, AGENT_MAX_PROMPT_TOKENS, AGENT_MAX_TOOL_CALLS) são
+avaliados sobre esses registos antes de cada passo, e o resumo final
+segue nos metadados da resposta e nas métricas.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import metrics
+from utils.tokens import count_tokens
+
+# Overhead aproximado por mensagem quando o provider não devolve usage
+TOKENS_PER_MESSAGE = 4
+
+
+class RunLimits:
+    """Limites por run (um pedido do utilizador)"""
+
+    __slots__ = ("max_iterations", "max_prompt_tokens", "max_tool_calls")
+
+    def __init__(self, max_iterations: int = 8, max_prompt_tokens: int = 60000, max_tool_calls: int = 12):
+        self.max_iterations = max_iterations
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_tool_calls = max_tool_calls
+
+    @classmethod
+    def from_env(cls) -> "RunLimits":
+        return cls(
+            max_iterations=int(os.getenv("AGENT_MAX_ITERATIONS", "8")),
+            max_prompt_tokens=int(os.getenv("AGENT_MAX_PROMPT_TOKENS", "60000")),
+            max_tool_calls=int(os.getenv("AGENT_MAX_TOOL_CALLS", "12")),
+        )
+
+
+# Instância global
+default_limits = RunLimits.from_env()
+
+
+def estimate_tokens(messages) -> int:
+    """Estimativa de tokens de uma lista de mensagens"""
+    return sum(count_tokens(str(m.content)) for m in messages) + TOKENS_PER_MESSAGE * len(messages)
+
+
+def model_step(response, messages, duration_s: float) -> Dict[str, Any]:
+    """Registo de uma chamada ao LLM (usa usage do provider quando existe)"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    estimated = "input_tokens" not in usage
+    return {
+        "node": "agent",
+        "prompt_tokens": usage.get("input_tokens", estimate_tokens(messages)),
+        "completion_tokens": usage.get("output_tokens", estimate_tokens([response])),
+        "estimated": estimated,
+        "duration_s": round(duration_s, 4),
+    }
+
+
+def tool_step(tool_name: str, status: str, duration_s: float, **extra) -> Dict[str, Any]:
+    """
+    Registo de uma execução de tool (status: ok, error, timeout, not_found, limit)
+    extra: ex. tokens_before/tokens_after da compactação do output
+    """
+    return {
+        "node": "tools",
+        "tool": tool_name,
+        "status": status,
+        "duration_s": round(duration_s, 4),
+        **extra,
+    }
+
+
+def run_stats(steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totais acumulados do run até agora"""
+    stats = {
+        "iterations": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "tool_calls": 0,
+        "llm_time_s": 0.0,
+        "tool_time_s": 0.0,
+        "tool_output_tokens_before": 0,
+        "tool_output_tokens_after": 0,
+    }
+    for step in steps:
+        if step["node"] == "agent":
+            stats["iterations"] += 1
+            stats["prompt_tokens"] += step["prompt_tokens"]
+            stats["completion_tokens"] += step["completion_tokens"]
+            stats["llm_time_s"] += step["duration_s"]
+        elif step["status"] != "limit":
+            stats["tool_calls"] += 1
+            stats["tool_time_s"] += step["duration_s"]
+            stats["tool_output_tokens_before"] += step.get("tokens_before", 0)
+            stats["tool_output_tokens_after"] += step.get("tokens_after", 0)
+    stats["llm_time_s"] = round(stats["llm_time_s"], 4)
+    stats["tool_time_s"] = round(stats["tool_time_s"], 4)
+    return stats
+
+
+def limit_reached(steps: List[Dict[str, Any]], messages, limits: RunLimits) -> Optional[str]:
+    """
+    Motivo para não voltar a chamar o LLM, ou None
+
+    A primeira chamada passa sempre (um histórico longo não deve deixar o
+    pedido sem resposta); as seguintes contam o prompt que iriam enviar.
+    """
+    stats = run_stats(steps)
+    if stats["iterations"] >= limits.max_iterations:
+        return "max_iterations"
+    if stats["iterations"] and stats["prompt_tokens"] + estimate_tokens(messages) > limits.max_prompt_tokens:
+        return "max_prompt_tokens"
+    return None
+
+
+def summarize_cost(steps: List[Dict[str, Any]], stopped_by: Optional[str] = None) -> Dict[str, Any]:
+    """Resumo de custo devolvido nos metadados da resposta"""
+    return {
+        **run_stats(steps),
+        "stopped_by": stopped_by,
+        "steps": steps,
+    }
+
+
+def record_cost_metrics(cost: Dict[str, Any]):
+    """Agrega o custo do run nas métricas globais"""
+    metrics.incr("agent_run.count")
+    metrics.incr("agent_run.prompt_tokens", cost["prompt_tokens"])
+    metrics.incr("agent_run.completion_tokens", cost["completion_tokens"])
+    metrics.incr("agent_run.tool_calls", cost["tool_calls"])
+    metrics.observe("agent_run.iterations", cost["iterations"])
+    metrics.observe("agent_run.prompt_tokens_per_run", cost["prompt_tokens"])
+    metrics.observe("agent_run.llm_time_s", cost["llm_time_s"])
+    metrics.observe("agent_run.tool_time_s", cost["tool_time_s"])
+    if cost["stopped_by"]:
+        metrics.incr(f"agent_run.stopped.{cost['stopped_by']}")
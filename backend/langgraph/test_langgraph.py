@@ -80,7 +80,8 @@ def test_tool_usage():
     result = run_langgraph_agent(
         app,
         "Qual é o preço atual do Bitcoin?",
-        conversation_history=[]
+        conversation_history=[],
+        include_messages=True
     )
     
     print(f"\n🤖 Resposta: {result['response']}")
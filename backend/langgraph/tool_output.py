@@ -0,0 +1,155 @@
+# backend/langgraph/tool_output.py
+"""
+Compactação do output das tools antes de voltar ao modelo
+
+Resultados grandes (ex: dumps do web_search) entram em todos os prompts
+seguintes do run. Antes de virarem ToolMessage passam por:
+1. divisão em snippets e remoção de repetidos
+2. opcional (TOOL_OUTPUT_EMBEDDINGS=true): só os top-k snippets mais
+   próximos da pergunta, por similaridade de embeddings
+3. truncagem ao orçamento de tokens (TOOL_OUTPUT_MAX_TOKENS)
+
+As contagens de tokens antes/depois seguem no registo de custo do run.
+"""
+
+import asyncio
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from utils.metrics import metrics
+from utils.tokens import count_tokens, truncate_tokens
+
+TOOL_OUTPUT_MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "800"))
+TOOL_OUTPUT_TOP_K = int(os.getenv("TOOL_OUTPUT_TOP_K", "6"))
+
+# Linhas maiores do que isto são divididas em frases (ex: snippets colados num só parágrafo)
+LONG_LINE_CHARS = 120
+
+# Só snippets pelo menos deste tamanho são descartados por estarem contidos noutro
+NEAR_DUPLICATE_MIN_CHARS = 40
+
+_LINE_SPLIT = re.compile(r"\s*\n\s*|\s+\.\.\.\s+")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-ZÀ-Ý0-9\"'(])")
+_NORMALIZE = re.compile(r"[\W_]+")
+
+
+def split_snippets(text: str) -> List[str]:
+    """Divide o output em snippets (linhas; linhas longas em frases)"""
+    snippets = []
+    for line in _LINE_SPLIT.split(text):
+        if not line:
+            continue
+        if len(line) > LONG_LINE_CHARS:
+            snippets.extend(s for s in _SENTENCE_SPLIT.split(line) if s)
+        else:
+            snippets.append(line)
+    return snippets
+
+
+def dedupe_snippets(snippets: List[str]) -> List[str]:
+    """
+    Remove snippets repetidos (ignorando maiúsculas, pontuação e espaços)
+
+    Um snippet longo (>= NEAR_DUPLICATE_MIN_CHARS) contido, em palavras
+    inteiras, num snippet já mantido também sai; os curtos só saem se forem
+    iguais ("Price: 10" não é repetido de "Price: 100").
+    """
+    kept = []
+    seen = set()
+    padded_keys = []
+    for snippet in snippets:
+        key = _NORMALIZE.sub(" ", snippet.lower()).strip()
+        if not key or key in seen:
+            continue
+        if len(key) >= NEAR_DUPLICATE_MIN_CHARS:
+            padded = f" {key} "
+            if any(padded in other for other in padded_keys):
+                continue
+        kept.append(snippet)
+        seen.add(key)
+        padded_keys.append(f" {key} ")
+    return kept
+
+
+class PassageRanker:
+    """
+    Seleção opcional dos snippets mais relevantes para a pergunta
+    Requer sentence-transformers; se não estiver instalado fica desativado
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def top_passages(self, query: str, passages: List[str], top_k: int) -> List[str]:
+        """Os top_k snippets mais similares à pergunta, pela ordem original"""
+        if len(passages) <= top_k:
+            return passages
+        vectors = self.model.encode([query] + passages, normalize_embeddings=True)
+        scores = vectors[1:] @ vectors[0]
+        best = sorted(range(len(passages)), key=lambda i: float(scores[i]), reverse=True)[:top_k]
+        return [passages[i] for i in sorted(best)]
+
+
+_ranker: Optional[PassageRanker] = None
+_ranker_loaded = False
+
+
+def get_ranker() -> Optional[PassageRanker]:
+    """Ranker de embeddings, se ativo (TOOL_OUTPUT_EMBEDDINGS=true) e disponível"""
+    global _ranker, _ranker_loaded
+    if not _ranker_loaded:
+        _ranker_loaded = True
+        if os.getenv("TOOL_OUTPUT_EMBEDDINGS", "false").lower() == "true":
+            try:
+                _ranker = PassageRanker()
+            except Exception as e:
+                print(f"⚠️ Seleção de passagens por embeddings indisponível: {e}")
+    return _ranker
+
+
+def compact_tool_output(
+    text: str,
+    query: Optional[str] = None,
+    max_tokens: int = TOOL_OUTPUT_MAX_TOKENS,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Compacta o output de uma tool
+
+    Args:
+        text: Output original (str(result))
+        query: Pergunta do utilizador, para a seleção por relevância
+        max_tokens: Orçamento de tokens do resultado
+
+    Returns:
+        (texto compactado, {"tokens_before", "tokens_after"})
+    """
+    tokens_before = count_tokens(text)
+    snippets = split_snippets(text)
+    deduped = dedupe_snippets(snippets)
+    compacted = "\n".join(deduped) if len(deduped) < len(snippets) else text
+
+    if count_tokens(compacted) > max_tokens:
+        ranker = get_ranker()
+        if ranker is not None and query:
+            compacted = "\n".join(ranker.top_passages(query, deduped, TOOL_OUTPUT_TOP_K))
+        compacted = truncate_tokens(compacted, max_tokens)
+
+    tokens_after = count_tokens(compacted) if compacted is not text else tokens_before
+    metrics.observe("tool_output.tokens_before", tokens_before)
+    metrics.observe("tool_output.tokens_after", tokens_after)
+    metrics.incr("tool_output.tokens_saved", tokens_before - tokens_after)
+    return compacted, {"tokens_before": tokens_before, "tokens_after": tokens_after}
+
+
+async def acompact_tool_output(
+    text: str,
+    query: Optional[str] = None,
+    max_tokens: int = TOOL_OUTPUT_MAX_TOKENS,
+) -> Tuple[str, Dict[str, int]]:
+    """Versão async: com embeddings ativos o trabalho de CPU sai do event loop"""
+    if get_ranker() is None:
+        return compact_tool_output(text, query, max_tokens)
+    return await asyncio.to_thread(compact_tool_output, text, query, max_tokens)
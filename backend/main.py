@@ -5,8 +5,14 @@ from utilities.utilities import Utilities
 from utilities.utilities_api import router as utilities_router
 from agents.agent_ollama_api import router as crypto_agent_router
 from agents.agent_singleton_api import router as agent_singleton_router
+from agents.agent_fallback_api import router as agent_fallback_router
+from agents.agent_routed_api import router as agent_routed_router
+from agents.agent_batch_api import router as agent_batch_router
 from langgraph.agent_langgraph_api import router as langgraph_router
 from langgraph.agent_langgraph_singleton_api import router as langgraph_singleton_router
+from langgraph.agent_langgraph_ws_api import router as langgraph_ws_router
+from jobs.jobs_api import router as jobs_router
+from conversations.conversations_api import router as conversations_router
 
 app = FastAPIAppFactory.create_app()
 
@@ -16,8 +22,14 @@ app = FastAPIAppFactory.create_app()
 app.include_router(utilities_router)
 app.include_router(crypto_agent_router)
 app.include_router(agent_singleton_router)
+app.include_router(agent_fallback_router)
+app.include_router(agent_routed_router)
+app.include_router(agent_batch_router)
 app.include_router(langgraph_router)
 app.include_router(langgraph_singleton_router)
+app.include_router(langgraph_ws_router)
+app.include_router(jobs_router)
+app.include_router(conversations_router)
 
 # ============================================================================
 # STARTUP
@@ -39,6 +51,9 @@ if __name__ == "__main__":
     print(f"   • POST /api/agent/chat - Chat com Agent LangChain")
     print(f"   • GET  /api/agent/conversations - Listar conversas")
     print(f"   • GET  /api/agent/conversation/{{id}}/history - Ver histórico")
+    print(f"   • GET  /api/agent/conversations/memory - Memória das conversas")
+    print(f"   • GET  /ready - Readiness (modelo acessível e aquecido, resultado em cache)")
+    print(f"   • GET  /api/debug/models - Warm-up e modelos residentes")
     print("="*70 + "\n")
     
     # No print de endpoints, adiciona:
@@ -46,6 +61,7 @@ if __name__ == "__main__":
     print(f"   • POST /api/langgraph/chat - Chat com LangGraph")
     print(f"   • GET  /api/langgraph/health - Health check")
     print(f"   • POST /api/langgraph/reset - Reset agent")
+    print(f"   • WS   /ws/chat - Chat por WebSocket (streaming)")
     
     uvicorn.run(
         "main:app",
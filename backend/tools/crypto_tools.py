@@ -0,0 +1,87 @@
+"""
+Tools de preços de criptomoedas (CoinGecko, API pública)
+"""
+
+import json
+
+import requests
+from langchain_core.tools import Tool
+
+from utils.deadline import remaining_timeout
+
+COINGECKO_URL = "https://api.coingecko.com/api/v3/simple/price"
+
+# Símbolo -> id CoinGecko
+COINGECKO_IDS = {
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "SOL": "solana",
+    "BNB": "binancecoin",
+    "XRP": "ripple",
+    "ADA": "cardano",
+    "DOGE": "dogecoin",
+    "DOT": "polkadot",
+    "AVAX": "avalanche-2",
+    "LINK": "chainlink",
+    "LTC": "litecoin",
+    "MATIC": "matic-network",
+}
+
+# Nomes comuns -> símbolo
+COIN_NAMES = {
+    "BITCOIN": "BTC",
+    "ETHEREUM": "ETH",
+    "ETHER": "ETH",
+    "SOLANA": "SOL",
+    "CARDANO": "ADA",
+    "DOGECOIN": "DOGE",
+    "POLKADOT": "DOT",
+    "LITECOIN": "LTC",
+    "RIPPLE": "XRP",
+}
+
+
+def normalize_symbol(symbol: str) -> str:
+    """Converte 'bitcoin', 'btc', ' BTC ' em 'BTC'"""
+    symbol = symbol.strip().upper()
+    return COIN_NAMES.get(symbol, symbol)
+
+
+def get_crypto_quote(symbol: str, vs_currency: str = "usd", timeout: float = 5.0) -> dict:
+    """
+    Obtém preço atual e variação 24h de uma criptomoeda
+    
+    Returns:
+        dict com symbol, currency, price e change_24h (%)
+    """
+    symbol = normalize_symbol(symbol)
+    coin_id = COINGECKO_IDS.get(symbol)
+    if coin_id is None:
+        raise ValueError(f"Criptomoeda não suportada: {symbol}")
+    
+    response = requests.get(
+        COINGECKO_URL,
+        params={"ids": coin_id, "vs_currencies": vs_currency, "include_24hr_change": "true"},
+        timeout=remaining_timeout(timeout)
+    )
+    response.raise_for_status()
+    data = response.json()[coin_id]
+    
+    return {
+        "symbol": symbol,
+        "currency": vs_currency.upper(),
+        "price": data[vs_currency],
+        "change_24h": data.get(f"{vs_currency}_24h_change"),
+    }
+
+
+def get_crypto_price_tool() -> Tool:
+    """Tool LangChain que devolve a cotação em JSON"""
+    return Tool(
+        name="crypto_price",
+        func=lambda symbol: json.dumps(get_crypto_quote(symbol)),
+        description=(
+            "Obtém o preço atual (USD) e a variação 24h de uma criptomoeda. "
+            "Input: símbolo (BTC, ETH, SOL, ...)"
+        )
+    )
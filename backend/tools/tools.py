@@ -4,6 +4,7 @@ Tools para o agente LangGraph
 
 from langchain_community.tools import DuckDuckGoSearchRun
 from langchain_core.tools import Tool
+from .crypto_tools import get_crypto_price_tool
 
 
 def get_all_tools():
@@ -27,6 +28,9 @@ def get_all_tools():
     except Exception as e:
         print(f"Aviso: Não foi possível carregar web_search: {e}")
     
+    # Tool de preços de crypto
+    tools.append(get_crypto_price_tool())
+    
     # Adiciona aqui mais tools conforme necessário
     # Exemplo:
     # tools.append(outra_tool)
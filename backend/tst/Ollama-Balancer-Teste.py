@@ -0,0 +1,112 @@
+# backend/tst/Ollama-Balancer-Teste.py
+"""
+Script de validação do load balancer Ollama
+Usa servidores Ollama falsos locais (http.server) - não precisa de GPU
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.ollama_balancer import OllamaLoadBalancer
+
+
+# ============================================================================
+# SERVIDOR OLLAMA FALSO
+# ============================================================================
+
+def start_fake_ollama(delay: float = 0.0):
+    """Arranca um servidor que responde a /api/tags; devolve (server, url)"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.server.down:
+                self.send_response(503)
+                self.end_headers()
+                return
+            time.sleep(delay)
+            body = b'{"models": []}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.down = False
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def simulate_request(balancer, conversation_id=None):
+    """Simula um pedido (latência dada pelo servidor falso escolhido)"""
+    with balancer.request(conversation_id) as host:
+        server = servers[host.url]
+        if server.down:
+            raise ConnectionError("host em baixo")
+        time.sleep(server.delay)
+        return host.url
+
+
+fast, fast_url = start_fake_ollama(delay=0.01)
+slow, slow_url = start_fake_ollama(delay=0.05)
+servers = {fast_url: fast, slow_url: slow}
+
+
+# ============================================================================
+# TESTE 1: Latency-weighted prefere o host rápido
+# ============================================================================
+print("\n" + "="*70)
+print("⚖️ TESTE 1: Seleção ponderada pela latência")
+print("-"*70)
+
+balancer = OllamaLoadBalancer([fast_url, slow_url], strategy="latency")
+hits = Counter(simulate_request(balancer) for _ in range(40))
+print(f"   • Distribuição: {dict(hits)}")
+print("✅ OK" if hits[fast_url] > hits[slow_url] else "❌ Host lento recebeu mais tráfego")
+
+
+# ============================================================================
+# TESTE 2: Ejeção e readmissão por health probe
+# ============================================================================
+print("\n" + "="*70)
+print("🩺 TESTE 2: Ejeção e readmissão")
+print("-"*70)
+
+balancer = OllamaLoadBalancer([fast_url, slow_url], eject_after=2, readmit_after=1)
+fast.down = True
+balancer.probe_all()
+balancer.probe_all()
+hosts = {h.url: h.healthy for h in balancer.hosts}
+print(f"   • Após falhas: {hosts}")
+print("✅ OK" if not hosts[fast_url] and balancer.pick_url() == slow_url else "❌ Host não foi ejetado")
+
+fast.down = False
+balancer.probe_all()
+hosts = {h.url: h.healthy for h in balancer.hosts}
+print(f"   • Após recuperar: {hosts}")
+print("✅ OK" if hosts[fast_url] else "❌ Host não foi readmitido")
+
+
+# ============================================================================
+# TESTE 3: Afinidade por conversa
+# ============================================================================
+print("\n" + "="*70)
+print("📌 TESTE 3: Afinidade por conversation_id")
+print("-"*70)
+
+balancer = OllamaLoadBalancer([fast_url, slow_url], affinity=True)
+picks = {conv: {balancer.pick_url(conv) for _ in range(10)} for conv in ("a", "b", "c", "d")}
+print(f"   • Hosts por conversa: { {k: len(v) for k, v in picks.items()} }")
+print("✅ OK" if all(len(v) == 1 for v in picks.values()) else "❌ Conversa mudou de host")
+
+fast.shutdown()
+slow.shutdown()
@@ -0,0 +1,70 @@
+# backend/tst/RateLimit-Batch-Teste.py
+"""
+Script de validação do rate limit do chat em batch
+
+Usa o endpoint real /api/agent/chat/batch com um agent falso (sem LLM) e as
+regras por omissão: um batch maior do que o burst do chat tem de passar
+(bucket próprio, cobrado por mensagem) e um batch acima da capacidade do
+bucket devolve 413 sem Retry-After.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import agents.agent_batch_api as batch_api
+from api.rate_limiter import LocalRateLimitBackend, RateLimitMiddleware, RateLimitRule, default_rules
+
+
+async def fake_run(message: str, conversation_id: str):
+    return {"success": True, "response": message.upper()}
+
+
+def make_client(rules) -> TestClient:
+    app = FastAPI()
+    app.include_router(batch_api.router)
+    app.add_middleware(RateLimitMiddleware, rules=rules, backend=LocalRateLimitBackend())
+    return TestClient(app)
+
+
+batch_api.get_run_fn = lambda agent: fake_run
+rules = default_rules()
+chat_burst = next(rule for rule in rules if rule.name == "chat").burst
+batch_rule = next(rule for rule in rules if rule.name == "batch")
+
+print("\n" + "="*70)
+print("🧪 RATE LIMIT DO CHAT EM BATCH")
+print("="*70 + "\n")
+
+# ============================================================================
+# TESTE 1: Batch maior do que o burst do chat
+# ============================================================================
+size = int(chat_burst) * 5
+client = make_client(rules)
+response = client.post("/api/agent/chat/batch", json={"messages": [f"q{i}" for i in range(size)]})
+lines = response.text.strip().splitlines()
+print(f"Batch de {size} mensagens (burst do chat = {chat_burst:g}): HTTP {response.status_code}, {len(lines)} linhas")
+assert response.status_code == 200, response.text
+assert len(lines) == size + 1
+print(f"   ratelimit-remaining: {response.headers.get('ratelimit-remaining')}")
+
+# O bucket do batch foi cobrado por mensagem: o segundo batch grande não cabe
+response = client.post("/api/agent/chat/batch", json={"messages": ["q"] * int(batch_rule.burst)})
+print(f"Segundo batch de {batch_rule.burst:g}: HTTP {response.status_code}, Retry-After={response.headers.get('retry-after')}")
+assert response.status_code == 429
+
+# ============================================================================
+# TESTE 2: Batch acima da capacidade do bucket
+# ============================================================================
+small = [RateLimitRule("batch", 60, 10, paths=("/api/agent/chat/batch",)), RateLimitRule("default", 600, 100)]
+response = make_client(small).post("/api/agent/chat/batch", json={"messages": ["q"] * 20})
+print(f"Batch de 20 com capacidade 10: HTTP {response.status_code}, Retry-After={response.headers.get('retry-after')}")
+print(f"   {response.json()['detail']}")
+assert response.status_code == 413
+assert "retry-after" not in response.headers
+
+print("\n✅ Rate limit do batch OK")
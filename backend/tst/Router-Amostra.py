@@ -0,0 +1,80 @@
+# backend/tst/Router-Amostra.py
+"""
+Amostra rotulada para afinar os limiares do model router
+
+Corre as heurísticas (sem embeddings) sobre pedidos com o tier esperado e
+mostra a precisão, a matriz de confusão e os pedidos mal classificados.
+Usar depois de mexer em DEFAULT_RULES ou num MODEL_ROUTER_RULES_FILE.
+"""
+
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.model_router import TIERS, ModelRouter
+
+SAMPLE = [
+    # small: cumprimentos, definições curtas, consultas diretas
+    ("Olá", "small"),
+    ("thanks!", "small"),
+    ("O que é o Bitcoin?", "small"),
+    ("what is staking?", "small"),
+    ("Preço do ETH", "small"),
+    ("BTC price now", "small"),
+    ("Quanto vale 1 SOL em euros?", "small"),
+    ("Qual é o market cap do Cardano?", "small"),
+    ("resumed asterisk codex", "small"),
+    ("Price: 10", "small"),
+    # large: explicações, comparações simples, pedidos abertos
+    ("Tell me about Solana", "large"),
+    ("Explica-me como funciona o proof of stake", "large"),
+    ("Compara o Bitcoin com o Ethereum", "large"),
+    ("Why did the market drop today?", "large"),
+    ("Fala-me sobre as últimas notícias do XRP", "large"),
+    ("Qual a diferença entre uma stablecoin e uma CBDC?", "large"),
+    ("Devo comprar ETH agora ou esperar pelo próximo halving do BTC?", "large"),
+    ("Resume as notícias de hoje sobre cripto", "large"),
+    ("How does the Lightning Network work?", "large"),
+    ("Quais os riscos de deixar moedas numa exchange?", "large"),
+    ("Give me the outlook for DeFi tokens this quarter", "large"),
+    # claude: raciocínio longo, várias partes, código
+    ("Analisa o mercado, compara BTC e ETH e sugere uma estratégia de "
+     "investimento passo a passo com os riscos de cada opção", "claude"),
+    ("Implement a Python function that computes the moving average of BTC "
+     "prices and explain the code step by step", "claude"),
+    ("```python\ndef price(x):\n    return x\n```\nPorque é que isto falha?", "claude"),
+    ("Faz uma análise dos riscos regulatórios e uma previsão para o preço "
+     "do ETH nos próximos 6 meses, avaliando cenários otimista e pessimista", "claude"),
+    ("Compare the tokenomics of Solana, Avalanche and Polkadot, evaluate the "
+     "risks of each, and forecast which is most likely to grow", "claude"),
+]
+
+
+def main():
+    router = ModelRouter(use_embeddings=False)
+    confusion = Counter()
+    errors = []
+    for message, expected in SAMPLE:
+        decision = router.route(message)
+        confusion[(expected, decision.tier)] += 1
+        if decision.tier != expected:
+            errors.append((message, expected, decision.tier, decision.reason, decision.score))
+
+    hits = sum(n for (expected, got), n in confusion.items() if expected == got)
+    print("\n" + "="*70)
+    print(f"🧭 Model router: {hits}/{len(SAMPLE)} corretos ({hits / len(SAMPLE):.0%})")
+    print("="*70)
+    print(f"{'esperado':>10} | " + " | ".join(f"{tier:>6}" for tier in TIERS))
+    for expected in TIERS:
+        print(f"{expected:>10} | " + " | ".join(f"{confusion[(expected, got)]:>6}" for got in TIERS))
+
+    if errors:
+        print("\n❌ Mal classificados:")
+        for message, expected, got, reason, score in errors:
+            print(f"   • [{expected} -> {got}, {reason}, score={score:.2f}] {message[:70]!r}")
+
+
+if __name__ == "__main__":
+    main()
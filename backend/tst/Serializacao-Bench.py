@@ -0,0 +1,103 @@
+# backend/tst/Serializacao-Bench.py
+"""
+Microbenchmark da serialização das respostas de chat (custo por KB de histórico)
+
+Compara, para históricos de vários tamanhos:
+- antes: ChatResponse com lista de Message + validação do response_model + JSONResponse
+- full + orjson: o mesmo caminho com FastJSONResponse (default da app)
+- lean: só o turno novo, serializado diretamente (lean_response)
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from api.responses import FastJSONResponse, lean_response
+from langgraph.agent_langgraph_api import ChatResponse, Message
+
+HISTORY_SIZES_KB = [1, 8, 64, 256]
+ITERATIONS = 200
+
+response_field = create_model_field(name="Response_chat", type_=ChatResponse, mode="serialization")
+
+
+def make_history(size_kb: int):
+    """Histórico com ~size_kb KB de conteúdo (turnos de ~500 bytes)"""
+    turn = "O preço do Bitcoin subiu hoje acima da média dos últimos dias. " * 8
+    turns = max(2, size_kb * 1024 // len(turn.encode("utf-8")))
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": turn}
+        for i in range(turns)
+    ]
+
+
+def full_payload(history):
+    return ChatResponse(
+        response=history[-1]["content"],
+        conversation_id="conv_bench",
+        history=[Message(**msg) for msg in history],
+        partial=False,
+        metadata={"cost": {"iterations": 2, "prompt_tokens": 1200}},
+        history_version=42,
+        history_hash="0" * 64,
+    )
+
+
+async def serialize_full(history, response_class):
+    """Caminho do FastAPI: constrói o modelo, valida pelo response_model e renderiza"""
+    content = await serialize_response(
+        field=response_field, response_content=full_payload(history), is_coroutine=True
+    )
+    return response_class(content).body
+
+
+async def serialize_lean(history):
+    content = {
+        "response": history[-1]["content"],
+        "conversation_id": "conv_bench",
+        "partial": False,
+        "history_version": 42,
+        "history_hash": "0" * 64,
+    }
+    return lean_response(content, Response()).body
+
+
+async def bench(fn, *args) -> float:
+    """Tempo médio por chamada, em microssegundos"""
+    await fn(*args)  # aquecimento
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await fn(*args)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+async def main():
+    print("\n" + "="*70)
+    print(f"📦 Serialização de ChatResponse ({FastJSONResponse.__name__})")
+    print("="*70)
+    print(f"{'histórico':>10} | {'antes':>12} | {'full+orjson':>12} | {'lean':>12} | {'µs/KB antes':>11} | {'µs/KB orjson':>12}")
+    print("-"*70)
+
+    for size_kb in HISTORY_SIZES_KB:
+        history = make_history(size_kb)
+        before = await bench(serialize_full, history, JSONResponse)
+        after = await bench(serialize_full, history, FastJSONResponse)
+        lean = await bench(serialize_lean, history)
+        print(
+            f"{size_kb:>8}KB | {before:>10.1f}µs | {after:>10.1f}µs | {lean:>10.1f}µs | "
+            f"{before / size_kb:>11.1f} | {after / size_kb:>12.1f}"
+        )
+
+    print("\nlean não depende do tamanho do histórico (só o turno novo é enviado)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
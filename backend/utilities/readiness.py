@@ -0,0 +1,117 @@
+# backend/utilities/readiness.py
+"""
+Readiness do backend (GET /ready)
+
+O estado é recalculado em background, no fim de cada ronda de health probes
+do load balancer Ollama (que já consulta /api/tags de cada host), e o
+endpoint só devolve o último resultado guardado: nenhum pedido de rede nem
+I/O por chamada, por muitos probes que o Docker/load balancer façam.
+
+Checks:
+- llm: para o provider ativo (o mesmo do warm-up: o LLM do agent_manager no
+  arranque, atualizado por /api/agent/switch-llm), o modelo está disponível em pelo menos um host
+  Ollama saudável; com claude/openai, há a API key respetiva
+- warmup: os modelos foram pré-carregados (config/model_warmup.py)
+- gates extra registados por outros módulos (set_gate)
+
+Um resultado mais velho do que READY_MAX_AGE_SECONDS (probes parados)
+conta como não pronto.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from config.llm_config import llm_config
+from config.model_warmup import model_warmup
+from utils.metrics import metrics
+
+
+# Providers cloud: basta a API key (os hosts Ollama não contam)
+API_KEYS = {"claude": "ANTHROPIC_API_KEY", "openai": "OPENAI_API_KEY"}
+
+
+class ReadinessProbe:
+    """Estado de readiness calculado em background e servido da cache"""
+
+    def __init__(self, max_age_seconds: float = 60.0):
+        self.max_age_seconds = max_age_seconds
+        self._gates: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {
+            "ready": False,
+            "checked_at": None,
+            "checks": {"llm": {"ok": False, "detail": "a aguardar o primeiro probe"}},
+        }
+
+    def _check_llm(self) -> Dict[str, Any]:
+        provider = model_warmup.provider
+        if provider is None:
+            return {"ok": False, "provider": None, "detail": "a aguardar o arranque do warm-up"}
+        if provider in API_KEYS:
+            name = API_KEYS[provider]
+            ok = bool(os.getenv(name))
+            return {"ok": ok, "provider": provider, "detail": None if ok else f"{name} em falta"}
+
+        model = llm_config.ollama_model
+        hosts = llm_config.ollama_balancer.hosts
+        ready_hosts = [h.url for h in hosts if h.healthy and h.has_model(model)]
+        if ready_hosts:
+            detail = None
+        elif not any(h.models is not None for h in hosts):
+            detail = "nenhum host Ollama respondeu"
+        else:
+            detail = f"modelo {model} indisponível nos hosts Ollama"
+        return {
+            "ok": bool(ready_hosts),
+            "provider": provider,
+            "model": model,
+            "hosts_ready": ready_hosts,
+            "detail": detail,
+        }
+
+    def refresh(self):
+        """Recalcula o estado (chamado depois de cada ronda de probes)"""
+        with self._lock:
+            checks = {"llm": self._check_llm(), **self._gates}
+            ready = all(check["ok"] for check in checks.values())
+            if ready != self._state["ready"]:
+                print(f"{'✅' if ready else '⚠️ '} Readiness: {'pronto' if ready else 'não pronto'}")
+            self._state = {"ready": ready, "checked_at": time.time(), "checks": checks}
+        metrics.set_gauge("readiness.ready", int(ready))
+
+    def set_gate(self, name: str, ok: bool, detail: str = None, **info):
+        """Regista uma condição extra para estar pronto (ex.: warm-up do modelo)"""
+        with self._lock:
+            self._gates[name] = {"ok": ok, "detail": detail, **info}
+            checks = {**self._state["checks"], name: self._gates[name]}
+            if self._state["checked_at"] is not None:
+                # O gate do warm-up muda com o switch de LLM: o provider do check llm também
+                checks["llm"] = self._check_llm()
+            ready = self._state["checked_at"] is not None and all(c["ok"] for c in checks.values())
+            self._state = {**self._state, "ready": ready, "checks": checks}
+        metrics.set_gauge("readiness.ready", int(ready))
+
+    def status(self) -> Dict[str, Any]:
+        """Último resultado (não faz I/O)"""
+        state = self._state
+        checked_at = state["checked_at"]
+        age = time.time() - checked_at if checked_at is not None else None
+        stale = age is None or age > self.max_age_seconds
+        return {
+            "ready": state["ready"] and not stale,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "stale": stale,
+            "checks": state["checks"],
+        }
+
+
+# Instância global (atualizada pelos probes do load balancer)
+readiness = ReadinessProbe(
+    max_age_seconds=float(os.getenv(
+        "READY_MAX_AGE_SECONDS", str(max(30.0, 3 * llm_config.ollama_balancer.probe_interval))
+    ))
+)
+llm_config.ollama_balancer.add_probe_listener(readiness.refresh)
+model_warmup.add_listener(lambda gate: readiness.set_gate("warmup", **gate))
@@ -1,5 +1,6 @@
 import os
 import platform
+from functools import lru_cache
 from pathlib import Path
 from config.llm_config import llm_config
 
@@ -9,8 +10,9 @@ class Utilities:
 # UTILITY FUNCTIONS
 # ============================================================================
     @staticmethod
+    @lru_cache(maxsize=1)
     def is_running_in_docker() -> bool:
-        """Deteta se o código está a correr dentro de um container Docker."""
+        """Deteta se o código está a correr dentro de um container Docker (uma vez por processo)."""
         if Path("/.dockerenv").exists():
             return True
         
@@ -32,15 +34,23 @@ class Utilities:
         return False
 
     @staticmethod
-    def get_environment_info() -> dict:
-        """Retorna informação detalhada sobre o ambiente de execução."""
+    @lru_cache(maxsize=1)
+    def get_static_environment() -> dict:
+        """Factos do ambiente que não mudam com o processo a correr (calculados uma vez)."""
         return {
             "running_in_docker": Utilities.is_running_in_docker(),
             "platform": platform.system(),
             "hostname": platform.node(),
             "python_version": platform.python_version(),
+            "dockerenv_exists": Path("/.dockerenv").exists(),
+        }
+
+    @staticmethod
+    def get_environment_info() -> dict:
+        """Retorna informação detalhada sobre o ambiente de execução."""
+        return {
+            **Utilities.get_static_environment(),
             "ollama_url": llm_config.ollama_url,
             "default_llm": llm_config.default_model,
             "has_openai_key": bool(llm_config.openai_api_key),
-            "dockerenv_exists": Path("/.dockerenv").exists(),
-    }
\ No newline at end of file
+        }
\ No newline at end of file
@@ -1,9 +1,32 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 from utilities.utilities import Utilities
+from utilities.readiness import readiness
+from config.llm_config import llm_config
+from config.model_warmup import model_warmup
+from utils.metrics import metrics
+from functools import lru_cache
+import ipaddress
 import socket
 
 router = APIRouter()
 
+# Espaço de endereços da Tailscale (CGNAT)
+TAILSCALE_NETWORK = ipaddress.ip_network("100.64.0.0/10")
+
+
+@lru_cache(maxsize=1)
+def get_server_ip() -> str:
+    """IP do servidor (resolvido uma vez; evita um lookup DNS por pedido)"""
+    return socket.gethostbyname(socket.gethostname())
+
+
+def is_tailscale_ip(ip: str) -> bool:
+    try:
+        return ipaddress.ip_address(ip) in TAILSCALE_NETWORK
+    except ValueError:
+        return False
+
+
 @router.get("/health")
 async def health():
     """Health check detalhado com informação do ambiente."""
@@ -12,12 +35,39 @@ async def health():
         "environment": Utilities.get_environment_info()
     }
 
+
+@router.get("/ready")
+async def ready(response: Response):
+    """Readiness: o modelo está acessível (resultado dos probes em background, sem I/O)"""
+    status = readiness.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
 @router.get("/api/debug/environment")
 async def debug_environment():
     """Endpoint de debug para ver toda a informação do ambiente."""
     return Utilities.get_environment_info()
 
 
+@router.get("/api/debug/ollama-hosts")
+async def debug_ollama_hosts():
+    """Estado do load balancer Ollama (saúde, pedidos em curso, latência)"""
+    return llm_config.ollama_balancer.snapshot()
+
+
+@router.get("/api/debug/models")
+async def debug_models():
+    """Warm-up e modelos residentes (/api/ps) em cada host Ollama"""
+    return model_warmup.snapshot()
+
+
+@router.get("/api/metrics")
+async def get_metrics():
+    """Contadores e distribuições de latência do backend"""
+    return metrics.snapshot()
+
+
 
 @router.get("/")
 async def root():
@@ -39,10 +89,10 @@ async def root():
 async def connection_info(request: Request):
     """Retorna informação sobre a conexão atual"""
     client_ip = request.client.host
-    server_ip = socket.gethostbyname(socket.gethostname())
+    server_ip = get_server_ip()
     
-    is_tailscale_client = client_ip.startswith('100.') and client_ip.split('.')[1] in [str(i) for i in range(64, 128)]
-    is_tailscale_server = server_ip.startswith('100.') and server_ip.split('.')[1] in [str(i) for i in range(64, 128)]
+    is_tailscale_client = is_tailscale_ip(client_ip)
+    is_tailscale_server = is_tailscale_ip(server_ip)
     
     return {
         "client_ip": client_ip,
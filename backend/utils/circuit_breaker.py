@@ -0,0 +1,130 @@
+# backend/utils/circuit_breaker.py
+"""
+Circuit breaker por provider de LLM
+
+closed    -> pedidos passam; abre se a taxa de erro ou de chamadas lentas
+             na janela ultrapassar o limite
+open      -> falha imediatamente durante open_seconds
+half_open -> deixa passar poucos pedidos de teste; sucesso fecha, falha reabre
+"""
+
+import threading
+import time
+from collections import deque
+
+from utils.metrics import metrics
+
+
+class CircuitBreaker:
+    """Circuit breaker com janela deslizante de resultados"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        """
+        Args:
+            name: Nome do provider (usado nas métricas)
+            failure_rate_threshold: Fração de erros na janela que abre o circuito
+            slow_call_seconds: Latência a partir da qual uma chamada conta como lenta
+            slow_call_rate_threshold: Fração de chamadas lentas que abre o circuito
+            window_size: Nº de chamadas na janela deslizante
+            min_calls: Mínimo de chamadas na janela antes de avaliar
+            open_seconds: Tempo em open antes de passar a half_open
+            half_open_max_calls: Pedidos de teste em simultâneo no half_open
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)  # (falhou, lenta)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(self.HALF_OPEN)
+
+    def _transition(self, state: str):
+        self._state = state
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if state in (self.CLOSED, self.HALF_OPEN):
+            self._half_open_in_flight = 0
+        if state == self.CLOSED:
+            self._window.clear()
+        metrics.incr(f"circuit.{self.name}.{state}")
+
+    def allow_request(self) -> bool:
+        """True se o pedido pode seguir para o provider"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            metrics.incr(f"circuit.{self.name}.rejected")
+            return False
+
+    def record_success(self, latency: float):
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._transition(self.OPEN if slow else self.CLOSED)
+                return
+            self._window.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self, latency: float = 0.0):
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._transition(self.OPEN)
+                return
+            self._window.append((True, slow))
+            self._evaluate()
+
+    def _evaluate(self):
+        if self._state != self.CLOSED or len(self._window) < self.min_calls:
+            return
+        total = len(self._window)
+        failure_rate = sum(1 for failed, _ in self._window if failed) / total
+        slow_rate = sum(1 for _, slow in self._window if slow) / total
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            self._transition(self.OPEN)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._maybe_half_open()
+            total = len(self._window)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "calls_in_window": total,
+                "failure_rate": (sum(1 for f, _ in self._window if f) / total) if total else 0.0,
+                "slow_rate": (sum(1 for _, s in self._window if s) / total) if total else 0.0,
+            }
@@ -0,0 +1,100 @@
+# backend/utils/deadline.py
+"""
+Deadline por pedido, propagada por contextvar
+
+O endpoint define o orçamento total (header X-Request-Timeout ou
+REQUEST_TIMEOUT_SECONDS); o grafo, as chamadas ao LLM, as tools e os
+clientes HTTP leem o tempo que sobra e usam-no como timeout.
+As tasks asyncio e os executores do LangChain copiam o contexto, por isso
+a deadline chega a todos os passos do run sem ter de ser passada à mão.
+"""
+
+import contextvars
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+TIMEOUT_HEADER = "X-Request-Timeout"
+
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "60"))
+MAX_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_MAX_SECONDS", "300"))
+
+
+class DeadlineExceeded(Exception):
+    """O orçamento de tempo do pedido esgotou"""
+
+
+class Deadline:
+    """Instante limite (relógio monotónico) de um pedido"""
+
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Tempo restante, opcionalmente limitado pelo timeout próprio do passo"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded(f"Orçamento de {self.budget:.1f}s esgotado")
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+def get_deadline() -> Optional[Deadline]:
+    """Deadline do pedido atual (None fora de um pedido)"""
+    return _current.get()
+
+
+def remaining_timeout(default: float) -> float:
+    """
+    Timeout para um passo: o seu default, limitado pelo tempo que sobra
+
+    Raises:
+        DeadlineExceeded se já não sobra tempo (o passo nem deve começar)
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    deadline.check()
+    return deadline.timeout(default)
+
+
+def parse_timeout(header_value: Optional[str]) -> float:
+    """Orçamento pedido no header (segundos), limitado a REQUEST_TIMEOUT_MAX_SECONDS"""
+    if not header_value:
+        return DEFAULT_TIMEOUT_SECONDS
+    try:
+        seconds = float(header_value)
+    except ValueError:
+        return DEFAULT_TIMEOUT_SECONDS
+    if not math.isfinite(seconds) or seconds <= 0:
+        # nan/inf: min(nan, MAX) daria nan e a deadline expirava logo
+        return DEFAULT_TIMEOUT_SECONDS
+    return min(seconds, MAX_TIMEOUT_SECONDS)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Define a deadline para o código (e tasks criadas) dentro do bloco"""
+    token = _current.set(Deadline(seconds))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
@@ -0,0 +1,99 @@
+# backend/utils/metrics.py
+"""
+Métricas em memória partilhadas pelo backend
+- Contadores (incr)
+- Gauges (set_gauge)
+- Distribuições com janela deslizante (observe) -> avg, p50, p95, p99
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class Metrics:
+    """Registo thread-safe de métricas simples"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, deque] = {}
+        self._totals: Dict[str, list] = {}  # nome -> [count, sum]
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0]
+            samples.append(value)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += value
+
+    def get_counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def sample_count(self, name: str) -> int:
+        """Nº de amostras na janela atual de uma distribuição"""
+        with self._lock:
+            samples = self._samples.get(name)
+            return len(samples) if samples else 0
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """Percentil q (0-100) da janela atual, ou None sem amostras"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if not samples:
+                return None
+            ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            totals = {name: list(values) for name, values in self._totals.items()}
+
+        def pct(ordered, q):
+            return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+        summaries = {}
+        for name, ordered in samples.items():
+            if not ordered:
+                continue
+            count, total = totals[name]
+            summaries[name] = {
+                "count": count,
+                "avg": total / count,
+                "p50": pct(ordered, 50),
+                "p95": pct(ordered, 95),
+                "p99": pct(ordered, 99),
+                "max": ordered[-1],
+            }
+
+        return {"counters": counters, "gauges": gauges, "summaries": summaries}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+            self._totals.clear()
+
+
+# Instância global
+metrics = Metrics()
@@ -0,0 +1,63 @@
+# backend/utils/rate_limit.py
+"""
+Token bucket para limitar a taxa de pedidos
+"""
+
+import asyncio
+import threading
+import time
+from typing import Tuple
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe
+
+    Enche `rate` tokens por segundo até `capacity`; cada pedido consome tokens.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Args:
+            rate: Tokens repostos por segundo
+            capacity: Máximo de tokens acumulados (burst); default = max(1, rate)
+        """
+        if rate <= 0:
+            raise ValueError("rate tem de ser > 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> Tuple[bool, float]:
+        """
+        Tenta consumir tokens sem esperar
+
+        Returns:
+            (permitido, segundos até haver tokens suficientes)
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True, 0.0
+            return False, (tokens - self._tokens) / self.rate
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    async def acquire(self, tokens: float = 1.0):
+        """Espera (sem bloquear o event loop) até conseguir consumir tokens"""
+        while True:
+            allowed, wait = self.try_acquire(tokens)
+            if allowed:
+                return
+            await asyncio.sleep(wait)
@@ -0,0 +1,75 @@
+# backend/utils/tokens.py
+"""
+Contagem e truncagem de tokens
+
+Usa tiktoken (TIKTOKEN_ENCODING, default cl100k_base) quando disponível.
+Na primeira utilização o tiktoken pode ter de descarregar o ficheiro BPE:
+a app chama preload_encoding() no arranque (thread em background) e,
+enquanto esse load não termina, as contagens usam a aproximação de ~4
+caracteres por token em vez de bloquearem o event loop. Sem preload (scripts)
+o encoding é carregado na primeira chamada. Se o tiktoken não estiver
+instalado ou o ficheiro não puder ser obtido, fica sempre a aproximação.
+
+Em Docker o ficheiro fica na imagem (TIKTOKEN_CACHE_DIR, ver Dockerfile.backend).
+"""
+
+import os
+import threading
+
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+_lock = threading.Lock()
+_preload_thread = None
+
+
+def preload_encoding():
+    """Carrega o encoding numa thread em background (idempotente)"""
+    global _preload_thread
+    if _encoding_loaded or _preload_thread is not None:
+        return
+    _preload_thread = threading.Thread(target=get_encoding, name="tiktoken-preload", daemon=True)
+    _preload_thread.start()
+
+
+def get_encoding(wait: bool = True):
+    """
+    Encoding tiktoken partilhado (None se indisponível)
+
+    Args:
+        wait: False = se o preload ainda estiver a correr, devolve None já
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        if not wait and _preload_thread is not None:
+            return None
+        with _lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(os.getenv("TIKTOKEN_ENCODING", "cl100k_base"))
+                except Exception as e:
+                    print(f"⚠️ tiktoken indisponível, a estimar tokens por caracteres: {e}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Nº de tokens de um texto"""
+    encoding = get_encoding(wait=False)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Corta o texto para no máximo max_tokens tokens"""
+    encoding = get_encoding(wait=False)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -16,9 +16,14 @@ export interface ChatResponse {
   conversation_id: string;
 }
 
+// 🔑 Chave única por mensagem: o retry reutiliza-a para o backend não correr o LLM duas vezes
+const generateIdempotencyKey = (): string =>
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+
 export const chatAPI = {
   sendMessage: async (request: ChatRequest): Promise<ChatResponse> => {
     const API_URL = await getApiUrl(); // ✅ Sempre pega o URL mais recente
+    const idempotencyKey = generateIdempotencyKey();
     console.log('📤 A enviar mensagem para:', `${API_URL}/api/chat`);
     
     try {
@@ -26,6 +31,7 @@ export const chatAPI = {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
         },
         body: JSON.stringify(request),
       });
@@ -51,6 +57,7 @@ export const chatAPI = {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
+            'Idempotency-Key': idempotencyKey,
           },
           body: JSON.stringify(request),
         });